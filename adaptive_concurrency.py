@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import os
+from collections import deque
+from stats import percentile
+
+logger = logging.getLogger(__name__)
+
+try:
+    import psutil
+except ImportError:  # psutil 可选，没有时退回读取 loadavg 和 /proc/meminfo
+    psutil = None
+
+
+class ResizableLimiter:
+    """可在运行中调整上限的并发限制器（代替 asyncio.Semaphore）
+
+    调小上限时不打断进行中的访问，只是在进行中的数量降到上限以下之前不再放行。
+    close() 之后 acquire() 不再等待，调用方据此检查是否已停止。
+    """
+
+    def __init__(self, limit):
+        self.limit = max(1, int(limit))
+        self.active = 0
+        self.closed = False
+        self._changed = asyncio.Condition()
+
+    @property
+    def saturated(self):
+        return self.active >= self.limit
+
+    async def acquire(self):
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.closed or self.active < self.limit)
+            self.active += 1
+
+    async def release(self):
+        async with self._changed:
+            self.active -= 1
+            self._changed.notify()
+
+    async def set_limit(self, limit):
+        async with self._changed:
+            self.limit = max(1, int(limit))
+            self._changed.notify_all()
+
+    async def close(self):
+        """停止时唤醒所有等待中的 acquire()"""
+        async with self._changed:
+            self.closed = True
+            self._changed.notify_all()
+
+
+class SystemSampler:
+    """采样主机 CPU 使用率和可用内存比例（百分比），无法获取时返回 None"""
+
+    def __init__(self):
+        if psutil:
+            psutil.cpu_percent(None)  # 第一次调用只用于建立基准
+
+    def cpu_percent(self):
+        if psutil:
+            return psutil.cpu_percent(None)
+        try:
+            return min(100.0, os.getloadavg()[0] / (os.cpu_count() or 1) * 100)
+        except (AttributeError, OSError):
+            return None
+
+    def memory_available_percent(self):
+        if psutil:
+            return psutil.virtual_memory().available * 100.0 / psutil.virtual_memory().total
+        try:
+            info = {}
+            with open('/proc/meminfo', 'r') as f:
+                for line in f:
+                    name, value = line.split(':', 1)
+                    info[name] = int(value.split()[0])
+            return info['MemAvailable'] * 100.0 / info['MemTotal']
+        except (OSError, KeyError, ValueError):
+            return None
+
+
+class AdaptiveConcurrency:
+    """AIMD 并发控制：系统和访问都正常且并发已用满时加 1，出现过载迹象时乘以 decrease
+
+    过载判断（任一满足）：
+    - CPU 使用率高于 cpu_high
+    - 可用内存比例低于 mem_low
+    - 窗口内失败率高于 max_failure_rate（至少 min_samples 次访问）
+    - 窗口内 p95 访问耗时（不含停留时间）超过历史最好 p95 的 latency_factor 倍
+
+    每次调整都会写入日志，便于根据实际负载调参。
+    """
+
+    def __init__(self, limiter, min_workers=1, max_workers=10, interval=10, cpu_high=85,
+                 mem_low=15, max_failure_rate=0.3, latency_factor=2.0, decrease=0.75,
+                 min_samples=5, sampler=None):
+        self.limiter = limiter
+        self.min_workers = max(1, int(min_workers))
+        self.max_workers = max(self.min_workers, int(max_workers))
+        self.interval = interval
+        self.cpu_high = cpu_high
+        self.mem_low = mem_low
+        self.max_failure_rate = max_failure_rate
+        self.latency_factor = latency_factor
+        self.decrease = decrease
+        self.min_samples = min_samples
+        self.sampler = sampler or SystemSampler()
+        self.best_p95 = None
+        self.decisions = 0
+        self._window = deque()  # (是否成功, 耗时)
+
+    def observe(self, record):
+        """记录一次访问结果，耗时不含随机停留时间"""
+        if record.total is None:
+            return
+        latency = record.total - record.phases.get('dwell', 0.0)
+        self._window.append((record.ok, latency))
+
+    def _evaluate(self):
+        """根据当前窗口计算新的并发上限，返回 (新上限, 原因)"""
+        visits = list(self._window)
+        self._window.clear()
+        cpu = self.sampler.cpu_percent()
+        mem = self.sampler.memory_available_percent()
+        failure_rate = None
+        p95 = None
+        if len(visits) >= self.min_samples:
+            failure_rate = sum(1 for ok, _ in visits if not ok) / len(visits)
+            p95 = percentile([latency for ok, latency in visits if ok], 95)
+
+        status = (
+            f"CPU {cpu:.0f}%" if cpu is not None else "CPU 未知",
+            f"可用内存 {mem:.0f}%" if mem is not None else "可用内存 未知",
+            f"失败率 {failure_rate:.0%}" if failure_rate is not None else f"访问 {len(visits)} 次",
+            f"p95 {p95:.1f} 秒" if p95 is not None else "p95 未知",
+        )
+
+        overload = []
+        if cpu is not None and cpu > self.cpu_high:
+            overload.append("CPU过高")
+        if mem is not None and mem < self.mem_low:
+            overload.append("内存不足")
+        if failure_rate is not None and failure_rate > self.max_failure_rate:
+            overload.append("失败率过高")
+        if p95 is not None:
+            if self.best_p95 is not None and p95 > self.best_p95 * self.latency_factor:
+                overload.append("耗时变长")
+            self.best_p95 = p95 if self.best_p95 is None else min(self.best_p95, p95)
+
+        limit = self.limiter.limit
+        if overload:
+            new_limit = max(self.min_workers, int(limit * self.decrease))
+            reason = "、".join(overload)
+        elif self.limiter.saturated:
+            new_limit = min(self.max_workers, limit + 1)
+            reason = "负载正常且并发已用满"
+        else:
+            new_limit = limit
+            reason = "并发未用满"
+        return new_limit, f"{reason}（{'，'.join(status)}）"
+
+    async def run(self):
+        """定期评估并调整并发上限，直到被取消"""
+        while True:
+            await asyncio.sleep(self.interval)
+            old_limit = self.limiter.limit
+            new_limit, reason = self._evaluate()
+            self.decisions += 1
+            if new_limit != old_limit:
+                await self.limiter.set_limit(new_limit)
+                logger.info(f"自适应并发: {old_limit} -> {new_limit}，{reason}")
+            else:
+                logger.debug(f"自适应并发: 保持 {old_limit}，{reason}")
@@ -0,0 +1,187 @@
+"""图形界面：主窗口、运行状态和访问引擎之间的协调，由 main.py 启动"""
+import sys
+from startup_profile import profile as startup_profile
+import asyncio
+import logging
+with startup_profile.step('导入 PyQt6'):
+    from PyQt6.QtWidgets import QApplication
+    from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+with startup_profile.step('导入界面模块'):
+    from main_window import MainWindow
+from config_store import CONFIG_FILE, build_settings, build_task_source, load_config
+from run_state import RunLifecycle, STATE_NAMES, IDLE, STARTING, RUNNING, DRAINING, STOPPED
+
+class EngineSignals(QObject):
+    """把引擎事件从事件循环线程转发到 GUI 线程"""
+    started_signal = pyqtSignal(dict)
+    progress_signal = pyqtSignal(dict)
+    stopping_signal = pyqtSignal(dict)
+    finished_signal = pyqtSignal(dict)
+
+    def __init__(self, visit_updates=None):
+        super().__init__()
+        # 单次访问结果不逐条发信号，写入缓冲区后由界面定时批量取出
+        self.visit_updates = visit_updates
+
+    def dispatch(self, name, data):
+        if name == 'visit':
+            if self.visit_updates:
+                self.visit_updates.add_record(data)
+        elif name == 'started':
+            self.started_signal.emit(data)
+        elif name == 'progress':
+            self.progress_signal.emit(data)
+        elif name == 'stopping':
+            self.stopping_signal.emit(data)
+        elif name == 'finished':
+            self.finished_signal.emit(data)
+
+class ProxyBrowser:
+    def __init__(self):
+        with startup_profile.step('创建 QApplication'):
+            self.app = QApplication(sys.argv)
+        with startup_profile.step('创建主窗口'):
+            self.window = MainWindow()
+        self.engine = None
+        self.engine_future = None
+        self.resume_requested = False
+
+        # 运行状态由按钮和引擎事件驱动，转换中的开始/停止请求会排队
+        self.lifecycle = RunLifecycle(
+            self._start_engine, self._stop_engine, on_change=self._on_state_changed
+        )
+
+        # 引擎事件通过信号回到 GUI 线程
+        self.signals = EngineSignals(self.window.visit_updates)
+        self.signals.started_signal.connect(lambda progress: self.lifecycle.started())
+        self.signals.progress_signal.connect(self.window.update_progress)
+        self.signals.stopping_signal.connect(self.window.update_stop_progress)
+        self.signals.finished_signal.connect(self._on_engine_finished)
+
+        # 连接信号
+        self.window.start_btn.clicked.connect(self.start_browsing)
+        self.window.stop_btn.clicked.connect(self.stop_browsing)
+        self.window.resume_btn.clicked.connect(self.resume_browsing)
+        self._on_state_changed(None, self.lifecycle.state)
+
+    def start_browsing(self):
+        self.resume_requested = False
+        self.lifecycle.request_start()
+
+    def resume_browsing(self):
+        """按断点文件继续上次未完成的任务"""
+        self.resume_requested = True
+        self.lifecycle.request_start()
+
+    def stop_browsing(self):
+        """停止所有访问任务"""
+        self.lifecycle.request_stop()
+
+    def _start_engine(self):
+        """创建引擎并提交到后台事件循环，返回是否已启动"""
+        # 界面上没有控件的设置项（资源策略细则、代理列表文件、自适应阈值等）以配置文件为准
+        try:
+            config = load_config(CONFIG_FILE, include_urls=False)
+        except Exception as e:
+            self.window.log(f"读取配置文件失败，使用默认设置: {str(e)}", logging.WARNING)
+            config = load_config(None)
+        config.update(self.window.collect_config(include_urls=False))
+
+        resume, self.resume_requested = self.resume_requested, False
+
+        # 访问引擎（及 Playwright）在第一次开始任务时才导入
+        from engine import VisitEngine
+
+        on_error = lambda line: self.window.log(f"错误的访问次数格式: {line}", logging.WARNING)
+        resumed = None
+        try:
+            if resume:
+                # 从断点文件重建剩余任务，不使用界面上的URL列表
+                from checkpoint import build_resume_source, describe_state
+                task_source, resumed = build_resume_source(config['checkpoint_file'], on_error=on_error)
+                self.window.log(f"恢复任务: {describe_state(resumed)}")
+            else:
+                # 设置了URL文件时从文件流式读取，解析在引擎的线程池中进行，不阻塞界面
+                task_source = build_task_source(
+                    config, on_error=on_error, entries=self.window.task_model.entries()
+                )
+        except FileNotFoundError as e:
+            self.window.log(str(e), logging.ERROR)
+            return False
+
+        if task_source.exhausted and not len(task_source):
+            self.window.log("没有剩余的访问任务" if resume else "请输入要访问的URL", logging.WARNING)
+            return False
+
+        if not self.window.proxy_manager.has_proxy():
+            self.window.log("请先设置代理", logging.WARNING)
+            return False
+
+        # 所有访问任务都在后台事件循环中运行；多个工作进程时由本进程分发任务并合并结果
+        if config['shards'] > 1:
+            from sharding import ShardedEngine
+            self.engine = ShardedEngine(
+                task_source, config, build_settings(config), config['shards'],
+                on_event=self.signals.dispatch, resume=resume
+            )
+        else:
+            self.engine = VisitEngine(
+                task_source,
+                self.window.proxy_manager.get_current_proxy,
+                build_settings(config),
+                on_event=self.signals.dispatch,
+                proxy_balancer=self.window.proxy_manager.balancer,
+                resume=resume
+            )
+        self.window.reset_visit_stats(resumed['progress'] if resumed else None)
+        self.window.update_progress(self.engine.progress())
+        self.engine_future = asyncio.run_coroutine_threadsafe(
+            self.engine.run(), self.window.loop
+        )
+        self.engine_future.add_done_callback(
+            lambda f: self.window.handle_async_result(f, "运行访问任务")
+        )
+        return True
+
+    def _stop_engine(self):
+        self.window.log("正在停止所有浏览任务...")
+        self.engine.stop()
+
+    def _on_state_changed(self, old, new):
+        """按运行状态更新按钮：转换过程中仍可点击，请求会排队执行"""
+        self.window.start_btn.setEnabled(new in (IDLE, STOPPED, DRAINING))
+        self.window.resume_btn.setEnabled(new in (IDLE, STOPPED, DRAINING))
+        self.window.stop_btn.setEnabled(new in (STARTING, RUNNING, DRAINING))
+        self.window.setWindowTitle(f"代理IP网站访问器 - {STATE_NAMES[new]}")
+
+    def _on_engine_finished(self, progress):
+        """引擎退出后的回调"""
+        self.window.flush_visit_updates()
+        self.window.update_progress(progress)
+        if self.lifecycle.state == DRAINING:
+            self.window.log(f"已停止所有浏览任务，用时 {progress.get('stop_latency', 0):.1f} 秒")
+        else:
+            self.window.log(
+                f"所有任务已完成，成功 {progress['completed']}，失败 {progress['failed']}"
+            )
+        self.engine = None
+        self.engine_future = None
+        self.lifecycle.finished()
+
+    def run(self, profile_only=False):
+        """启动应用程序：先显示窗口，再在事件循环中完成其余初始化
+
+        profile_only 为 True 时输出启动耗时报告后直接退出，用于测量冷启动时间。
+        """
+        with startup_profile.step('显示窗口'):
+            self.window.show()
+        QTimer.singleShot(0, lambda: self._deferred_init(profile_only))
+        return self.app.exec()
+
+    def _deferred_init(self, profile_only):
+        self.window.deferred_init()
+        startup_profile.mark('界面可用')
+        startup_profile.report()
+        if profile_only:
+            print(startup_profile.format_report())
+            self.app.quit()
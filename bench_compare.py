@@ -0,0 +1,204 @@
+"""性能回归检查：按场景矩阵运行基准测试，与保存的基线比较
+
+场景矩阵：浏览器每次访问重启（per-visit）/ 复用（pooled） × 1/5/10/50 个并发 × 完整加载（full）/
+屏蔽图片字体媒体（lean）。每个场景重复运行几次，取中位数比较；容差取配置的阈值和两边
+测量噪声（变异系数）的较大者，超出容差的吞吐量下降、p95 耗时或每个并发的内存上升判为回归。
+"""
+import logging
+import math
+import re
+import statistics
+import time
+from benchmark import run_benchmark
+
+logger = logging.getLogger(__name__)
+
+# 结果格式版本：2 起 per-visit 场景的浏览器并行启动（之前浏览器池串行启动，测到的是锁等待）
+MATRIX_VERSION = 2
+
+MATRIX_WORKERS = (1, 5, 10, 50)
+MATRIX_LAUNCH = {'pooled': 50, 'per-visit': 1}   # 名称 -> max_contexts_per_browser
+MATRIX_POLICIES = ('full', 'lean')
+
+# 比较的指标：名称 -> (结果中的路径, 越大越好)
+METRICS = {
+    'visits_per_sec': (('visits_per_sec',), True),
+    'p95_latency_s': (('visit_total', 'p95'), False),
+    'rss_per_worker_mb': (('memory', 'per_worker_mb'), False),
+}
+
+# 默认阈值：变化超过该比例（且超过测量噪声）判为回归
+DEFAULT_THRESHOLDS = {
+    'visits_per_sec': 0.10,
+    'p95_latency_s': 0.15,
+    'rss_per_worker_mb': 0.15,
+}
+# 容差至少为噪声（合并变异系数）的几倍
+NOISE_SIGMAS = 2.0
+# 绝对变化小于该值时不判为回归或改善，避免很小的数值上相对变化被放大
+MIN_DELTA = {
+    'visits_per_sec': 0.0,
+    'p95_latency_s': 0.05,
+    'rss_per_worker_mb': 5.0,
+}
+
+
+def build_matrix(visits_per_worker=4, min_visits=10):
+    """生成场景矩阵，每个场景的访问次数与并发数成正比"""
+    scenarios = []
+    for launch, max_contexts in MATRIX_LAUNCH.items():
+        for policy in MATRIX_POLICIES:
+            for workers in MATRIX_WORKERS:
+                scenarios.append({
+                    'name': f"{launch}-{policy}-w{workers}",
+                    'workers': workers,
+                    'visits': max(min_visits, workers * visits_per_worker),
+                    'max_contexts_per_browser': max_contexts,
+                    'resource_policy': policy,
+                    'stop_probe': False,
+                })
+    return scenarios
+
+
+def filter_matrix(scenarios, pattern):
+    """按名称的正则表达式筛选场景，pattern 为空时全部保留"""
+    names = set(filter_names([s['name'] for s in scenarios], pattern))
+    return [s for s in scenarios if s['name'] in names]
+
+
+def filter_names(names, pattern):
+    """按名称的正则表达式筛选场景名称，pattern 为空时全部保留"""
+    if not pattern:
+        return list(names)
+    regex = re.compile(pattern)
+    return [name for name in names if regex.search(name)]
+
+
+def extract_metrics(result):
+    """从 run_benchmark 的结果中取出比较用的指标"""
+    metrics = {}
+    for name, (path, _) in METRICS.items():
+        value = result
+        for key in path:
+            value = value.get(key) if isinstance(value, dict) else None
+        if value is not None:
+            metrics[name] = value
+    return metrics
+
+
+def aggregate(runs):
+    """多次运行的指标汇总：{指标: {'median', 'stdev', 'samples'}}"""
+    summary = {}
+    for name in METRICS:
+        samples = [run[name] for run in runs if name in run]
+        if not samples:
+            continue
+        summary[name] = {
+            'median': statistics.median(samples),
+            'stdev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+            'samples': samples,
+        }
+    return summary
+
+
+async def run_matrix(scenarios, repeat=3):
+    """依次运行各场景 repeat 次，返回可保存为基线的结果"""
+    results = {'version': MATRIX_VERSION, 'created_at': time.time(), 'repeat': repeat, 'scenarios': {}}
+    for index, scenario in enumerate(scenarios, 1):
+        runs = []
+        for attempt in range(repeat):
+            logger.info(f"[{index}/{len(scenarios)}] 场景 {scenario['name']} 第 {attempt + 1}/{repeat} 次")
+            result = await run_benchmark(scenario)
+            results.setdefault('environment', result['environment'])
+            if not result['completed']:
+                logger.warning(f"场景 {scenario['name']} 没有成功的访问: {result['errors']}")
+            runs.append(extract_metrics(result))
+        results['scenarios'][scenario['name']] = {
+            'scenario': scenario,
+            'runs': runs,
+            'metrics': aggregate(runs),
+        }
+    return results
+
+
+def _noise(summary):
+    median = summary['median']
+    return summary['stdev'] / abs(median) if median else 0.0
+
+
+def compare(baseline, results, thresholds=None, only=None):
+    """比较两次矩阵运行的结果，返回每个场景每个指标的比较行
+
+    status: ok / regression / improved / missing（基线中的场景或指标本次没有结果）/
+    new（基线中没有该场景或指标）。only 为场景名称的正则表达式，不匹配的基线场景不要求有结果。
+    """
+    thresholds = dict(DEFAULT_THRESHOLDS, **(thresholds or {}))
+    names = list(results['scenarios'])
+    names += [name for name in filter_names(baseline.get('scenarios', {}), only) if name not in names]
+    rows = []
+    for name in names:
+        base = baseline.get('scenarios', {}).get(name)
+        current = results['scenarios'].get(name)
+        if base is None or current is None:
+            rows.append({'scenario': name, 'metric': None, 'status': 'new' if base is None else 'missing'})
+            continue
+        for metric, (_, higher_is_better) in METRICS.items():
+            before = base['metrics'].get(metric)
+            after = current['metrics'].get(metric)
+            if before is None or after is None:
+                rows.append({'scenario': name, 'metric': metric, 'status': 'new' if before is None else 'missing'})
+                continue
+            tolerance = max(
+                thresholds[metric],
+                NOISE_SIGMAS * math.hypot(_noise(before), _noise(after))
+            )
+            delta = after['median'] - before['median']
+            # 基线为 0 时没有相对变化，只按方向判断
+            change = delta / abs(before['median']) if before['median'] else None
+            worse = (-delta if higher_is_better else delta) if change is None else \
+                (-change if higher_is_better else change)
+            if abs(delta) <= MIN_DELTA[metric]:
+                status = 'ok'
+            elif worse > (0 if change is None else tolerance):
+                status = 'regression'
+            elif -worse > (0 if change is None else tolerance):
+                status = 'improved'
+            else:
+                status = 'ok'
+            rows.append({
+                'scenario': name,
+                'metric': metric,
+                'baseline': before['median'],
+                'current': after['median'],
+                'change': None if change is None else round(change, 4),
+                'tolerance': round(tolerance, 4),
+                'status': status,
+            })
+    return rows
+
+
+def has_regression(rows):
+    """是否有回归，或基线中的场景、指标本次缺少结果（场景出错或没有运行）"""
+    return any(row['status'] in ('regression', 'missing') for row in rows)
+
+
+STATUS_NAMES = {'ok': '正常', 'regression': '回归', 'improved': '改善', 'missing': '缺少', 'new': '新增'}
+
+
+def format_report(rows):
+    """比较结果的文本表格"""
+    lines = [f"{'场景':<24}{'指标':<20}{'基线':>10}{'本次':>10}{'变化':>9}{'容差':>8}  结果"]
+    for row in rows:
+        if row.get('baseline') is None:
+            lines.append(f"{row['scenario']:<24}{row['metric'] or '-':<20}{'':>10}{'':>10}{'':>9}{'':>8}  "
+                         f"{STATUS_NAMES[row['status']]}")
+            continue
+        change = '-' if row['change'] is None else f"{row['change']:+.1%}"
+        lines.append(
+            f"{row['scenario']:<24}{row['metric']:<20}{row['baseline']:>10.3f}{row['current']:>10.3f}"
+            f"{change:>9}{row['tolerance']:>8.1%}  {STATUS_NAMES[row['status']]}"
+        )
+    regressions = sum(1 for row in rows if row['status'] == 'regression')
+    missing = sum(1 for row in rows if row['status'] == 'missing')
+    lines.append(f"共 {len(rows)} 项，回归 {regressions} 项，缺少结果 {missing} 项")
+    return '\n'.join(lines)
@@ -0,0 +1,453 @@
+"""本地基准测试：不访问外网，在本机启动目标网站和带认证的代理替身，驱动真实的访问引擎
+
+- TargetSite: aiohttp 目标网站，页面大小、附带的图片/样式资源数量和响应延迟可配置，
+  另提供 /ip 供出口IP查询
+- AuthProxy: 要求 Basic 认证的 HTTP 代理替身，支持 CONNECT 隧道和普通 HTTP 转发，
+  所有请求都转发到本地目标网站，因此目标URL可以使用保留域名 bench-target.test，
+  浏览器不会因为地址是 127.0.0.1 而绕过代理
+
+结果为 JSON：每秒访问数、浏览器启动耗时、各阶段耗时分位数、每个并发的内存占用和停止耗时。
+"""
+import asyncio
+import base64
+import logging
+import os
+import platform
+import time
+from urllib.parse import urlsplit
+from browser_memory import process_tree_rss
+from config_store import DEFAULT_CONFIG, build_settings
+from stats import percentile
+from task_store import WeightedTaskStore
+from visit_metrics import PHASES
+from web_vitals import VitalsAggregator
+
+logger = logging.getLogger(__name__)
+
+# 目标URL使用的保留域名（RFC 2606），由代理替身解析到本地目标网站
+TARGET_HOST = 'bench-target.test'
+PROXY_USER_FORMAT = 'bench-{sid}'
+PROXY_PASSWORD = 'bench-secret'
+
+# 默认场景
+DEFAULT_SCENARIO = {
+    'name': 'default',
+    'workers': 5,
+    'visits': 50,
+    'pages': 10,               # 不同页面的数量，访问次数平均分配
+    'page_kb': 64,             # 页面HTML大小
+    'assets': 4,               # 每个页面的图片数量（另有一个样式表）
+    'asset_kb': 16,
+    'latency_ms': 50,          # 目标网站每个响应的延迟
+    'proxy_latency_ms': 20,    # 代理建立每个上游连接前的延迟
+    'resource_policy': 'full',
+    'launch_profile': 'default',
+    'max_contexts_per_browser': 50,  # 1 表示每次访问都重启浏览器
+    'browser_count': 0,
+    'ip_check': True,
+    'stop_probe': True,        # 另运行一轮，在访问进行中停止并测量停止耗时
+    'web_vitals': False,       # 采集页面性能指标并按URL汇总
+    'headless': True,
+}
+
+
+class TargetSite:
+    """本地目标网站（aiohttp），请求参数 kb / latency 可覆盖默认的页面大小和延迟"""
+
+    def __init__(self, page_kb=64, assets=4, asset_kb=16, latency_ms=50, host='127.0.0.1'):
+        self.page_kb = page_kb
+        self.assets = assets
+        self.asset_kb = asset_kb
+        self.latency_ms = latency_ms
+        self.host = host
+        self.port = None
+        self.runner = None
+        self.stats = {'pages': 0, 'assets': 0, 'ip_checks': 0, 'bytes': 0}
+
+    async def _delay(self, request):
+        latency = float(request.query.get('latency', self.latency_ms))
+        if latency > 0:
+            await asyncio.sleep(latency / 1000.0)
+
+    async def _page(self, request):
+        from aiohttp import web
+
+        await self._delay(request)
+        name = request.match_info['name']
+        kb = int(request.query.get('kb', self.page_kb))
+        assets = ''.join(
+            f'<img src="/asset/{name}-{i}.png?kb={self.asset_kb}" width="64" height="64">'
+            for i in range(self.assets)
+        )
+        head = (
+            f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>bench {name}</title>'
+            f'<link rel="stylesheet" href="/asset/{name}.css?kb=1"></head>'
+            f'<body><h1>{name}</h1>{assets}<div style="height:3000px">'
+        )
+        tail = '</div></body></html>'
+        padding = max(0, kb * 1024 - len(head) - len(tail))
+        body = head + ('<p>' + 'x' * 1017 + '</p>') * (padding // 1024) + tail
+        self.stats['pages'] += 1
+        self.stats['bytes'] += len(body)
+        return web.Response(text=body, content_type='text/html')
+
+    async def _asset(self, request):
+        from aiohttp import web
+
+        await self._delay(request)
+        name = request.match_info['name']
+        size = int(request.query.get('kb', self.asset_kb)) * 1024
+        content_type = 'text/css' if name.endswith('.css') else 'image/png'
+        self.stats['assets'] += 1
+        self.stats['bytes'] += size
+        body = b' ' * size if content_type == 'text/css' else os.urandom(size)
+        return web.Response(body=body, content_type=content_type)
+
+    async def _ip(self, request):
+        from aiohttp import web
+
+        self.stats['ip_checks'] += 1
+        # 文档保留地址（RFC 5737），模拟代理的出口IP
+        return web.json_response({'origin': '203.0.113.7'})
+
+    async def start(self):
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_get('/page/{name}', self._page)
+        app.router.add_get('/asset/{name}', self._asset)
+        app.router.add_get('/ip', self._ip)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, 0)
+        await site.start()
+        self.port = self.runner.addresses[0][1]
+
+    async def close(self):
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+
+
+class AuthProxy:
+    """要求 Basic 认证的 HTTP 代理替身，所有连接都转发到本地目标网站
+
+    认证按连接进行：每个连接的第一个请求必须带正确的 Proxy-Authorization，
+    否则返回 407，浏览器会在同一连接上带认证信息重试。只支持 http:// 目标。
+    """
+
+    def __init__(self, target_host, target_port, password=PROXY_PASSWORD, latency_ms=0, host='127.0.0.1'):
+        self.target_host = target_host
+        self.target_port = target_port
+        self.password = password
+        self.latency_ms = latency_ms
+        self.host = host
+        self.port = None
+        self.server = None
+        self.sessions = set()
+        self._tasks = set()
+        self.stats = {'connections': 0, 'tunnels': 0, 'forwarded': 0, 'auth_challenges': 0}
+
+    def proxy_string(self):
+        """访问引擎使用的代理配置: 服务器:端口:用户名格式:密码"""
+        return f"{self.host}:{self.port}:{PROXY_USER_FORMAT}:{self.password}"
+
+    def _authenticate(self, headers):
+        value = headers.get('proxy-authorization', '')
+        scheme, _, token = value.partition(' ')
+        if scheme.lower() != 'basic':
+            return None
+        try:
+            username, _, password = base64.b64decode(token).decode('utf-8').partition(':')
+        except Exception:
+            return None
+        return username if password == self.password else None
+
+    async def _read_head(self, reader):
+        head = await reader.readuntil(b'\r\n\r\n')
+        lines = head.decode('latin-1').split('\r\n')
+        method, target, version = lines[0].split(' ', 2)
+        headers = {}
+        raw_headers = []
+        for line in lines[1:]:
+            if not line:
+                continue
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+            raw_headers.append((name.strip(), value.strip()))
+        return method, target, version, headers, raw_headers
+
+    async def _pipe(self, reader, writer):
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                writer.write(data)
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            try:
+                writer.close()
+            except Exception:
+                pass
+
+    async def _handle(self, reader, writer):
+        self.stats['connections'] += 1
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        try:
+            while True:
+                method, target, version, headers, raw_headers = await self._read_head(reader)
+                username = self._authenticate(headers)
+                if username is not None:
+                    break
+                self.stats['auth_challenges'] += 1
+                writer.write(
+                    b'HTTP/1.1 407 Proxy Authentication Required\r\n'
+                    b'Proxy-Authenticate: Basic realm="bench"\r\nContent-Length: 0\r\n\r\n'
+                )
+                await writer.drain()
+            self.sessions.add(username)
+            if self.latency_ms > 0:
+                await asyncio.sleep(self.latency_ms / 1000.0)
+            upstream_reader, upstream_writer = await asyncio.open_connection(self.target_host, self.target_port)
+            if method == 'CONNECT':
+                self.stats['tunnels'] += 1
+                writer.write(b'HTTP/1.1 200 Connection Established\r\n\r\n')
+                await writer.drain()
+            else:
+                # 绝对地址改为路径形式，去掉代理专用的请求头
+                self.stats['forwarded'] += 1
+                parts = urlsplit(target)
+                path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+                lines = [f'{method} {path} {version}'] + [
+                    f'{name}: {value}' for name, value in raw_headers
+                    if not name.lower().startswith('proxy-')
+                ]
+                upstream_writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+            await asyncio.gather(self._pipe(reader, upstream_writer), self._pipe(upstream_reader, writer))
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError, ValueError,
+                asyncio.CancelledError):
+            pass
+        finally:
+            self._tasks.discard(task)
+            writer.close()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, self.host, 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        if self.server:
+            self.server.close()
+            self.server = None
+        # 关闭浏览器保持的连接
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+def summarize(values):
+    """数值列表的均值和分位数"""
+    if not values:
+        return None
+    return {
+        'count': len(values),
+        'mean': round(sum(values) / len(values), 4),
+        'p50': round(percentile(values, 50), 4),
+        'p95': round(percentile(values, 95), 4),
+        'p99': round(percentile(values, 99), 4),
+        'max': round(max(values), 4),
+    }
+
+
+def build_config(scenario, proxy, visits=None, dwell=0):
+    """按场景生成访问引擎的配置和任务源"""
+    config = dict(
+        DEFAULT_CONFIG,
+        proxy_string=proxy.proxy_string(),
+        thread_count=scenario['workers'],
+        browser_count=scenario['browser_count'],
+        max_contexts_per_browser=scenario['max_contexts_per_browser'],
+        launch_profile=scenario['launch_profile'],
+        resource_policy=scenario['resource_policy'],
+        headless=scenario['headless'],
+        ip_check=scenario['ip_check'],
+        ip_check_url=f'http://{TARGET_HOST}/ip',
+        collect_web_vitals=scenario['web_vitals'],
+        min_time=dwell, max_time=dwell, min_interval=0, max_interval=0,
+        metrics_file='', checkpoint_file='',
+    )
+    visits = scenario['visits'] if visits is None else visits
+    pages = max(1, min(scenario['pages'], visits))
+    base, extra = divmod(visits, pages)
+    entries = [(f'http://{TARGET_HOST}/page/p{i}', base + (1 if i < extra else 0)) for i in range(pages)]
+    return config, WeightedTaskStore([entry for entry in entries if entry[1] > 0])
+
+
+class _Sampler:
+    """运行期间每秒测量一次浏览器和整个进程树（含 Playwright 驱动）的内存"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.browser_peak = 0
+        self.tree_peak = 0
+        self.task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pool = self.engine.pool
+            if pool and self.engine.startup_time is not None:
+                try:
+                    self.browser_peak = max(self.browser_peak, await pool.check_memory() or 0)
+                except Exception as e:
+                    logger.debug(f"测量浏览器内存失败: {str(e)}")
+            tree = await loop.run_in_executor(None, process_tree_rss, os.getpid())
+            self.tree_peak = max(self.tree_peak, tree or 0)
+            await asyncio.sleep(1)
+
+    def start(self):
+        self.task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self.task:
+            self.task.cancel()
+
+
+def _create_engine(config, task_source, on_event):
+    from engine import VisitEngine
+    from proxy_manager import ProxyManager
+
+    proxy_manager = ProxyManager(config['proxy_string'])
+    return VisitEngine(
+        task_source, proxy_manager.get_current_proxy, build_settings(config),
+        on_event=on_event, proxy_balancer=proxy_manager.balancer
+    )
+
+
+async def run_scenario(scenario, proxy):
+    """按场景访问到全部完成，返回吞吐量、启动耗时、阶段耗时和内存"""
+    config, task_source = build_config(scenario, proxy)
+    records = []
+    marks = {}
+
+    def on_event(name, data):
+        if name == 'visit':
+            records.append(data)
+        elif name == 'started':
+            marks['started'] = time.monotonic()
+
+    engine = _create_engine(config, task_source, on_event)
+    sampler = _Sampler(engine)
+    sampler.start()
+    start = time.monotonic()
+    try:
+        progress = await engine.run()
+    finally:
+        sampler.stop()
+    end = time.monotonic()
+
+    ok = [r for r in records if r['ok']]
+    started = marks.get('started', start)
+    duration = end - started
+    phases = {}
+    for name in PHASES:
+        values = [r['phases'][name] for r in ok if name in r['phases']]
+        if name == 'launch':
+            values = [v for v in values if v > 0]
+        summary = summarize(values)
+        if summary:
+            phases[name] = summary
+    errors = {}
+    for r in records:
+        if not r['ok']:
+            errors[r['error_class']] = errors.get(r['error_class'], 0) + 1
+    workers = scenario['workers']
+    vitals = VitalsAggregator()
+    for r in ok:
+        vitals.add(r)
+    result = {
+        'visits': len(records),
+        'completed': progress['completed'],
+        'failed': progress['failed'],
+        'errors': errors,
+        'duration_s': round(duration, 3),
+        'visits_per_sec': round(progress['completed'] / duration, 3) if duration > 0 else None,
+        'launch': {
+            'startup_s': round(engine.startup_time, 3) if engine.startup_time is not None else None,
+            'browsers': engine._browser_count(),
+            'relaunches': phases['launch']['count'] if 'launch' in phases else 0,
+        },
+        'phases': phases,
+        'visit_total': summarize([r['total'] - r['phases'].get('dwell', 0.0) for r in ok]),
+        'memory': {
+            'browser_rss_mb_peak': round(sampler.browser_peak / 1048576, 1),
+            'per_worker_mb': round(sampler.browser_peak / 1048576 / workers, 1),
+            'process_tree_rss_mb_peak': round(sampler.tree_peak / 1048576, 1),
+        },
+    }
+    if len(vitals):
+        result['web_vitals'] = vitals.summary()
+    return result
+
+
+async def measure_stop(scenario, proxy, dwell=30):
+    """在所有并发都处于停留阶段时停止，测量从请求停止到引擎退出的耗时"""
+    workers = scenario['workers']
+    config, task_source = build_config(scenario, proxy, visits=workers * 4, dwell=dwell)
+    engine = _create_engine(config, task_source, None)
+    task = asyncio.create_task(engine.run())
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline and not task.done():
+        if engine.startup_time is not None and len(engine.tasks) >= workers:
+            break
+        await asyncio.sleep(0.1)
+    # 等访问进入停留阶段
+    await asyncio.sleep(min(5, dwell / 2))
+    in_flight = len(engine.tasks)
+    requested = time.monotonic()
+    engine.stop()
+    progress = await task
+    return {
+        'in_flight': in_flight,
+        'stop_latency_s': progress.get('stop_latency'),
+        'wall_s': round(time.monotonic() - requested, 3),
+    }
+
+
+async def run_benchmark(scenario=None):
+    """启动目标网站和代理替身，运行一个场景，返回 JSON 可序列化的结果"""
+    scenario = dict(DEFAULT_SCENARIO, **(scenario or {}))
+    target = TargetSite(
+        page_kb=scenario['page_kb'], assets=scenario['assets'],
+        asset_kb=scenario['asset_kb'], latency_ms=scenario['latency_ms']
+    )
+    await target.start()
+    proxy = AuthProxy(target.host, target.port, latency_ms=scenario['proxy_latency_ms'])
+    await proxy.start()
+    try:
+        logger.info(
+            f"基准场景 {scenario['name']}: {scenario['workers']} 个并发，{scenario['visits']} 次访问，"
+            f"目标网站 127.0.0.1:{target.port}，代理 127.0.0.1:{proxy.port}"
+        )
+        result = {
+            'scenario': scenario,
+            'environment': {
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'timestamp': time.time(),
+            },
+        }
+        result.update(await run_scenario(scenario, proxy))
+        if scenario['stop_probe']:
+            result['stop'] = await measure_stop(scenario, proxy)
+        result['proxy'] = dict(proxy.stats, sessions=len(proxy.sessions))
+        result['target'] = dict(target.stats)
+        return result
+    finally:
+        await proxy.close()
+        await target.close()
@@ -1,146 +1,196 @@
-from playwright.async_api import async_playwright
+from resource_policy import ResourceStats
+import web_vitals
+from contextlib import nullcontext
 import asyncio
-import re
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36'
 
 class BrowserController:
-    def __init__(self):
-        self.browser = None
+    def __init__(self, pool, record=None, ip_lookup=None, resource_policy=None, collect_vitals=False):
+        self.pool = pool  # BrowserPool，由访问引擎创建和关闭
+        self.record = record  # VisitRecord，用于记录各阶段耗时
+        self.ip_lookup = ip_lookup  # ExitIpLookup，为 None 时不查询出口IP
+        self.ip_task = None
+        self.resource_policy = resource_policy  # ResourcePolicy，为 None 时完整加载
+        self.resource_stats = ResourceStats()
+        self.collect_vitals = collect_vitals  # 采集页面性能指标（Navigation Timing、绘制时间、LCP）
+        self.lease = None
         self.page = None
-        self.playwright = None
         self.current_ip = "未知"
-        
-    async def init_browser(self, proxy=None, headless=False):
-        """初始化浏览器"""
+        self.last_error = None
+        self.last_error_class = None
+        self.last_status = None
+
+    def _phase(self, name):
+        """测量阶段耗时，没有访问记录时不做任何事"""
+        return self.record.phase(name) if self.record else nullcontext()
+
+    def _fail(self, message, error_class):
+        self.last_error = message
+        self.last_error_class = error_class
+        if self.record:
+            self.record.fail(message, error_class)
+        return message
+
+    async def init_browser(self, proxy=None):
+        """从浏览器池获取新的上下文"""
         try:
-            print(f"正在启动浏览器，模式: {'无头' if headless else '可见'}")
-            self.playwright = await async_playwright().start()
-            
-            # 基本浏览器选项
-            browser_options = {
-                'headless': headless,  # 是否无头模式
-                'args': [
-                    '--start-maximized',
-                    '--disable-infobars',
-                    '--no-sandbox',
-                    '--disable-setuid-sandbox',
-                    '--window-position=0,0',
-                ],
-            }
-            
             if proxy:
-                # 从代理信息中提取服务器地址和认证信息
-                browser_options['proxy'] = {
-                    'server': f"http://{proxy['host']}:{proxy['port']}",  # 改为 http
-                    'username': proxy['username'],
-                    'password': proxy['password']
-                }
-                print(f"使用代理: {proxy['host']}:{proxy['port']}")
-            
-            # 启动浏览器
-            self.browser = await self.playwright.chromium.launch(**browser_options)
-            print("浏览器已启动")
-            
-            # 创建上下文，设置窗口大小
-            context = await self.browser.new_context(
-                no_viewport=True,  # 禁用视窗限制
+                logger.debug(f"使用代理: {proxy['host']}:{proxy['port']}")
+
+            # 创建上下文，代理在上下文级别设置，每次访问相互隔离
+            start = time.monotonic()
+            # 视窗设置来自浏览器池的启动配置（标准配置禁用视窗限制）
+            self.lease = await self.pool.acquire(
+                proxy,
                 ignore_https_errors=True,
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36'
+                user_agent=USER_AGENT,
+                **self.pool.context_options()
             )
-            
-            # 创建新页面用于实际访问
-            self.page = await context.new_page()
-            
-            # 最大化窗口
-            await self.page.evaluate("""
-                window.moveTo(0, 0);
-                window.resizeTo(screen.width, screen.height);
-            """)
-            
+            if self.record:
+                self.record.add_phase('launch', self.lease.launch_time)
+                self.record.add_phase('new_context', time.monotonic() - start - self.lease.launch_time)
+            context = self.lease.context
+            if self.resource_policy:
+                await self.resource_policy.attach(context, self.resource_stats)
+
+            with self._phase('new_page'):
+                # 创建新页面用于实际访问
+                self.page = await context.new_page()
+                if self.collect_vitals:
+                    await web_vitals.install(self.page)
+
+                # 最大化窗口（节省内存配置使用固定的小视窗）
+                if self.pool.maximize_window:
+                    await self.page.evaluate("""
+                        window.moveTo(0, 0);
+                        window.resizeTo(screen.width, screen.height);
+                    """)
+
             # 设置页面事件监听
-            self.page.on("load", lambda _: print("页面加载完成"))
+            self.page.on("load", lambda _: logger.debug("页面加载完成"))
             self.page.on("dialog", lambda dialog: dialog.accept())
-            
-            # 获取当前代理IP（可选）
-            if proxy:
-                try:
-                    # 正确使用 async with
-                    test_page = await context.new_page()
-                    try:
-                        await test_page.goto('http://httpbin.org/ip', wait_until='load', timeout=10000)
-                        content = await test_page.content()
-                        ip_match = re.search(r'"origin":\s*"([^"]+)"', content)
-                        self.current_ip = ip_match.group(1) if ip_match else "未知"
-                    finally:
-                        await test_page.close()
-                except Exception as e:
-                    print(f"获取IP失败: {str(e)}")
-                    self.current_ip = f"{proxy['host']}:{proxy['port']}"
+
+            # 出口IP查询与页面导航并行进行，不再额外打开页面
+            if proxy and self.ip_lookup:
+                self.ip_task = asyncio.create_task(self._lookup_ip(proxy))
+            elif proxy:
+                self.current_ip = f"{proxy['host']}:{proxy['port']}"
             else:
                 self.current_ip = "未使用代理"
-            
+
             return True
-            
+
         except Exception as e:
             self.current_ip = "未知"
-            print(f"浏览器初始化失败: {str(e)}")  # 添加错误输出
-            return f"浏览器初始化失败: {str(e)}"
-            
+            logger.warning(f"浏览器初始化失败: {str(e)}")
+            return self._fail(f"浏览器初始化失败: {str(e)}", type(e).__name__)
+
+    async def _lookup_ip(self, proxy):
+        """后台查询出口IP，耗时记为 ip_check 阶段（与导航并行）"""
+        with self._phase('ip_check'):
+            ip = await self.ip_lookup.lookup(proxy)
+        if ip:
+            self.current_ip = ip
+        else:
+            logger.warning("获取IP失败")
+            self.current_ip = f"{proxy['host']}:{proxy['port']}"
+        if self.record:
+            self.record.exit_ip = self.current_ip
+        return self.current_ip
+
+    async def wait_ip(self, timeout=None):
+        """等待出口IP查询完成并返回结果"""
+        if self.ip_task:
+            try:
+                await asyncio.wait_for(asyncio.shield(self.ip_task), timeout)
+            except Exception:
+                pass
+        return self.current_ip
+
     async def visit_url(self, url):
         """访问指定URL"""
+        self.last_error = None
+        self.last_error_class = None
+        self.last_status = None
         try:
-            print(f"正在访问: {url}")
+            logger.debug(f"正在访问: {url}")
             # 设置页面超时
             self.page.set_default_timeout(60000)  # 增加到60秒超时
-            
+
             # 访问页面，使用 load 事件而不是 networkidle
-            response = await self.page.goto(
-                url, 
-                wait_until='load',  # 改为 load
-                timeout=60000  # 单独设置导航超时
-            )
-            
+            with self._phase('goto'):
+                response = await self.page.goto(
+                    url,
+                    wait_until='load',  # 改为 load
+                    timeout=60000  # 单独设置导航超时
+                )
+
+            if response:
+                self.last_status = response.status
+                if self.record:
+                    self.record.status = response.status
+
             if not response.ok:
-                return f"访问失败: HTTP {response.status}"
-            
+                return self._fail(f"访问失败: HTTP {response.status}", 'HTTPError')
+
             # 等待页面加载完成，使用较短的超时
-            try:
-                await self.page.wait_for_load_state('networkidle', timeout=10000)
-            except:
-                print("等待网络空闲超时，继续执行")
-            
-            # 执行滚动操作模拟真实浏览
-            await self.page.evaluate("""
-                window.scrollTo({
-                    top: document.body.scrollHeight,
-                    behavior: 'smooth'
-                });
-            """)
-            
-            await asyncio.sleep(2)  # 等待滚动完成
-            
-            # 滚动回顶部
-            await self.page.evaluate("""
-                window.scrollTo({
-                    top: 0,
-                    behavior: 'smooth'
-                });
-            """)
-            
+            with self._phase('networkidle'):
+                try:
+                    await self.page.wait_for_load_state('networkidle', timeout=10000)
+                except Exception:
+                    logger.debug("等待网络空闲超时，继续执行")
+
+            # 滚动会结束 LCP 的更新，在滚动之前读取性能指标
+            if self.collect_vitals and self.record:
+                self.record.vitals = await web_vitals.collect(self.page)
+
+            with self._phase('scroll'):
+                # 执行滚动操作模拟真实浏览
+                await self.page.evaluate("""
+                    window.scrollTo({
+                        top: document.body.scrollHeight,
+                        behavior: 'smooth'
+                    });
+                """)
+
+                await asyncio.sleep(2)  # 等待滚动完成
+
+                # 滚动回顶部
+                await self.page.evaluate("""
+                    window.scrollTo({
+                        top: 0,
+                        behavior: 'smooth'
+                    });
+                """)
+
             return await self.page.content()
-            
+
         except Exception as e:
-            print(f"访问出错: {str(e)}")  # 添加错误输出
-            return f"访问出错: {str(e)}"
-            
+            logger.debug(f"访问出错: {str(e)}")
+            return self._fail(f"访问出错: {str(e)}", type(e).__name__)
+
     async def close(self):
-        """关闭浏览器"""
-        if self.page:
-            await self.page.close()
-        if self.browser:
-            await self.browser.close()
-        if self.playwright:
-            await self.playwright.stop()
-            
+        """关闭页面并将上下文归还浏览器池"""
+        if self.ip_task and not self.ip_task.done():
+            self.ip_task.cancel()
+        if self.record:
+            self.record.resources = self.resource_stats.to_dict()
+        with self._phase('teardown'):
+            if self.page:
+                try:
+                    await self.page.close()
+                except Exception:
+                    pass
+                self.page = None
+            if self.lease:
+                await self.pool.release(self.lease)
+                self.lease = None
+
     def get_current_ip(self):
         """获取当前使用的IP"""
-        return self.current_ip 
\ No newline at end of file
+        return self.current_ip
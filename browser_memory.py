@@ -0,0 +1,89 @@
+import os
+
+try:
+    import psutil
+except ImportError:  # psutil 可选，没有时在 Linux 上直接读取 /proc
+    psutil = None
+
+# 启动浏览器时附加的标记参数前缀，Chromium 会忽略不认识的参数，
+# 用它在进程列表中找到对应的浏览器主进程
+MARKER_PREFIX = '--blacksurge-browser='
+
+
+def _proc_cmdline(pid):
+    try:
+        with open(f'/proc/{pid}/cmdline', 'rb') as f:
+            return f.read().decode('utf-8', 'replace').split('\0')
+    except OSError:
+        return []
+
+
+def _proc_children():
+    """返回 父进程ID -> [子进程ID] 的映射"""
+    children = {}
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f'/proc/{name}/stat', 'r') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # 进程名可能包含空格和括号，从最后一个右括号之后开始解析
+        ppid = int(stat[stat.rfind(')') + 2:].split()[1])
+        children.setdefault(ppid, []).append(int(name))
+    return children
+
+
+def _proc_rss(pid):
+    try:
+        with open(f'/proc/{pid}/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def find_marked_process(marker):
+    """查找命令行中带有标记参数的主进程，找不到或不支持时返回 None"""
+    if psutil:
+        for process in psutil.process_iter(['pid', 'cmdline']):
+            cmdline = process.info.get('cmdline') or []
+            if marker in cmdline:
+                return process.info['pid']
+        return None
+    if not os.path.isdir('/proc'):
+        return None
+    for name in os.listdir('/proc'):
+        if name.isdigit() and marker in _proc_cmdline(name):
+            return int(name)
+    return None
+
+
+def process_tree_rss(pid):
+    """进程及其所有子进程（渲染、GPU 等）的常驻内存之和（字节），进程不存在时返回 None"""
+    if psutil:
+        try:
+            root = psutil.Process(pid)
+            processes = [root] + root.children(recursive=True)
+        except psutil.Error:
+            return None
+        total = 0
+        for process in processes:
+            try:
+                total += process.memory_info().rss
+            except psutil.Error:
+                pass
+        return total
+    if not os.path.exists(f'/proc/{pid}'):
+        return None
+    children = _proc_children()
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        total += _proc_rss(current)
+        pending.extend(children.get(current, []))
+    return total
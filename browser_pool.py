@@ -0,0 +1,285 @@
+from browser_memory import MARKER_PREFIX, find_marked_process, process_tree_rss
+import asyncio
+import itertools
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Chromium 在部分平台上要求启动时带全局代理，上下文级代理才会生效；
+# 所有上下文都会覆盖代理设置，因此这里的地址不会被实际使用
+PER_CONTEXT_PROXY = {'server': 'http://per-context'}
+
+DEFAULT_LAUNCH_ARGS = [
+    '--start-maximized',
+    '--disable-infobars',
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--window-position=0,0',
+]
+
+# 节省内存的启动参数：固定的小窗口，关闭 GPU、扩展和后台网络，限制渲染进程数
+LEAN_LAUNCH_ARGS = [
+    '--disable-infobars',
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--window-size=1280,800',
+    '--disable-gpu',
+    '--disable-extensions',
+    '--disable-component-extensions-with-background-pages',
+    '--disable-background-networking',
+    '--disable-component-update',
+    '--disable-default-apps',
+    '--disable-sync',
+    '--disable-dev-shm-usage',
+    '--mute-audio',
+    '--no-first-run',
+]
+
+LEAN_VIEWPORT = {'width': 1280, 'height': 800}
+
+# 启动配置：名称 -> (显示名称, 启动参数, 上下文参数, 是否最大化窗口)
+LAUNCH_PROFILES = {
+    'default': ('标准（最大化窗口）', DEFAULT_LAUNCH_ARGS, {'no_viewport': True}, True),
+    'lean': ('节省内存（固定小窗口）', LEAN_LAUNCH_ARGS, {'viewport': LEAN_VIEWPORT}, False),
+}
+
+
+class PooledBrowser:
+    """池中的单个浏览器实例及其使用计数"""
+
+    def __init__(self, browser, slot, marker=None):
+        self.browser = browser
+        self.slot = slot
+        self.marker = marker  # 启动参数中的标记，用于找到浏览器进程
+        self.pid = None
+        self.rss = None       # 最近一次测得的进程树常驻内存（字节）
+        self.served = 0      # 已分配过的上下文数量
+        self.active = 0      # 当前未释放的上下文数量
+        self.retired = False
+        self.over_limit = False  # 内存超过上限，下次分配时重启
+
+    def is_usable(self, max_contexts):
+        if self.retired or self.over_limit or not self.browser.is_connected():
+            return False
+        return not max_contexts or self.served < max_contexts
+
+    def measure_rss(self):
+        """测量浏览器进程树的常驻内存（阻塞调用，应在线程池中执行）"""
+        if self.pid is None and self.marker:
+            self.pid = find_marked_process(self.marker)
+        if self.pid is not None:
+            self.rss = process_tree_rss(self.pid)
+        return self.rss
+
+
+class ContextLease:
+    """一次访问所占用的浏览器上下文"""
+
+    def __init__(self, context, owner, launch_time=0.0):
+        self.context = context
+        self.owner = owner
+        self.launch_time = launch_time  # 本次分配中重启浏览器的耗时（秒）
+
+
+class BrowserPool:
+    """浏览器池：只启动一次 Chromium，每次访问分配一个新的上下文
+
+    浏览器在分配过 max_contexts_per_browser 个上下文，或进程树内存超过
+    max_rss_mb 后重启；profile 为 LAUNCH_PROFILES 中的启动配置。
+    per_context_proxy 为 False 时不设置全局代理，未指定代理的上下文直接联网。
+    """
+
+    def __init__(self, size=1, headless=False, max_contexts_per_browser=50, profile='default',
+                 max_rss_mb=0, renderer_process_limit=4, per_context_proxy=True):
+        self.size = max(1, int(size))
+        self.headless = headless
+        self.max_contexts = max(0, int(max_contexts_per_browser or 0))
+        if profile not in LAUNCH_PROFILES:
+            logger.warning(f"未知的启动配置: {profile}，使用标准配置")
+            profile = 'default'
+        self.profile = profile
+        self.max_rss = int(max_rss_mb or 0) * 1024 * 1024
+        self.renderer_process_limit = int(renderer_process_limit or 0)
+        self.per_context_proxy = per_context_proxy
+        self.recycled_for_memory = 0
+        self.playwright = None
+        self.browsers = []
+        self.draining = []   # 已退役但仍有上下文在使用的浏览器
+        self.launch_count = 0
+        self._markers = itertools.count()
+        self._launching = {}  # 正在重启的槽位 -> 启动完成时设置结果的 Future
+        self._lock = asyncio.Lock()
+
+    async def start(self):
+        """启动 Playwright 并预先启动所有浏览器"""
+        if self.playwright:
+            return
+        # Playwright 导入较慢，只在真正启动浏览器时导入
+        from playwright.async_api import async_playwright
+        self.playwright = await async_playwright().start()
+        self.browsers = [None] * self.size
+        await asyncio.gather(*(self._replace(slot) for slot in range(self.size)))
+
+    @property
+    def maximize_window(self):
+        return LAUNCH_PROFILES[self.profile][3]
+
+    def context_options(self):
+        """启动配置对应的上下文参数"""
+        return dict(LAUNCH_PROFILES[self.profile][2])
+
+    async def _launch(self, marker):
+        """启动一个 Chromium 进程"""
+        args = list(LAUNCH_PROFILES[self.profile][1]) + [marker]
+        if self.profile == 'lean' and self.renderer_process_limit:
+            args.append(f'--renderer-process-limit={self.renderer_process_limit}')
+        options = {'headless': self.headless, 'args': args}
+        if self.per_context_proxy:
+            options['proxy'] = PER_CONTEXT_PROXY
+        browser = await self.playwright.chromium.launch(**options)
+        self.launch_count += 1
+        return browser
+
+    async def _replace(self, slot, reserve=False):
+        """为指定槽位启动新浏览器，旧浏览器在上下文全部释放后关闭
+
+        reserve 为 True 时新浏览器装入槽位的同时为调用方占用一个上下文。
+        """
+        marker = f"{MARKER_PREFIX}{os.getpid()}-{id(self)}-{next(self._markers)}-{slot}"
+        entry = PooledBrowser(await self._launch(marker), slot, marker)
+        if slot >= len(self.browsers):
+            # 启动期间浏览器池已关闭
+            await self._close_browser(entry)
+            raise RuntimeError("浏览器池已关闭")
+        if reserve:
+            entry.served += 1
+            entry.active += 1
+        old = self.browsers[slot]
+        self.browsers[slot] = entry
+        if old:
+            old.retired = True
+            if old.active == 0:
+                await self._close_browser(old)
+            else:
+                self.draining.append(old)
+        return entry
+
+    async def acquire(self, proxy=None, **context_options):
+        """分配一个带上下文级代理的新 BrowserContext
+
+        锁内只选择浏览器并登记重启，启动浏览器在锁外进行，不阻塞其他槽位的分配。
+        正在重启的槽位不参与选择；所有槽位都在重启时等待其中一个完成后重新选择。
+        """
+        if not self.playwright:
+            await self.start()
+
+        start = time.monotonic()
+        waited = False
+        while True:
+            future = None
+            async with self._lock:
+                idle = [b for b in self.browsers if b.slot not in self._launching]
+                if idle:
+                    entry = min(idle, key=lambda b: b.active)
+                    if entry.is_usable(self.max_contexts):
+                        entry.served += 1
+                        entry.active += 1
+                        break
+                    future = asyncio.get_running_loop().create_future()
+                    # 每个浏览器只分配一个上下文时，同一槽位可以同时启动多个浏览器
+                    if self.max_contexts != 1:
+                        self._launching[entry.slot] = future
+            waited = True
+            if future is None:
+                await asyncio.wait(list(self._launching.values()), return_when=asyncio.FIRST_COMPLETED)
+                continue
+            try:
+                entry = await self._replace(entry.slot, reserve=True)
+            finally:
+                if self._launching.get(entry.slot) is future:
+                    del self._launching[entry.slot]
+                future.set_result(None)
+            break
+        launch_time = time.monotonic() - start if waited else 0.0
+
+        if proxy:
+            context_options['proxy'] = {
+                'server': f"http://{proxy['host']}:{proxy['port']}",
+                'username': proxy['username'],
+                'password': proxy['password'],
+            }
+
+        try:
+            context = await entry.browser.new_context(**context_options)
+        except Exception:
+            await self._release_entry(entry)
+            raise
+        return ContextLease(context, entry, launch_time)
+
+    async def release(self, lease):
+        """关闭上下文并归还浏览器"""
+        if not lease:
+            return
+        try:
+            await lease.context.close()
+        except Exception:
+            pass
+        await self._release_entry(lease.owner)
+
+    async def _release_entry(self, entry):
+        entry.active = max(0, entry.active - 1)
+        if entry.retired and entry.active == 0:
+            if entry in self.draining:
+                self.draining.remove(entry)
+            await self._close_browser(entry)
+
+    async def _close_browser(self, entry):
+        try:
+            await entry.browser.close()
+        except Exception:
+            pass
+
+    async def check_memory(self):
+        """测量所有浏览器的内存，超过上限的标记为下次分配时重启，返回总内存（字节）"""
+        loop = asyncio.get_running_loop()
+        total = 0
+        for entry in [b for b in self.browsers if b]:
+            rss = await loop.run_in_executor(None, entry.measure_rss)
+            if rss is None:
+                continue
+            total += rss
+            if self.max_rss and rss > self.max_rss and not entry.over_limit:
+                entry.over_limit = True
+                self.recycled_for_memory += 1
+                logger.info(
+                    f"浏览器 {entry.slot + 1} 内存 {rss / 1048576:.0f} MB 超过上限 "
+                    f"{self.max_rss / 1048576:.0f} MB，将在下次分配时重启"
+                )
+        return total
+
+    def memory_stats(self):
+        """最近一次测得的各浏览器内存（MB）"""
+        return [round(b.rss / 1048576, 1) if b and b.rss is not None else None for b in self.browsers]
+
+    async def close(self, timeout=None):
+        """并发关闭所有浏览器并停止 Playwright，超过 timeout 秒时不再等待浏览器正常退出"""
+        entries = [entry for entry in self.browsers + self.draining if entry]
+        self.browsers = []
+        self.draining = []
+        if entries:
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(*(self._close_browser(entry) for entry in entries)),
+                    timeout
+                )
+            except asyncio.TimeoutError:
+                logger.warning("部分浏览器未能按时关闭，将随 Playwright 一起结束")
+        if self.playwright:
+            # 停止 Playwright 时会结束它启动的所有浏览器进程
+            try:
+                await self.playwright.stop()
+            except Exception:
+                pass
+            self.playwright = None
@@ -0,0 +1,246 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS plan (url TEXT PRIMARY KEY, planned INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS progress (
+    url TEXT PRIMARY KEY,
+    completed INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS inflight (
+    visit_id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL,
+    worker TEXT,
+    started_at REAL
+);
+"""
+
+# 任务状态：running 表示未正常结束（崩溃或强制退出）
+STATUS_RUNNING = 'running'
+STATUS_STOPPED = 'stopped'
+STATUS_FINISHED = 'finished'
+
+
+class Checkpoint:
+    """访问进度的断点记录，保存在 SQLite（WAL 模式）中
+
+    记录本次任务的访问计划（URL列表或URL文件路径）、每个URL已成功/失败的次数，
+    以及正在进行中的访问。开始和结束访问只写入内存缓冲区，由 flush() 批量写入一个事务；
+    同一批次内开始又结束的访问不会写入进行中表。
+    崩溃时最多丢失最后一批未写入的结果，这些访问在恢复后会重新进行。
+    被停止（取消）的访问不计入结果，恢复后同样会重新访问。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        self._db_lock = threading.Lock()
+        self._buffer_lock = threading.Lock()
+        self._started = {}   # 尚未写入的开始记录 visit_id -> (url, worker, 开始时间)
+        self._finished = []  # 尚未写入的结束记录 (visit_id, url, 'completed'/'failed'/'cancelled')
+        self._written = set()  # 已写入进行中表的 visit_id
+
+    @property
+    def pending(self):
+        return len(self._started) + len(self._finished)
+
+    def _set_meta(self, values):
+        self._conn.executemany(
+            'INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+            [(key, str(value)) for key, value in values.items()]
+        )
+
+    def start_run(self, url_file='', entries=()):
+        """开始新任务：清空旧记录并保存访问计划
+
+        url_file 不为空时只记录文件路径（恢复时重新流式读取），否则保存 entries [(url, count), ...]。
+        """
+        with self._db_lock, self._conn:
+            for table in ('meta', 'plan', 'progress', 'inflight'):
+                self._conn.execute(f'DELETE FROM {table}')
+            self._set_meta({
+                'status': STATUS_RUNNING,
+                'url_file': url_file or '',
+                'started_at': time.time(),
+                'updated_at': time.time(),
+            })
+            if not url_file:
+                self._conn.executemany(
+                    'INSERT INTO plan (url, planned) VALUES (?, ?) '
+                    'ON CONFLICT(url) DO UPDATE SET planned = planned + excluded.planned',
+                    entries
+                )
+            self._written.clear()
+
+    def resume_run(self):
+        """继续上次的任务，返回上次中断时仍在进行的访问数（这些访问会重新进行）"""
+        with self._db_lock, self._conn:
+            interrupted = self._conn.execute('SELECT COUNT(*) FROM inflight').fetchone()[0]
+            self._conn.execute('DELETE FROM inflight')
+            self._set_meta({'status': STATUS_RUNNING, 'updated_at': time.time()})
+            self._written.clear()
+        return interrupted
+
+    def begin(self, visit_id, url, worker=''):
+        """记录一次访问开始（只写缓冲区）"""
+        with self._buffer_lock:
+            self._started[visit_id] = (url, worker, time.time())
+
+    def finish(self, visit_id, url, outcome):
+        """记录一次访问结束，outcome 为 'completed'、'failed' 或 'cancelled'"""
+        with self._buffer_lock:
+            if self._started.pop(visit_id, None) is not None and outcome == 'cancelled':
+                return
+            self._finished.append((visit_id, url, outcome))
+
+    def flush(self):
+        """把缓冲区批量写入数据库（阻塞调用，应在线程池中执行），返回写入的记录数"""
+        with self._buffer_lock:
+            started, self._started = self._started, {}
+            finished, self._finished = self._finished, []
+        if not started and not finished:
+            return 0
+
+        counts = {}
+        for _, url, outcome in finished:
+            if outcome == 'cancelled':
+                continue
+            count = counts.setdefault(url, [0, 0])
+            count[0 if outcome == 'completed' else 1] += 1
+
+        # 定期写入与关闭时的写入可能在不同线程同时进行，_written 只在持有数据库锁时读写，
+        # 否则另一批正在写入进行中表的访问可能漏删
+        with self._db_lock, self._conn:
+            ended = [visit_id for visit_id, _, _ in finished if visit_id in self._written]
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO inflight (visit_id, url, worker, started_at) VALUES (?, ?, ?, ?)',
+                [(visit_id, url, worker, at) for visit_id, (url, worker, at) in started.items()]
+            )
+            self._conn.executemany('DELETE FROM inflight WHERE visit_id = ?', [(i,) for i in ended])
+            self._conn.executemany(
+                'INSERT INTO progress (url, completed, failed) VALUES (?, ?, ?) '
+                'ON CONFLICT(url) DO UPDATE SET completed = completed + excluded.completed, '
+                'failed = failed + excluded.failed',
+                [(url, completed, failed) for url, (completed, failed) in counts.items()]
+            )
+            self._set_meta({'updated_at': time.time()})
+            self._written.update(started)
+            self._written.difference_update(ended)
+        return len(started) + len(finished)
+
+    def set_status(self, status):
+        with self._db_lock, self._conn:
+            self._set_meta({'status': status, 'updated_at': time.time()})
+
+    def load(self):
+        """读取断点记录
+
+        返回 {'status', 'url_file', 'plan': [(url, planned)], 'progress': {url: (completed, failed)},
+        'inflight'}，没有任务记录时返回 None。
+        """
+        with self._db_lock:
+            meta = dict(self._conn.execute('SELECT key, value FROM meta'))
+            if 'status' not in meta:
+                return None
+            return {
+                'status': meta['status'],
+                'url_file': meta.get('url_file', ''),
+                'plan': self._conn.execute('SELECT url, planned FROM plan ORDER BY rowid').fetchall(),
+                'progress': {
+                    url: (completed, failed)
+                    for url, completed, failed in self._conn.execute(
+                        'SELECT url, completed, failed FROM progress'
+                    )
+                },
+                'inflight': self._conn.execute('SELECT COUNT(*) FROM inflight').fetchone()[0],
+            }
+
+    def close(self):
+        with self._db_lock:
+            self._conn.close()
+
+
+def open_checkpoint(path, task_source, resume=False):
+    """打开断点文件并开始新任务或继续上次的任务（阻塞调用）
+
+    新任务按任务源记录访问计划：流式读取的URL文件只记录路径，其余记录 snapshot()。
+    返回 (Checkpoint, 上次中断时仍在进行的访问数)。
+    """
+    checkpoint = Checkpoint(path)
+    interrupted = 0
+    if resume:
+        interrupted = checkpoint.resume_run()
+    elif hasattr(task_source, 'snapshot'):
+        checkpoint.start_run(entries=task_source.snapshot())
+    else:
+        checkpoint.start_run(url_file=task_source.path)
+    return checkpoint, interrupted
+
+
+def close_checkpoint(checkpoint, all_done):
+    """写入剩余的进度和任务状态后关闭（阻塞调用）"""
+    try:
+        checkpoint.flush()
+        checkpoint.set_status(STATUS_FINISHED if all_done else STATUS_STOPPED)
+    except Exception as e:
+        logger.warning(f"写入断点文件失败: {str(e)}")
+    finally:
+        checkpoint.close()
+
+
+def remaining_entries(plan, progress):
+    """按已完成和失败的次数扣减访问计划，返回仍需访问的 [(url, count), ...]"""
+    entries = []
+    for url, planned in plan:
+        completed, failed = progress.get(url, (0, 0))
+        if planned - completed - failed > 0:
+            entries.append((url, planned - completed - failed))
+    return entries
+
+
+def build_resume_source(path, on_error=None):
+    """根据断点文件重建剩余的访问任务，返回 (任务源, 断点记录)
+
+    断点文件不存在或没有任务记录时抛出 FileNotFoundError。
+    """
+    from task_store import WeightedTaskStore
+    from url_source import StreamingTaskSource
+
+    if not path or not os.path.exists(path):
+        raise FileNotFoundError(f"断点文件不存在: {path}")
+    checkpoint = Checkpoint(path)
+    try:
+        state = checkpoint.load()
+    finally:
+        checkpoint.close()
+    if state is None:
+        raise FileNotFoundError(f"断点文件中没有任务记录: {path}")
+
+    done = {url: completed + failed for url, (completed, failed) in state['progress'].items()}
+    if state['url_file']:
+        if not os.path.exists(state['url_file']):
+            raise FileNotFoundError(f"URL文件不存在: {state['url_file']}")
+        return StreamingTaskSource(state['url_file'], on_error=on_error, done=done), state
+    return WeightedTaskStore(remaining_entries(state['plan'], state['progress'])), state
+
+
+def describe_state(state):
+    """断点记录的简要说明，用于日志"""
+    completed = sum(c for c, _ in state['progress'].values())
+    failed = sum(f for _, f in state['progress'].values())
+    text = f"已成功 {completed} 次，失败 {failed} 次"
+    if state['inflight']:
+        text += f"，中断时有 {state['inflight']} 个访问正在进行（将重新访问）"
+    if state['status'] == STATUS_FINISHED:
+        text += "，上次任务已全部完成"
+    return text
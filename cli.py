@@ -0,0 +1,541 @@
+"""命令行入口，不依赖 PyQt，适合在无显示器的服务器上运行
+
+用法:
+    python -m cli run --config config.json
+    python -m cli run --job job.json --urls-file urls.txt.gz --log-file run.log
+    python -m cli run --resume
+    python -m cli coordinator --config config.json --listen 0.0.0.0:8765
+    python -m cli agent --connect 192.168.1.10:8765 --concurrency 10
+    python -m cli measure-memory --url https://example.com --workers 5
+    python -m cli bench --workers 5 --visits 50 --output bench.json
+    python -m cli bench-matrix --output bench_baseline.json
+    python -m cli bench-compare --baseline bench_baseline.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import re
+import signal
+import sys
+from browser_controller import USER_AGENT
+from browser_pool import BrowserPool, LAUNCH_PROFILES
+from checkpoint import build_resume_source, describe_state
+from config_store import load_config, build_settings, build_task_source
+from distributed import Agent, Coordinator, parse_address
+from engine import VisitEngine
+from proxy_manager import ProxyManager
+from proxy_balancer import BALANCE_STRATEGIES
+from resource_policy import POLICY_PRESETS
+from sharding import ShardedEngine
+
+logger = logging.getLogger('cli')
+
+
+class ConsoleReporter:
+    """把日志和引擎事件写到标准输出或日志文件"""
+
+    def __init__(self, log_file=None, quiet=False, level=logging.INFO):
+        self.stream = open(log_file, 'a', encoding='utf-8') if log_file else sys.stdout
+        self.handler = logging.StreamHandler(self.stream)
+        self.handler.setFormatter(logging.Formatter('[%(asctime)s] %(message)s', '%H:%M:%S'))
+        root = logging.getLogger()
+        root.addHandler(self.handler)
+        # 安静模式只输出警告以上的日志，进度信息始终输出
+        root.setLevel(logging.WARNING if quiet else level)
+        logger.setLevel(logging.INFO)
+
+    def write(self, message):
+        logger.info(message)
+
+    def on_event(self, name, data):
+        if name == 'progress':
+            done = data['completed'] + data['failed']
+            text = f"进度: {done} / {data['total']} (成功 {data['completed']}，失败 {data['failed']})"
+            if data.get('shards', 1) > 1:
+                text += f" 进程: {data['shards']}"
+            if 'agents' in data:
+                text += f" 工作节点: {data['agents']}"
+            if 'concurrency' in data:
+                text += f" 并发: {data['concurrency']}"
+            if 'browser_rss_mb' in data:
+                text += f" 浏览器内存: {data['browser_rss_mb']:.0f} MB"
+            pool = data.get('session_pool')
+            if pool:
+                text += f" 会话池: {pool['depth']} 个可用，命中率 {pool['hit_rate']:.0%}"
+            proxies = data.get('proxies')
+            if proxies:
+                text += f" 代理入口: {proxies['available']}/{proxies['total']} 可用"
+            self.write(text)
+        elif name == 'stopping':
+            self.write(f"正在停止: 剩余 {data['visits']} 个访问，{data['browsers']} 个浏览器")
+        elif name == 'finished':
+            self.write(f"任务结束: 成功 {data['completed']}，失败 {data['failed']}，计划 {data['total']}")
+
+    def close(self):
+        logging.getLogger().removeHandler(self.handler)
+        if self.stream is not sys.stdout:
+            self.stream.close()
+
+
+def load_run_config(args):
+    """合并配置文件、任务文件和命令行参数"""
+    config = load_config(args.config)
+    if args.job:
+        with open(args.job, 'r', encoding='utf-8') as f:
+            config.update(json.load(f))
+    if args.urls_file:
+        config['url_file'] = args.urls_file
+    if args.proxy:
+        config['proxy_string'] = '\n'.join(args.proxy)
+    if args.proxy_file:
+        config['proxy_file'] = args.proxy_file
+    if args.proxy_balance:
+        config['proxy_balance'] = args.proxy_balance
+    if args.concurrency:
+        config['thread_count'] = args.concurrency
+    if args.shards:
+        config['shards'] = args.shards
+    if args.adaptive:
+        config['adaptive_concurrency'] = True
+    if args.min_concurrency:
+        config['adaptive_min_workers'] = args.min_concurrency
+    if args.metrics_file:
+        config['metrics_file'] = args.metrics_file
+    if args.web_vitals:
+        config['collect_web_vitals'] = True
+    if args.vitals_file:
+        config['collect_web_vitals'] = True
+        config['vitals_file'] = args.vitals_file
+    if args.checkpoint is not None:
+        config['checkpoint_file'] = args.checkpoint
+    if args.no_ip_check:
+        config['ip_check'] = False
+    if args.ip_check_url:
+        config['ip_check_url'] = args.ip_check_url
+    if args.resource_policy:
+        config['resource_policy'] = args.resource_policy
+    if args.launch_profile:
+        config['launch_profile'] = args.launch_profile
+    if args.max_browser_rss is not None:
+        config['max_browser_rss_mb'] = args.max_browser_rss
+    if args.session_pool is not None:
+        config['session_pool_size'] = args.session_pool
+    if args.session_reuse is not None:
+        config['session_reuse_visits'] = args.session_reuse
+    if args.session_reuse_seconds is not None:
+        config['session_reuse_seconds'] = args.session_reuse_seconds
+    # 命令行默认无头运行，除非显式要求显示浏览器
+    config['headless'] = not args.headed
+    return config
+
+
+def _add_signal_handlers(stop):
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop)
+        except (NotImplementedError, RuntimeError):
+            pass
+
+
+async def run_job(config, reporter, resume=False, listen=None):
+    """运行一次访问任务，收到 SIGINT/SIGTERM 时停止
+
+    resume 为 True 时按断点文件继续上次未完成的任务；
+    listen 为 (host, port) 时作为协调节点，把任务分发给连接上来的工作节点。
+    """
+    proxy_manager = ProxyManager(config['proxy_string'], proxy_file=config.get('proxy_file'))
+    if not proxy_manager.has_proxy():
+        logger.error("请先设置代理")
+        return 2
+
+    on_error = lambda line: logger.warning(f"错误的访问次数格式: {line}")
+    if resume:
+        task_source, state = build_resume_source(config['checkpoint_file'], on_error=on_error)
+        logger.info(f"恢复任务: {describe_state(state)}")
+        if task_source.exhausted and not len(task_source):
+            logger.info("没有剩余的访问任务")
+            return 0
+    else:
+        task_source = build_task_source(config, on_error=on_error)
+        if task_source.exhausted and not len(task_source):
+            logger.error("请输入要访问的URL")
+            return 2
+
+    if listen:
+        engine = Coordinator(
+            task_source, config, build_settings(config), listen[0], listen[1],
+            token=config.get('cluster_token', ''), on_event=reporter.on_event, resume=resume
+        )
+    elif config['shards'] > 1:
+        engine = ShardedEngine(
+            task_source, config, build_settings(config), config['shards'],
+            on_event=reporter.on_event, resume=resume
+        )
+    else:
+        engine = VisitEngine(
+            task_source,
+            proxy_manager.get_current_proxy,
+            build_settings(config),
+            on_event=reporter.on_event,
+            proxy_balancer=proxy_manager.balancer,
+            resume=resume
+        )
+
+    _add_signal_handlers(engine.stop)
+    progress = await engine.run()
+    return 0 if progress['failed'] == 0 else 1
+
+
+def cmd_run(args):
+    config = load_run_config(args)
+    reporter = ConsoleReporter(args.log_file, args.quiet, logging.DEBUG if args.verbose else logging.INFO)
+    try:
+        return asyncio.run(run_job(config, reporter, resume=args.resume))
+    except FileNotFoundError as e:
+        logger.error(str(e))
+        return 2
+    finally:
+        reporter.close()
+
+
+async def measure_profile(profile, url, workers, settle, headless, proxy_manager):
+    """用一个浏览器打开 workers 个页面，返回启动配置的内存占用（MB）"""
+    pool = BrowserPool(
+        size=1, headless=headless, max_contexts_per_browser=0,
+        profile=profile, per_context_proxy=proxy_manager is not None
+    )
+    leases = []
+    try:
+        await pool.start()
+        await asyncio.sleep(settle)
+        baseline = await pool.check_memory()
+
+        async def open_page():
+            proxy = proxy_manager.get_current_proxy() if proxy_manager else None
+            lease = await pool.acquire(
+                proxy, ignore_https_errors=True, user_agent=USER_AGENT, **pool.context_options()
+            )
+            leases.append(lease)
+            page = await lease.context.new_page()
+            try:
+                await page.goto(url, wait_until='load', timeout=60000)
+            except Exception as e:
+                logger.warning(f"[{profile}] 打开页面失败: {str(e)}")
+
+        await asyncio.gather(*(open_page() for _ in range(workers)))
+        await asyncio.sleep(settle)
+        total = await pool.check_memory()
+        return {
+            'baseline_mb': round(baseline / 1048576, 1),
+            'total_mb': round(total / 1048576, 1),
+            'per_worker_mb': round((total - baseline) / 1048576 / workers, 1),
+        }
+    finally:
+        for lease in leases:
+            await pool.release(lease)
+        await pool.close()
+
+
+async def measure_memory(args):
+    config = load_config(args.config)
+    proxy_manager = None
+    if args.proxy:
+        proxy_manager = ProxyManager('\n'.join(args.proxy), proxy_file=config.get('proxy_file'))
+    results = {'url': args.url, 'workers': args.workers, 'profiles': {}}
+    for profile in args.profiles.split(','):
+        logger.info(f"正在测量启动配置: {profile}")
+        results['profiles'][profile] = await measure_profile(
+            profile, args.url, args.workers, args.settle, not args.headed, proxy_manager
+        )
+    profiles = results['profiles']
+    if 'default' in profiles and 'lean' in profiles and profiles['default']['per_worker_mb']:
+        results['lean_saving'] = round(
+            1 - profiles['lean']['per_worker_mb'] / profiles['default']['per_worker_mb'], 3
+        )
+    return results
+
+
+def cmd_coordinator(args):
+    config = load_run_config(args)
+    if args.token is not None:
+        config['cluster_token'] = args.token
+    if args.agent_timeout:
+        config['agent_timeout'] = args.agent_timeout
+    reporter = ConsoleReporter(args.log_file, args.quiet, logging.DEBUG if args.verbose else logging.INFO)
+    try:
+        listen = parse_address(args.listen or config['cluster_listen'])
+        return asyncio.run(run_job(config, reporter, resume=args.resume, listen=listen))
+    except (FileNotFoundError, ValueError, OSError) as e:
+        logger.error(str(e))
+        return 2
+    finally:
+        reporter.close()
+
+
+async def run_agent(args, config, reporter):
+    """作为工作节点运行，收到 SIGINT/SIGTERM 时停止，未完成的任务由协调节点重新分配"""
+    host, port = parse_address(args.connect, default_host='127.0.0.1')
+    token = args.token if args.token is not None else config.get('cluster_token', '')
+    agent = Agent(host, port, name=args.name, capacity=args.concurrency or 0, token=token,
+                  headless=not args.headed, on_event=reporter.on_event)
+    _add_signal_handlers(agent.stop)
+    progress = await agent.run()
+    return 0 if progress['failed'] == 0 else 1
+
+
+def cmd_agent(args):
+    config = load_config(args.config)
+    reporter = ConsoleReporter(args.log_file, args.quiet, logging.DEBUG if args.verbose else logging.INFO)
+    try:
+        return asyncio.run(run_agent(args, config, reporter))
+    except (ValueError, OSError) as e:
+        logger.error(f"无法连接协调节点: {str(e)}")
+        return 2
+    finally:
+        reporter.close()
+
+
+def _bench_logging(verbose):
+    # 日志输出到标准错误，标准输出只有结果
+    logging.basicConfig(
+        level=logging.INFO if verbose else logging.WARNING,
+        format='[%(asctime)s] %(message)s', datefmt='%H:%M:%S', stream=sys.stderr
+    )
+
+
+def _write_json(data, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def cmd_bench(args):
+    _bench_logging(args.verbose)
+    from benchmark import run_benchmark
+
+    scenario = {
+        'name': args.name,
+        'workers': args.workers,
+        'visits': args.visits,
+        'pages': args.pages,
+        'page_kb': args.page_kb,
+        'assets': args.assets,
+        'asset_kb': args.asset_kb,
+        'latency_ms': args.latency_ms,
+        'proxy_latency_ms': args.proxy_latency_ms,
+        'resource_policy': args.resource_policy,
+        'launch_profile': args.launch_profile,
+        'max_contexts_per_browser': args.max_contexts_per_browser,
+        'browser_count': args.browsers,
+        'ip_check': not args.no_ip_check,
+        'stop_probe': not args.no_stop_probe,
+        'web_vitals': args.web_vitals,
+        'headless': not args.headed,
+    }
+    result = asyncio.run(run_benchmark(scenario))
+    if args.output:
+        _write_json(result, args.output)
+    else:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0 if result['completed'] else 1
+
+
+def _matrix(args):
+    from bench_compare import build_matrix, filter_matrix
+
+    scenarios = filter_matrix(build_matrix(args.visits_per_worker), args.only)
+    if not scenarios:
+        raise ValueError(f"没有匹配的场景: {args.only}")
+    return scenarios
+
+
+def cmd_bench_matrix(args):
+    _bench_logging(args.verbose)
+    from bench_compare import run_matrix
+
+    try:
+        results = asyncio.run(run_matrix(_matrix(args), args.repeat))
+    except ValueError as e:
+        logger.error(str(e))
+        return 2
+    _write_json(results, args.output)
+    logger.info(f"已保存 {len(results['scenarios'])} 个场景的结果: {args.output}")
+    return 0
+
+
+def cmd_bench_compare(args):
+    _bench_logging(args.verbose)
+    from bench_compare import MATRIX_VERSION, compare, format_report, has_regression, run_matrix
+
+    # 用户指定的 --only 排除的基线场景不要求有结果
+    only = args.only
+    try:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('version') != MATRIX_VERSION:
+            logger.warning("基线由旧版本记录（当时 per-visit 场景的浏览器串行启动），建议重新记录基线")
+        if args.results:
+            with open(args.results, 'r', encoding='utf-8') as f:
+                results = json.load(f)
+        else:
+            # 默认只运行基线中已有的场景
+            args.only = only or '^(' + '|'.join(re.escape(name) for name in baseline['scenarios']) + ')$'
+            results = asyncio.run(run_matrix(_matrix(args), args.repeat))
+            if args.save:
+                _write_json(results, args.save)
+    except (OSError, ValueError, KeyError) as e:
+        logger.error(f"无法比较基准结果: {str(e)}")
+        return 2
+
+    thresholds = {
+        'visits_per_sec': args.throughput_drop,
+        'p95_latency_s': args.latency_rise,
+        'rss_per_worker_mb': args.rss_rise,
+    }
+    rows = compare(baseline, results, {k: v for k, v in thresholds.items() if v is not None}, only)
+    print(format_report(rows))
+    if args.report:
+        _write_json({'rows': rows, 'regression': has_regression(rows)}, args.report)
+    return 1 if has_regression(rows) else 0
+
+
+def cmd_measure_memory(args):
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(message)s', datefmt='%H:%M:%S')
+    for profile in args.profiles.split(','):
+        if profile not in LAUNCH_PROFILES:
+            logger.error(f"未知的启动配置: {profile}")
+            return 2
+    results = asyncio.run(measure_memory(args))
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    return 0
+
+
+def add_job_arguments(parser):
+    """run 和 coordinator 共用的任务参数"""
+    parser.add_argument('--config', default='config.json', help='配置文件，默认 config.json')
+    parser.add_argument('--job', help='任务文件（JSON），覆盖配置文件中的同名项')
+    parser.add_argument('--urls-file', help='URL文件（支持 .gz），每行 网址----次数')
+    parser.add_argument('--proxy', action='append', help='代理: 服务器:端口:用户名格式:密码，可重复指定多个入口')
+    parser.add_argument('--proxy-file', help='代理列表文件，每行一个入口')
+    parser.add_argument('--proxy-balance', choices=list(BALANCE_STRATEGIES), help='多个代理入口的负载均衡策略')
+    parser.add_argument('--concurrency', type=int, help='并发访问数（自适应模式下为上限）')
+    parser.add_argument('--shards', type=int, help='工作进程数，大于 1 时多进程分片运行，并发数为所有进程之和')
+    parser.add_argument('--adaptive', action='store_true', help='根据主机负载和失败率自动调整并发数')
+    parser.add_argument('--min-concurrency', type=int, help='自适应模式的最小并发数')
+    parser.add_argument('--metrics-file', help='访问记录文件，.csv 结尾写 CSV，否则写 JSONL')
+    parser.add_argument('--web-vitals', action='store_true', help='采集页面性能指标（TTFB、DCL、load、LCP），结束时按URL汇总')
+    parser.add_argument('--vitals-file', help='页面性能报告文件（JSON），指定时自动采集页面性能指标')
+    parser.add_argument('--checkpoint', help='断点文件（SQLite），默认使用配置中的 checkpoint_file，空字符串表示不记录')
+    parser.add_argument('--resume', action='store_true', help='按断点文件继续上次未完成的任务')
+    parser.add_argument('--no-ip-check', action='store_true', help='不查询出口IP')
+    parser.add_argument('--ip-check-url', help='出口IP查询地址，默认 http://httpbin.org/ip')
+    parser.add_argument('--resource-policy', choices=list(POLICY_PRESETS), help='资源策略')
+    parser.add_argument('--session-pool', type=int, help='预热校验的代理会话数量，0 表示不预热')
+    parser.add_argument('--session-reuse', type=int, help='同一代理会话最多访问次数，1 表示每次换新会话，0 表示不限')
+    parser.add_argument('--session-reuse-seconds', type=int, help='同一代理会话最多复用秒数，0 表示只受 sessTime 限制')
+    parser.add_argument('--launch-profile', choices=list(LAUNCH_PROFILES), help='浏览器启动配置')
+    parser.add_argument('--max-browser-rss', type=int, help='单个浏览器进程树内存上限（MB），超过后重启，0 表示不限')
+    parser.add_argument('--headed', action='store_true', help='显示浏览器窗口')
+    parser.add_argument('--log-file', help='日志输出文件，默认输出到标准输出')
+    parser.add_argument('--quiet', action='store_true', help='只输出进度和警告，不输出每次访问的日志')
+    parser.add_argument('--verbose', action='store_true', help='输出调试日志')
+
+
+def add_matrix_arguments(parser):
+    """bench-matrix 和 bench-compare 共用的参数"""
+    parser.add_argument('--only', help='只运行名称匹配该正则表达式的场景，如 pooled-.*-w5')
+    parser.add_argument('--repeat', type=int, default=3, help='每个场景重复运行的次数')
+    parser.add_argument('--visits-per-worker', type=int, default=4, help='每个并发的访问次数')
+    parser.add_argument('--verbose', action='store_true', help='输出运行日志')
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m cli', description='代理IP网站访问工具（命令行模式）')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='按配置运行访问任务')
+    add_job_arguments(run_parser)
+    run_parser.set_defaults(func=cmd_run)
+
+    coordinator_parser = subparsers.add_parser('coordinator', help='作为协调节点，把任务分发给多台机器上的工作节点')
+    add_job_arguments(coordinator_parser)
+    coordinator_parser.add_argument('--listen', help='监听地址 主机:端口，默认使用配置中的 cluster_listen')
+    coordinator_parser.add_argument('--token', help='工作节点连接口令，默认使用配置中的 cluster_token')
+    coordinator_parser.add_argument('--agent-timeout', type=float, help='工作节点超过多少秒没有心跳时收回它的任务')
+    coordinator_parser.set_defaults(func=cmd_coordinator)
+
+    agent_parser = subparsers.add_parser('agent', help='作为工作节点，从协调节点领取任务访问')
+    agent_parser.add_argument('--connect', required=True, help='协调节点地址 主机:端口')
+    agent_parser.add_argument('--config', default='config.json', help='配置文件（只读取 cluster_token），默认 config.json')
+    agent_parser.add_argument('--name', default='', help='节点名称，默认使用主机名')
+    agent_parser.add_argument('--concurrency', type=int, help='本节点的并发数，默认使用协调节点配置的 thread_count')
+    agent_parser.add_argument('--token', help='连接口令，默认使用配置中的 cluster_token')
+    agent_parser.add_argument('--headed', action='store_true', help='显示浏览器窗口')
+    agent_parser.add_argument('--log-file', help='日志输出文件，默认输出到标准输出')
+    agent_parser.add_argument('--quiet', action='store_true', help='只输出进度和警告，不输出每次访问的日志')
+    agent_parser.add_argument('--verbose', action='store_true', help='输出调试日志')
+    agent_parser.set_defaults(func=cmd_agent)
+
+    measure_parser = subparsers.add_parser('measure-memory', help='测量各启动配置下每个并发的内存占用')
+    measure_parser.add_argument('--config', default='config.json', help='配置文件，默认 config.json')
+    measure_parser.add_argument('--url', default='about:blank', help='测量时打开的页面')
+    measure_parser.add_argument('--workers', type=int, default=5, help='同时打开的页面数')
+    measure_parser.add_argument('--profiles', default=','.join(LAUNCH_PROFILES), help='要测量的启动配置，逗号分隔')
+    measure_parser.add_argument('--settle', type=float, default=5, help='打开页面后等待的秒数')
+    measure_parser.add_argument('--proxy', action='append', help='通过代理打开页面，默认直接联网')
+    measure_parser.add_argument('--headed', action='store_true', help='显示浏览器窗口')
+    measure_parser.set_defaults(func=cmd_measure_memory)
+
+    bench_parser = subparsers.add_parser('bench', help='用本地目标网站和代理替身测量访问引擎的性能，输出 JSON')
+    bench_parser.add_argument('--name', default='default', help='场景名称，写入结果')
+    bench_parser.add_argument('--workers', type=int, default=5, help='并发访问数')
+    bench_parser.add_argument('--visits', type=int, default=50, help='访问次数')
+    bench_parser.add_argument('--pages', type=int, default=10, help='不同页面的数量')
+    bench_parser.add_argument('--page-kb', type=int, default=64, help='页面HTML大小（KB）')
+    bench_parser.add_argument('--assets', type=int, default=4, help='每个页面的图片数量')
+    bench_parser.add_argument('--asset-kb', type=int, default=16, help='每张图片的大小（KB）')
+    bench_parser.add_argument('--latency-ms', type=int, default=50, help='目标网站每个响应的延迟（毫秒）')
+    bench_parser.add_argument('--proxy-latency-ms', type=int, default=20, help='代理替身建立上游连接前的延迟（毫秒）')
+    bench_parser.add_argument('--resource-policy', choices=list(POLICY_PRESETS), default='full', help='资源策略')
+    bench_parser.add_argument('--launch-profile', choices=list(LAUNCH_PROFILES), default='default', help='浏览器启动配置')
+    bench_parser.add_argument('--max-contexts-per-browser', type=int, default=50,
+                              help='每个浏览器服务的访问次数，1 表示每次访问都启动新浏览器')
+    bench_parser.add_argument('--browsers', type=int, default=0, help='浏览器数量，0 表示每 5 个并发一个')
+    bench_parser.add_argument('--no-ip-check', action='store_true', help='不查询出口IP')
+    bench_parser.add_argument('--no-stop-probe', action='store_true', help='不测量停止耗时')
+    bench_parser.add_argument('--web-vitals', action='store_true', help='同时采集并按URL汇总页面性能指标')
+    bench_parser.add_argument('--headed', action='store_true', help='显示浏览器窗口')
+    bench_parser.add_argument('--output', help='结果文件，默认输出到标准输出')
+    bench_parser.add_argument('--verbose', action='store_true', help='输出运行日志')
+    bench_parser.set_defaults(func=cmd_bench)
+
+    matrix_parser = subparsers.add_parser('bench-matrix', help='运行基准场景矩阵，结果可作为性能基线')
+    matrix_parser.add_argument('--output', default='bench_baseline.json', help='结果文件，默认 bench_baseline.json')
+    add_matrix_arguments(matrix_parser)
+    matrix_parser.set_defaults(func=cmd_bench_matrix)
+
+    compare_parser = subparsers.add_parser('bench-compare', help='运行基准场景矩阵并与基线比较，出现回归时返回 1')
+    compare_parser.add_argument('--baseline', default='bench_baseline.json', help='基线文件，默认 bench_baseline.json')
+    compare_parser.add_argument('--results', help='使用已保存的结果（bench-matrix 的输出），不重新运行')
+    compare_parser.add_argument('--save', help='保存本次运行的结果')
+    compare_parser.add_argument('--report', help='比较结果写入 JSON 文件')
+    compare_parser.add_argument('--throughput-drop', type=float, help='吞吐量下降超过该比例判为回归，默认 0.10')
+    compare_parser.add_argument('--latency-rise', type=float, help='p95 耗时上升超过该比例判为回归，默认 0.15')
+    compare_parser.add_argument('--rss-rise', type=float, help='每个并发的内存上升超过该比例判为回归，默认 0.15')
+    add_matrix_arguments(compare_parser)
+    compare_parser.set_defaults(func=cmd_bench_compare)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    # 打包成可执行文件后，多进程分片的工作进程也从这里启动，需要先交给 multiprocessing 处理
+    multiprocessing.freeze_support()
+    sys.exit(main())
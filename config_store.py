@@ -0,0 +1,217 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from task_store import WeightedTaskStore, parse_url_text
+from url_source import StreamingTaskSource
+
+logger = logging.getLogger(__name__)
+
+CONFIG_FILE = 'config.json'
+
+# 所有配置项及默认值，GUI 和命令行共用
+DEFAULT_CONFIG = {
+    'urls': '',
+    'url_file': '',
+    'proxy_string': '',
+    'proxy_file': '',
+    'proxy_balance': 'ewma',
+    'proxy_eject_failures': 3,
+    'proxy_eject_seconds': 60,
+    'thread_count': 5,
+    'adaptive_concurrency': False,
+    'adaptive_min_workers': 1,
+    'adaptive_interval': 10,
+    'adaptive_cpu_high': 85,
+    'adaptive_mem_low': 15,
+    'adaptive_max_failure_rate': 0.3,
+    'browser_count': 0,
+    'shards': 1,
+    'cluster_listen': '0.0.0.0:8765',
+    'cluster_token': '',
+    'agent_timeout': 30,
+    'max_contexts_per_browser': 50,
+    'launch_profile': 'default',
+    'max_browser_rss_mb': 0,
+    'renderer_process_limit': 4,
+    'min_time': 10,
+    'max_time': 20,
+    'min_interval': 5,
+    'max_interval': 15,
+    'stop_timeout': 10,
+    'headless': False,
+    'metrics_file': '',
+    'checkpoint_file': 'checkpoint.db',
+    'checkpoint_interval': 2,
+    'collect_web_vitals': False,
+    'vitals_file': '',
+    'ip_check': True,
+    'ip_check_url': 'http://httpbin.org/ip',
+    'resource_policy': 'full',
+    'block_resource_types': [],
+    'allow_domains': [],
+    'deny_domains': [],
+    'session_pool_size': 0,
+    'session_validate_concurrency': 5,
+    'session_max_age': 300,
+    'session_reuse_visits': 1,
+    'session_reuse_seconds': 0,
+}
+
+
+def urls_path(path=CONFIG_FILE):
+    """URL 列表单独保存的文件，例如 config.json -> config.urls.txt"""
+    return os.path.splitext(path)[0] + '.urls.txt'
+
+
+def atomic_write(path, text):
+    """先写临时文件再替换，写入途中崩溃也不会留下损坏的文件"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def text_digest(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def load_config(path=CONFIG_FILE, include_urls=True):
+    """读取配置文件并补全默认值，文件不存在时返回默认配置
+
+    URL 列表存在单独的文件（urls_path）中时以该文件为准，include_urls 为 False 时不读取。
+    """
+    config = dict(DEFAULT_CONFIG)
+    if path and os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            config.update(json.load(f))
+    if include_urls and path and os.path.exists(urls_path(path)):
+        with open(urls_path(path), 'r', encoding='utf-8', newline='') as f:
+            config['urls'] = f.read()
+    return config
+
+
+def save_config(config, path=CONFIG_FILE):
+    """保存配置到文件，URL 列表写入单独的文件"""
+    settings = {key: value for key, value in config.items() if key != 'urls'}
+    atomic_write(path, json.dumps(settings, ensure_ascii=False, indent=2))
+    if 'urls' in config:
+        atomic_write(urls_path(path), config['urls'])
+
+
+class ConfigWriter:
+    """在后台线程中保存配置
+
+    短时间内的多次保存只写最后一次；设置项与文件中已有的配置合并后写入，
+    URL 列表只在传入新文本且内容确实变化时才重写。
+    """
+
+    def __init__(self, path=CONFIG_FILE):
+        self.path = path
+        self._pending = None  # (设置项, URL文本或 None, 保存后的提示)
+        self._urls_digest = None
+        self._busy = False
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='ConfigWriter', daemon=True)
+        self._thread.start()
+
+    def submit(self, settings, urls=None, message=None):
+        """提交一次保存，urls 为 None 表示 URL 列表没有变化"""
+        with self._condition:
+            if self._pending and urls is None:
+                # 合并时保留尚未写入的 URL 文本
+                urls = self._pending[1]
+            self._pending = (dict(settings), urls, message)
+            self._condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if not self._pending:
+                    return
+                settings, urls, message = self._pending
+                self._pending = None
+                self._busy = True
+            try:
+                self._write(settings, urls)
+                if message:
+                    logger.info(message)
+            except Exception as e:
+                logger.error(f"保存配置失败: {str(e)}")
+            finally:
+                with self._condition:
+                    self._busy = False
+                    self._condition.notify_all()
+
+    def _write(self, settings, urls):
+        # 保留界面上没有的配置项
+        config = {}
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+        legacy_urls = config.pop('urls', None)
+        if urls is None and legacy_urls is not None and not os.path.exists(urls_path(self.path)):
+            # 旧版本把 URL 列表存在配置文件中，第一次保存时迁移到单独的文件
+            urls = legacy_urls
+        config.update(settings)
+        atomic_write(self.path, json.dumps(config, ensure_ascii=False, indent=2))
+
+        if urls is not None:
+            if self._urls_digest is None and os.path.exists(urls_path(self.path)):
+                with open(urls_path(self.path), 'r', encoding='utf-8', newline='') as f:
+                    self._urls_digest = text_digest(f.read())
+            digest = text_digest(urls)
+            if digest != self._urls_digest:
+                atomic_write(urls_path(self.path), urls)
+                self._urls_digest = digest
+
+    def flush(self, timeout=None):
+        """等待已提交的保存全部写完"""
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._pending and not self._busy, timeout)
+
+    def close(self, timeout=5):
+        self.flush(timeout)
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+
+
+def build_settings(config):
+    """从配置中提取访问引擎需要的运行参数"""
+    settings = {key: config.get(key, value) for key, value in DEFAULT_CONFIG.items()
+                if key not in ('urls', 'url_file', 'proxy_string', 'proxy_file')}
+    if settings['max_time'] < settings['min_time']:
+        settings['max_time'] = settings['min_time']
+    if settings['max_interval'] < settings['min_interval']:
+        settings['max_interval'] = settings['min_interval']
+    return settings
+
+
+def build_task_source(config, on_error=None, entries=None):
+    """根据配置创建任务源：设置了 url_file 时流式读取文件，
+    否则使用已解析的 entries [(url, count), ...]，没有时解析 urls 文本"""
+    url_file = config.get('url_file')
+    if url_file:
+        if not os.path.exists(url_file):
+            raise FileNotFoundError(f"URL文件不存在: {url_file}")
+        return StreamingTaskSource(url_file, on_error=on_error)
+    if entries is None:
+        entries = parse_url_text(config.get('urls', ''), on_error=on_error)
+    return WeightedTaskStore(entries)
@@ -0,0 +1,594 @@
+"""多机分布式运行：协调节点 + 工作节点
+
+协调节点持有访问计划（网址----次数）和代理配置，在 TCP 端口上等待工作节点连接，
+按批把访问任务“租借”给工作节点；工作节点用自己的浏览器池访问，定期汇报访问记录
+（同时作为心跳）。工作节点断开或超过 agent_timeout 秒没有心跳时，它租借但未汇报的
+任务回到队列重新分配；被停止（取消）的访问同样重新分配。
+
+协议为每行一个 JSON 对象（UTF-8），工作节点发请求，协调节点按顺序逐条回复：
+    {"op": "hello", "name": ..., "capacity": N, "token": ...}
+        -> {"agent_id": ..., "settings": {...}, "proxy_string": ...}
+    {"op": "lease", "max": N}
+        -> {"lease_id": ..., "visits": [[访问编号, url], ...]} / {"wait": 秒} / {"done": true}
+    {"op": "report", "records": [{...}, ...], "progress": {...}}
+        -> {"stop": bool}
+访问编号由协调节点分配，工作节点的访问记录沿用该编号，汇报时据此结清租借。
+    {"op": "bye"} -> {}
+出错时回复 {"error": 原因} 并断开连接。协议不加密，代理账号会明文传输，应只在可信网络中使用，
+并用 cluster_token 防止误连。
+"""
+import asyncio
+import collections
+import hmac
+import itertools
+import json
+import logging
+import socket
+import time
+from run_output import RunOutputs
+from visit_metrics import AssignedVisitIds
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8765
+# 单条消息的长度上限（一次汇报可能包含上百条访问记录）
+MESSAGE_LIMIT = 16 * 1024 * 1024
+# 工作节点汇报访问记录（兼作心跳）的间隔
+REPORT_INTERVAL = 1.0
+# 暂时没有可租借的任务时，工作节点等待后重试的秒数
+LEASE_RETRY = 1.0
+
+
+def parse_address(text, default_host='0.0.0.0'):
+    """解析 '主机:端口' 或 '端口'，返回 (host, port)"""
+    text = (text or '').strip()
+    host, _, port = text.rpartition(':')
+    try:
+        return host or default_host, int(port) if port else DEFAULT_PORT
+    except ValueError:
+        raise ValueError(f"地址格式错误: {text}，应为 主机:端口")
+
+
+def _encode(message):
+    return json.dumps(message, ensure_ascii=False).encode('utf-8') + b'\n'
+
+
+class _Lease:
+    """一次租借：租给某个节点、尚未汇报结果的访问（访问编号 -> url）"""
+
+    def __init__(self, lease_id, agent, visits):
+        self.lease_id = lease_id
+        self.agent = agent
+        self.outstanding = dict(visits)
+
+
+class _AgentState:
+    def __init__(self, agent_id, name, capacity, writer):
+        self.agent_id = agent_id
+        self.name = name
+        self.capacity = capacity
+        self.writer = writer
+        self.leases = set()
+        self.progress = {}
+        self.last_seen = time.monotonic()
+
+
+class Coordinator:
+    """协调节点，对外接口与 VisitEngine 相同（run / stop / progress / on_event）
+
+    - task_source: 访问任务源（WeightedTaskStore 或 StreamingTaskSource）
+    - config: 完整配置，代理配置（含 proxy_file 中的入口）会发给工作节点
+    - settings: build_settings(config) 的结果，工作节点按此访问
+    - host / port: 监听地址
+    - token: 工作节点连接时需提供的口令，空字符串表示不校验
+
+    访问记录文件、断点文件和页面性能报告由协调节点统一写入。
+    """
+
+    def __init__(self, task_source, config, settings, host='0.0.0.0', port=DEFAULT_PORT,
+                 token='', on_event=None, resume=False):
+        self.task_source = task_source
+        self.config = config
+        self.settings = settings
+        self.host = host
+        self.port = port
+        self.token = token or ''
+        self.on_event = on_event
+        self.agent_timeout = max(REPORT_INTERVAL * 3, float(config.get('agent_timeout', 30) or 30))
+        self.lease_size = int(settings.get('task_batch_size', 0) or 0)
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.requeued_total = 0
+        self.agents = {}
+        self.leases = {}
+        self.visits = {}  # 租借中的访问编号 -> _Lease
+        self.requeued = collections.deque()
+        self.source_drained = False
+        self.all_done = False
+        self.is_running = False
+        self.stop_requested_at = None
+        self.stop_latency = None
+        self.loop = None
+        self.server = None
+        # 访问记录、断点和页面性能汇总由协调节点统一处理
+        self.outputs = RunOutputs(settings, task_source, resume)
+        self._ids = itertools.count(1)
+        self._visit_ids = itertools.count(1)
+        self._take_lock = None
+        self._done = None
+
+    def _emit(self, name, data=None):
+        if self.on_event:
+            try:
+                self.on_event(name, data)
+            except Exception:
+                pass
+
+    def log(self, message, level=logging.INFO):
+        logger.log(level, message)
+
+    @property
+    def total(self):
+        return self.task_source.planned
+
+    @property
+    def stopping(self):
+        return self.stop_requested_at is not None
+
+    def progress(self):
+        progress = {'completed': self.completed, 'failed': self.failed, 'total': self.total,
+                    'agents': len(self.agents),
+                    'leased': len(self.visits)}
+        if self.cancelled:
+            progress['cancelled'] = self.cancelled
+        if self.stop_latency is not None:
+            progress['stop_latency'] = round(self.stop_latency, 3)
+        values = [a.progress['concurrency'] for a in self.agents.values() if 'concurrency' in a.progress]
+        if values:
+            progress['concurrency'] = sum(values)
+        return progress
+
+    def _proxy_string(self):
+        """代理配置字符串，proxy_file 中的入口一并发给工作节点"""
+        lines = [self.config.get('proxy_string', '')]
+        proxy_file = self.config.get('proxy_file')
+        if proxy_file:
+            try:
+                with open(proxy_file, 'r', encoding='utf-8') as f:
+                    lines.append(f.read())
+            except Exception as e:
+                self.log(f"读取代理列表文件失败: {str(e)}", logging.ERROR)
+        return '\n'.join(line.strip() for line in lines if line.strip())
+
+    # ---- 任务租借 ----
+
+    async def _take(self, n):
+        """先取重新分配的任务，不够时从任务源读取（在线程池中执行）"""
+        async with self._take_lock:
+            urls = []
+            while self.requeued and len(urls) < n:
+                urls.append(self.requeued.popleft())
+            if len(urls) < n and not self.source_drained:
+                batch = await self.loop.run_in_executor(None, self.task_source.take, n - len(urls))
+                if not batch:
+                    self.source_drained = True
+                urls.extend(batch)
+            return urls
+
+    def _check_done(self):
+        if self.source_drained and not self.requeued and not self.leases and not self.all_done:
+            self.all_done = True
+            self.log("所有访问任务都已完成")
+            self._done.set()
+
+    def _requeue(self, urls):
+        self.requeued.extend(urls)
+        self.requeued_total += len(urls)
+
+    def _drop_agent(self, agent, reason):
+        """移除节点，把它租借但未汇报的任务放回队列"""
+        if self.agents.pop(agent.agent_id, None) is None:
+            return
+        count = 0
+        for lease_id in agent.leases:
+            lease = self.leases.pop(lease_id, None)
+            if lease:
+                for visit_id, url in lease.outstanding.items():
+                    self.visits.pop(visit_id, None)
+                    self.outputs.discard(visit_id, url)
+                # 重新分配时另发新的访问编号
+                self._requeue(list(lease.outstanding.values()))
+                count += len(lease.outstanding)
+        agent.leases.clear()
+        text = f"工作节点 {agent.name} {reason}"
+        if count:
+            text += f"，{count} 个未完成的访问已重新分配"
+        self.log(text, logging.WARNING if count else logging.INFO)
+        self._check_done()
+        self._emit('progress', self.progress())
+
+    def _record(self, agent, data):
+        """处理一条访问记录：结清租借、计数，并写入访问记录和断点"""
+        url = data['url']
+        lease = self.visits.get(data.get('visit_id'))
+        if lease is None or lease.agent is not agent:
+            # 租借已因超时被收回并重新分配，迟到的结果不再计入
+            return
+        del self.visits[data['visit_id']]
+        del lease.outstanding[data['visit_id']]
+        if not lease.outstanding:
+            del self.leases[lease.lease_id]
+            agent.leases.discard(lease.lease_id)
+        data['agent'] = agent.name
+        if data['ok']:
+            self.completed += 1
+            outcome = 'completed'
+        elif data.get('error_class') == 'Cancelled':
+            self.cancelled += 1
+            self._requeue([url])
+            outcome = 'cancelled'
+        else:
+            self.failed += 1
+            outcome = 'failed'
+        self.outputs.record(data, outcome)
+        self._emit('visit', data)
+
+    # ---- 协议处理 ----
+
+    def _register(self, message, writer):
+        if self.token and not hmac.compare_digest(str(message.get('token', '')), self.token):
+            return None, {'error': '口令错误'}
+        if self.stopping or self.all_done:
+            return None, {'error': '任务已结束'}
+        agent_id = next(self._ids)
+        peer = writer.get_extra_info('peername')
+        name = message.get('name') or (f"{peer[0]}:{peer[1]}" if peer else f"节点{agent_id}")
+        capacity = max(1, int(message.get('capacity') or self.settings.get('thread_count', 5)))
+        agent = _AgentState(agent_id, name, capacity, writer)
+        self.agents[agent_id] = agent
+        self.log(f"工作节点 {name} 已连接，并发数: {capacity}")
+        # 访问记录、断点和页面性能汇总由协调节点统一处理
+        settings = dict(self.settings, thread_count=capacity, metrics_file='', checkpoint_file='',
+                        aggregate_vitals=False)
+        self._emit('progress', self.progress())
+        return agent, {'agent_id': agent_id, 'settings': settings, 'proxy_string': self._proxy_string()}
+
+    async def _dispatch(self, agent, message):
+        op = message.get('op')
+        if op == 'lease':
+            if self.stopping or self.all_done:
+                return {'done': True}
+            n = max(1, int(message.get('max') or agent.capacity))
+            if self.lease_size:
+                n = min(n, self.lease_size)
+            urls = await self._take(n)
+            if agent.agent_id not in self.agents:
+                # 等待任务源期间节点已被移除
+                self._requeue(urls)
+                return {'error': '节点已超时'}
+            if urls:
+                lease_id = next(self._ids)
+                visits = [(next(self._visit_ids), url) for url in urls]
+                lease = _Lease(lease_id, agent, visits)
+                self.leases[lease_id] = lease
+                for visit_id, url in visits:
+                    self.visits[visit_id] = lease
+                    self.outputs.begin(visit_id, url, agent.name)
+                agent.leases.add(lease_id)
+                return {'lease_id': lease_id, 'visits': visits}
+            self._check_done()
+            return {'done': True} if self.all_done else {'wait': LEASE_RETRY}
+        if op == 'report':
+            for data in message.get('records') or ():
+                self._record(agent, data)
+            if message.get('progress'):
+                agent.progress = message['progress']
+            self._emit('progress', self.progress())
+            self._check_done()
+            return {'stop': self.stopping}
+        if op == 'bye':
+            return {}
+        return {'error': f"未知的请求: {op}"}
+
+    async def _serve(self, reader, writer):
+        """处理一个工作节点的连接"""
+        agent = None
+        reason = "已断开"
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                if agent is None:
+                    if message.get('op') != 'hello':
+                        response = {'error': '请先发送 hello'}
+                    else:
+                        agent, response = self._register(message, writer)
+                else:
+                    agent.last_seen = time.monotonic()
+                    response = await self._dispatch(agent, message)
+                writer.write(_encode(response))
+                await writer.drain()
+                if 'error' in response:
+                    self.log(f"拒绝工作节点请求: {response['error']}", logging.WARNING)
+                    break
+                if message.get('op') == 'bye':
+                    reason = "已退出"
+                    break
+        except (ConnectionError, ValueError, KeyError, TypeError) as e:
+            reason = f"连接出错: {str(e)}"
+        finally:
+            if agent is not None:
+                self._drop_agent(agent, reason)
+            writer.close()
+
+    async def _watch_agents(self):
+        """收回超过 agent_timeout 秒没有心跳的节点的租借"""
+        while True:
+            await asyncio.sleep(REPORT_INTERVAL)
+            now = time.monotonic()
+            for agent in list(self.agents.values()):
+                if now - agent.last_seen > self.agent_timeout:
+                    self._drop_agent(agent, f"超过 {self.agent_timeout:.0f} 秒没有心跳")
+                    agent.writer.close()
+
+    # ---- 运行 ----
+
+    async def run(self):
+        """监听端口分发任务，直到全部完成或被停止"""
+        self.loop = asyncio.get_running_loop()
+        self.is_running = True
+        self._take_lock = asyncio.Lock()
+        self._done = asyncio.Event()
+        if self.stopping:
+            self._done.set()
+        watchdog = None
+        try:
+            await self.outputs.open()
+
+            self.server = await asyncio.start_server(self._serve, self.host, self.port, limit=MESSAGE_LIMIT)
+            self.port = self.server.sockets[0].getsockname()[1]
+            self.log(f"协调节点已在 {self.host}:{self.port} 上等待工作节点连接")
+            self._emit('started', self.progress())
+            watchdog = asyncio.create_task(self._watch_agents())
+
+            await self._done.wait()
+            # 工作节点在下一次汇报或租借时收到停止/结束通知，等待它们汇报最后的结果后断开
+            deadline = time.monotonic() + float(self.settings.get('stop_timeout', 10) or 10) + 5
+            while self.agents and time.monotonic() < deadline:
+                await asyncio.sleep(0.1)
+        finally:
+            self.is_running = False
+            if watchdog:
+                watchdog.cancel()
+            if self.server:
+                self.server.close()
+                for agent in list(self.agents.values()):
+                    self._drop_agent(agent, "未在期限内退出")
+                    agent.writer.close()
+                await self.server.wait_closed()
+                self.server = None
+            try:
+                await self._shutdown()
+            finally:
+                self._emit('finished', self.progress())
+        return self.progress()
+
+    async def _shutdown(self):
+        all_done = self.all_done and not self.stopping
+        if self.requeued_total:
+            self.log(f"共重新分配 {self.requeued_total} 个访问")
+        if hasattr(self.task_source, 'close'):
+            await self.loop.run_in_executor(None, self.task_source.close)
+        await self.outputs.close(all_done)
+        if self.stop_requested_at is not None:
+            self.stop_latency = time.monotonic() - self.stop_requested_at
+            self.log(f"已停止，用时 {self.stop_latency:.2f} 秒")
+
+    def stop(self):
+        """请求停止（线程安全），工作节点在下一次汇报时收到停止通知"""
+        if self.stop_requested_at is None:
+            self.stop_requested_at = time.monotonic()
+        if self.loop and self._done:
+            self.loop.call_soon_threadsafe(self._done.set)
+
+
+class CoordinatorClient:
+    """工作节点到协调节点的连接，请求按顺序逐条收发"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    async def connect(cls, host, port, retry_seconds=30):
+        """连接协调节点，协调节点尚未启动时在 retry_seconds 秒内重试"""
+        deadline = time.monotonic() + retry_seconds
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(host, port, limit=MESSAGE_LIMIT)
+                return cls(reader, writer)
+            except OSError:
+                if time.monotonic() >= deadline:
+                    raise
+                await asyncio.sleep(1)
+
+    async def request(self, message):
+        async with self._lock:
+            self.writer.write(_encode(message))
+            await self.writer.drain()
+            line = await self.reader.readline()
+        if not line:
+            raise ConnectionError("协调节点已断开连接")
+        response = json.loads(line)
+        if 'error' in response:
+            raise ConnectionError(response['error'])
+        return response
+
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except Exception:
+            pass
+
+
+class LeaseTaskSource:
+    """工作节点中的任务源：向协调节点租借任务
+
+    接口与 WeightedTaskStore 相同（take / planned / exhausted / len），
+    take() 会阻塞，由引擎在线程池中调用，请求在节点的事件循环中发出。
+    引擎通过 visit_id(url) 取用协调节点分配的访问编号。
+    """
+
+    def __init__(self, client, loop):
+        self.client = client
+        self.loop = loop
+        self.planned = 0
+        self.exhausted = False
+        self.closed = False
+        self._buffer = []
+        self._ids = AssignedVisitIds()
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def take(self, n=1):
+        while not self._buffer and not self.exhausted and not self.closed:
+            try:
+                response = asyncio.run_coroutine_threadsafe(
+                    self.client.request({'op': 'lease', 'max': n}), self.loop
+                ).result()
+            except Exception as e:
+                logger.error(f"向协调节点租借任务失败: {str(e)}")
+                self.exhausted = True
+                break
+            if response.get('done'):
+                self.exhausted = True
+                break
+            visits = response.get('visits') or []
+            if not visits:
+                time.sleep(response.get('wait', LEASE_RETRY))
+                continue
+            self._ids.add(visits)
+            self._buffer.extend(url for _, url in visits)
+            self.planned += len(visits)
+        batch, self._buffer = self._buffer[:n], self._buffer[n:]
+        return batch
+
+    def visit_id(self, url):
+        return self._ids.pop(url)
+
+    def close(self):
+        self.closed = True
+        self._buffer = []
+        self._ids.clear()
+
+
+class Agent:
+    """工作节点：连接协调节点，用本机的浏览器池访问租借到的任务
+
+    - capacity: 本节点的并发数，0 表示使用协调节点配置中的 thread_count
+    - headless: 是否无头运行浏览器（由本节点决定）
+    """
+
+    def __init__(self, host, port, name='', capacity=0, token='', headless=True, on_event=None):
+        self.host = host
+        self.port = port
+        self.name = name or socket.gethostname()
+        self.capacity = capacity
+        self.token = token or ''
+        self.headless = headless
+        self.on_event = on_event
+        self.client = None
+        self.engine = None
+        self.task_source = None
+        self.stop_requested = False
+        self._records = []
+        self._progress = {}
+
+    def _forward(self, name, data):
+        if name == 'visit':
+            self._records.append(data)
+        elif name in ('started', 'progress', 'finished'):
+            self._progress = data
+        if self.on_event:
+            try:
+                self.on_event(name, data)
+            except Exception:
+                pass
+
+    async def _report(self):
+        records, self._records = self._records, []
+        response = await self.client.request(
+            {'op': 'report', 'records': records, 'progress': self._progress}
+        )
+        if response.get('stop') and self.engine:
+            logger.info("协调节点要求停止")
+            self.engine.stop()
+
+    async def _report_loop(self, finished):
+        """定期汇报；finished 设置后退出，不会打断进行中的请求（否则回复会错位，取出的记录会丢失）"""
+        while True:
+            try:
+                await asyncio.wait_for(finished.wait(), REPORT_INTERVAL)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self._report()
+            except Exception as e:
+                logger.error(f"与协调节点的连接已断开: {str(e)}")
+                if self.engine:
+                    self.engine.stop()
+                return
+
+    async def run(self):
+        """连接协调节点并运行到任务结束，返回本节点的访问进度"""
+        # 浏览器相关模块只在工作节点运行时导入
+        from engine import VisitEngine
+        from proxy_manager import ProxyManager
+
+        loop = asyncio.get_running_loop()
+        self.client = await CoordinatorClient.connect(self.host, self.port)
+        try:
+            welcome = await self.client.request({
+                'op': 'hello', 'name': self.name, 'capacity': self.capacity, 'token': self.token
+            })
+            logger.info(f"已连接协调节点 {self.host}:{self.port}，节点编号 {welcome['agent_id']}")
+            settings = dict(welcome['settings'], headless=self.headless)
+            proxy_manager = ProxyManager(welcome['proxy_string'])
+            self.task_source = LeaseTaskSource(self.client, loop)
+            self.engine = VisitEngine(
+                self.task_source,
+                proxy_manager.get_current_proxy,
+                settings,
+                on_event=self._forward,
+                proxy_balancer=proxy_manager.balancer
+            )
+            if self.stop_requested:
+                self.engine.stop()
+            finished = asyncio.Event()
+            reporter = asyncio.create_task(self._report_loop(finished))
+            try:
+                progress = await self.engine.run()
+            finally:
+                finished.set()
+                await reporter
+            try:
+                await self._report()
+                await self.client.request({'op': 'bye'})
+            except Exception as e:
+                logger.warning(f"汇报最后的访问记录失败: {str(e)}")
+            return progress
+        finally:
+            await self.client.close()
+
+    def stop(self):
+        """停止本节点（线程安全），未完成的任务由协调节点重新分配"""
+        self.stop_requested = True
+        if self.engine:
+            self.engine.stop()
@@ -0,0 +1,507 @@
+import asyncio
+import heapq
+import logging
+import math
+import random
+import time
+from browser_controller import BrowserController
+from browser_pool import BrowserPool
+from visit_metrics import VisitRecord
+from ip_lookup import ExitIpLookup, DEFAULT_IP_CHECK_URL
+from resource_policy import ResourcePolicy
+from session_pool import ProxySessionPool
+from session_lease import SessionLeaseManager
+from adaptive_concurrency import AdaptiveConcurrency, ResizableLimiter
+from run_output import RunOutputs
+
+logger = logging.getLogger(__name__)
+
+class VisitEngine:
+    """访问引擎：一个事件循环、一个 Playwright 实例，按并发数调度访问任务
+
+    引擎本身不依赖 Qt，日志通过 logging 输出，状态变化通过 on_event(name, data) 回调通知外部：
+    - started:  浏览器已启动，开始调度访问，data 为进度字典
+    - visit:    data 为一次访问的记录（VisitRecord.to_dict()）
+    - progress: data 为 {'completed', 'failed', 'total'}（以及会话池、代理入口等统计）
+    - stopping: data 为 {'visits', 'browsers'}，停止过程中剩余的访问数和浏览器数
+    - finished: data 为最终的进度字典
+
+    task_source 可以是 WeightedTaskStore 或 StreamingTaskSource，
+    由后台生产者分批取出并放入有界队列，队列满时自动暂停读取。
+
+    设置了 checkpoint_file 时访问进度会定期批量写入断点文件；resume 为 True 表示
+    task_source 是由断点文件重建的剩余任务（见 checkpoint.build_resume_source），继续写入同一文件。
+    """
+
+    def __init__(self, task_source, proxy_provider, settings, on_event=None, proxy_balancer=None,
+                 resume=False):
+        self.task_source = task_source
+        self.proxy_provider = proxy_provider
+        # 多个代理入口时按访问结果更新入口的延迟和错误计数
+        self.proxy_balancer = proxy_balancer
+        if proxy_balancer:
+            proxy_balancer.configure(
+                strategy=settings.get('proxy_balance'),
+                eject_failures=settings.get('proxy_eject_failures'),
+                eject_seconds=settings.get('proxy_eject_seconds')
+            )
+        self.probe_task = None
+        self.adaptive_task = None
+        self.memory_task = None
+        self.browser_rss = None  # 最近一次测得的浏览器总内存（字节）
+        self.settings = settings
+        self.on_event = on_event
+        self.concurrency = max(1, int(settings.get('thread_count', 5)))
+        # 自适应模式下 thread_count 为并发上限，从 adaptive_min_workers 开始逐步调整
+        self.adaptive = None
+        self.limiter = None
+        self._limiter_closing = None
+        # 每次从任务存储批量取出的任务数，减少锁竞争
+        self.batch_size = max(1, int(settings.get('task_batch_size', 0) or self.concurrency))
+        self.queue = None
+        self.producer = None
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.is_running = False
+        # 停止时取消所有进行中的访问（停留、间隔等待和页面导航），并在期限内关闭浏览器
+        self.tasks = set()
+        self.stop_timeout = float(settings.get('stop_timeout', 10) or 10)
+        self.stop_requested_at = None
+        self.stop_latency = None
+        self.loop = None
+        self.pool = None
+        # 访问记录文件、断点文件和页面性能汇总；页面性能指标在分片和分布式运行时由协调方汇总
+        self.collect_vitals = bool(settings.get('collect_web_vitals'))
+        self.outputs = RunOutputs(
+            settings, task_source, resume, aggregate_vitals=settings.get('aggregate_vitals', True)
+        )
+        self.startup_time = None
+        # 出口IP查询，可在配置中关闭或更换查询地址
+        self.ip_lookup = None
+        if settings.get('ip_check', True):
+            self.ip_lookup = ExitIpLookup(settings.get('ip_check_url') or DEFAULT_IP_CHECK_URL)
+        # 资源策略：按类型/域名/大小屏蔽请求
+        self.resource_policy = ResourcePolicy.from_settings(settings)
+        self.session_pool = None
+        # 粘性会话复用：一个会话在次数/时间上限内用于多次访问
+        self.leases = SessionLeaseManager(
+            self._get_proxy,
+            max_visits=settings.get('session_reuse_visits', 1),
+            max_seconds=settings.get('session_reuse_seconds', 0),
+            on_expire=self._forget_session
+        )
+
+    @property
+    def balancing(self):
+        """是否在多个代理入口之间负载均衡"""
+        return self.proxy_balancer is not None and len(self.proxy_balancer) > 1
+
+    def _emit(self, name, data=None):
+        if self.on_event:
+            try:
+                self.on_event(name, data)
+            except Exception:
+                pass
+
+    def log(self, message, level=logging.INFO):
+        logger.log(level, message)
+
+    @property
+    def total(self):
+        """已知的计划访问总数（流式读取时随读取进度增长）"""
+        return self.task_source.planned
+
+    def progress(self):
+        progress = {'completed': self.completed, 'failed': self.failed, 'total': self.total}
+        if self.cancelled:
+            progress['cancelled'] = self.cancelled
+        if self.stop_latency is not None:
+            progress['stop_latency'] = round(self.stop_latency, 3)
+        if self.session_pool:
+            progress['session_pool'] = self.session_pool.stats()
+        if self.leases.max_visits != 1:
+            progress['sessions'] = self.leases.stats()
+        if self.adaptive:
+            progress['concurrency'] = self.limiter.limit
+        if self.browser_rss:
+            progress['browser_rss_mb'] = round(self.browser_rss / 1048576, 1)
+        if self.balancing:
+            progress['proxies'] = {
+                'available': self.proxy_balancer.available_count(),
+                'total': len(self.proxy_balancer),
+            }
+        return progress
+
+    def _get_proxy(self):
+        """优先从预热的会话池取会话"""
+        if self.session_pool:
+            return self.session_pool.get()
+        return self.proxy_provider()
+
+    def _forget_session(self, session_id):
+        """会话作废后不再保留其出口IP缓存"""
+        if self.ip_lookup:
+            self.ip_lookup.forget(session_id)
+
+    async def _probe_endpoints(self, ip_lookup, interval=5):
+        """定期试探冷却已过的代理入口，成功后恢复使用"""
+        while self.is_running:
+            for endpoint in self.proxy_balancer.due_for_probe():
+                self.proxy_balancer.begin(endpoint.name)
+                start = time.monotonic()
+                try:
+                    ok = bool(await ip_lookup.fetch(endpoint.new_session()))
+                except Exception as e:
+                    self.log(f"试探代理入口 {endpoint.name} 失败: {str(e)}", logging.DEBUG)
+                    ok = False
+                self.proxy_balancer.report(endpoint.name, time.monotonic() - start, ok)
+            await asyncio.sleep(interval)
+
+    async def _monitor_memory(self, interval=10):
+        """定期测量浏览器进程树内存，超过上限的浏览器在下次分配时重启"""
+        while self.is_running:
+            try:
+                self.browser_rss = await self.pool.check_memory() or None
+            except Exception as e:
+                self.log(f"测量浏览器内存失败: {str(e)}", logging.DEBUG)
+            await asyncio.sleep(interval)
+
+    def _browser_count(self):
+        """浏览器数量：未配置时每 5 个并发共用一个浏览器"""
+        count = int(self.settings.get('browser_count', 0) or 0)
+        if count <= 0:
+            count = math.ceil(self.concurrency / 5)
+        return max(1, min(count, self.concurrency))
+
+    async def _produce(self):
+        """在线程池中批量取任务放入有界队列，结束时放入 None"""
+        try:
+            while self.is_running:
+                batch = await self.loop.run_in_executor(
+                    None, self.task_source.take, self.batch_size
+                )
+                if not batch:
+                    break
+                for url in batch:
+                    await self.queue.put(url)
+        except Exception as e:
+            self.log(f"读取任务出错: {str(e)}", logging.ERROR)
+        await self.queue.put(None)
+
+    async def _next_url(self):
+        """取出下一个待访问的URL，任务耗尽时返回 None"""
+        url = await self.queue.get()
+        if url is None:
+            # 保留结束标记，便于后续调用同样返回 None
+            self.queue.put_nowait(None)
+        return url
+
+    def _finish_visit(self, record):
+        """统计一次访问的结果并输出访问记录"""
+        record.finish()
+        if self.adaptive:
+            self.adaptive.observe(record)
+        if record.ok:
+            self.completed += 1
+            outcome = 'completed'
+        elif record.error_class == 'Cancelled':
+            self.cancelled += 1
+            outcome = 'cancelled'
+        else:
+            self.failed += 1
+            outcome = 'failed'
+        data = record.to_dict()
+        self.outputs.record(data, outcome)
+        self._emit('visit', data)
+        self._emit('progress', self.progress())
+
+    async def run(self):
+        """运行所有访问任务，直到完成或被停止"""
+        self.loop = asyncio.get_running_loop()
+        self.is_running = True
+        self.pool = BrowserPool(
+            size=self._browser_count(),
+            headless=self.settings.get('headless', False),
+            max_contexts_per_browser=self.settings.get('max_contexts_per_browser', 50),
+            profile=self.settings.get('launch_profile', 'default'),
+            max_rss_mb=self.settings.get('max_browser_rss_mb', 0),
+            renderer_process_limit=self.settings.get('renderer_process_limit', 4)
+        )
+        try:
+            interrupted = await self.outputs.open()
+            if interrupted:
+                self.log(f"上次中断时有 {interrupted} 个访问正在进行，已计入剩余任务")
+
+            # 会话池在浏览器启动期间就开始预热
+            pool_size = int(self.settings.get('session_pool_size', 0) or 0)
+            if pool_size > 0:
+                self.session_pool = ProxySessionPool(
+                    self.proxy_provider,
+                    self.ip_lookup or ExitIpLookup(self.settings.get('ip_check_url') or DEFAULT_IP_CHECK_URL),
+                    size=pool_size,
+                    concurrency=self.settings.get('session_validate_concurrency', 5),
+                    max_age=self.settings.get('session_max_age', 300)
+                )
+                self.session_pool.start()
+
+            if self.balancing:
+                self.probe_task = asyncio.create_task(self._probe_endpoints(
+                    self.ip_lookup or ExitIpLookup(self.settings.get('ip_check_url') or DEFAULT_IP_CHECK_URL)
+                ))
+
+            try:
+                start = time.monotonic()
+                await self.pool.start()
+                self.startup_time = time.monotonic() - start
+            except Exception as e:
+                self.log(f"启动浏览器失败: {str(e)}", logging.ERROR)
+                return self.progress()
+
+            self.log(
+                f"已启动 {self.pool.size} 个浏览器，耗时 {self.startup_time:.2f} 秒，"
+                f"并发数: {self.concurrency}"
+            )
+            self.memory_task = asyncio.create_task(self._monitor_memory())
+            self._emit('started', self.progress())
+
+            # 队列容量限制了预读的任务数，实现背压
+            self.queue = asyncio.Queue(maxsize=self.batch_size * 2)
+            self.producer = asyncio.create_task(self._produce())
+
+            if self.settings.get('adaptive_concurrency'):
+                self.limiter = ResizableLimiter(
+                    min(self.concurrency, int(self.settings.get('adaptive_min_workers', 1) or 1))
+                )
+                self.adaptive = AdaptiveConcurrency(
+                    self.limiter,
+                    min_workers=self.limiter.limit,
+                    max_workers=self.concurrency,
+                    interval=self.settings.get('adaptive_interval', 10),
+                    cpu_high=self.settings.get('adaptive_cpu_high', 85),
+                    mem_low=self.settings.get('adaptive_mem_low', 15),
+                    max_failure_rate=self.settings.get('adaptive_max_failure_rate', 0.3)
+                )
+                self.adaptive_task = asyncio.create_task(self.adaptive.run())
+                self.log(f"自适应并发已开启: {self.limiter.limit} ~ {self.concurrency}")
+            else:
+                self.limiter = ResizableLimiter(self.concurrency)
+
+            # 空闲的线程编号，总是复用最小的编号
+            free_slots = []
+            next_slot = 1
+
+            while self.is_running:
+                await self.limiter.acquire()
+                url = await self._next_url() if self.is_running else None
+                if url is None:
+                    await self.limiter.release()
+                    break
+
+                if free_slots:
+                    slot = heapq.heappop(free_slots)
+                else:
+                    slot = next_slot
+                    next_slot += 1
+
+                async def visit(url=url, slot=slot):
+                    try:
+                        await self.browse_url(url, f"线程-{slot}")
+                    finally:
+                        heapq.heappush(free_slots, slot)
+                        await self.limiter.release()
+
+                task = asyncio.create_task(visit())
+                self.tasks.add(task)
+                task.add_done_callback(self.tasks.discard)
+
+            await self._wait_tasks()
+        finally:
+            # 清理出错时也要发出 finished 事件，界面据此回到已停止状态
+            try:
+                await self._shutdown()
+            finally:
+                self._emit('finished', self.progress())
+        return self.progress()
+
+    async def _shutdown(self):
+        """停止后台任务、关闭浏览器和会话池，并输出统计"""
+        self.is_running = False
+        if self.producer:
+            self.producer.cancel()
+            self.producer = None
+        if self.probe_task:
+            self.probe_task.cancel()
+            self.probe_task = None
+        if self.adaptive_task:
+            self.adaptive_task.cancel()
+            self.adaptive_task = None
+        if self.memory_task:
+            self.memory_task.cancel()
+            self.memory_task = None
+        # 任务源关闭前判断是否已全部访问完
+        all_done = (
+            self.stop_requested_at is None and self.startup_time is not None
+            and self.task_source.exhausted and not len(self.task_source)
+        )
+        if self.pool.recycled_for_memory:
+            self.log(f"因内存超限重启浏览器 {self.pool.recycled_for_memory} 次")
+        if hasattr(self.task_source, 'close'):
+            await self.loop.run_in_executor(None, self.task_source.close)
+        browsers = len([b for b in self.pool.browsers if b]) + len(self.pool.draining)
+        if self.stop_requested_at is not None:
+            self._emit('stopping', {'visits': len(self.tasks), 'browsers': browsers})
+        # 所有浏览器并发关闭，停止时不超过剩余期限
+        await self.pool.close(timeout=self._stop_remaining())
+        self.pool = None
+        self.leases.clear()
+        if self.leases.max_visits != 1:
+            stats = self.leases.stats()
+            self.log(
+                f"会话复用: 新建 {stats['created']} 个会话，复用 {stats['reused']} 次，"
+                f"出错提前作废 {stats['expired_early']} 个"
+            )
+        if self.balancing:
+            for stats in self.proxy_balancer.stats():
+                latency = f"{stats['latency']:.2f} 秒" if stats['latency'] is not None else "未知"
+                self.log(
+                    f"代理入口 {stats['endpoint']}: 请求 {stats['requests']}，失败 {stats['failures']}，"
+                    f"平均延迟 {latency}{'，已暂停' if stats['ejected'] else ''}"
+                )
+        if self.session_pool:
+            stats = self.session_pool.stats()
+            self.log(
+                f"会话池命中率 {stats['hit_rate']:.0%}（命中 {stats['hits']}，未命中 {stats['misses']}，"
+                f"校验失败 {stats['rejected']}）"
+            )
+            await self.session_pool.close()
+        await self.outputs.close(all_done)
+        if self.stop_requested_at is not None:
+            self.stop_latency = time.monotonic() - self.stop_requested_at
+            self.log(f"已停止，用时 {self.stop_latency:.2f} 秒")
+
+    def _stop_remaining(self):
+        """停止期限的剩余秒数，没有请求停止时返回 None（不限时）"""
+        if self.stop_requested_at is None:
+            return None
+        return max(0.0, self.stop_timeout - (time.monotonic() - self.stop_requested_at))
+
+    async def _wait_tasks(self):
+        """等待进行中的访问结束；停止时定期通知剩余数量，超过期限后不再等待"""
+        while self.tasks:
+            remaining = self._stop_remaining()
+            if remaining is not None:
+                self._emit('stopping', {'visits': len(self.tasks), 'browsers': self.pool.size})
+                if remaining <= 0:
+                    self.log(f"仍有 {len(self.tasks)} 个访问未能在期限内结束，直接关闭浏览器", logging.WARNING)
+                    return
+            await asyncio.wait(self.tasks, timeout=0.5 if remaining is None else min(0.5, remaining))
+
+    def stop(self):
+        """请求停止（线程安全），立即取消所有进行中的访问"""
+        if self.loop and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._stop)
+        else:
+            self._stop()
+
+    def _stop(self):
+        if self.stop_requested_at is None:
+            self.stop_requested_at = time.monotonic()
+        self.is_running = False
+        if self.producer:
+            self.producer.cancel()
+        if self.queue:
+            # 丢弃已预读的任务，并唤醒等待中的调度器
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+        if self.limiter and self.loop and self.loop.is_running():
+            # 调度器可能正等待并发名额，而名额要等被取消的访问关闭页面后才归还，
+            # 浏览器卡住时会一直等下去，因此直接唤醒，让它进入限时的等待
+            self._limiter_closing = self.loop.create_task(self.limiter.close())
+        # 取消会打断停留和间隔等待以及正在进行的页面导航
+        for task in list(self.tasks):
+            task.cancel()
+
+    async def browse_url(self, url, worker_name):
+        """处理单个URL的访问"""
+        # 分片和分布式运行时访问编号由分发任务的一方分配
+        visit_id = self.task_source.visit_id(url) if hasattr(self.task_source, 'visit_id') else None
+        record = VisitRecord(url, worker_name, visit_id)
+        self.outputs.begin(record.visit_id, url, worker_name)
+        controller = BrowserController(
+            self.pool, record, self.ip_lookup, self.resource_policy, collect_vitals=self.collect_vitals
+        )
+        lease = None
+        endpoint = None
+        try:
+            # 复用未到期的粘性会话，否则获取新会话（会话池中已校验的优先）
+            lease = self.leases.acquire()
+            if not lease:
+                self.log(f"{worker_name} 获取代理失败", logging.WARNING)
+                record.fail("获取代理失败", 'ProxyError')
+                return
+            proxy = lease.proxy
+            record.session_id = proxy.get('session_id')
+            if self.balancing:
+                endpoint = self.proxy_balancer.begin(proxy.get('endpoint'))
+
+            # 从浏览器池获取新的上下文
+            result = await controller.init_browser(proxy)
+            if isinstance(result, str) and "失败" in result:
+                self.log(f"{worker_name} {result}", logging.WARNING)
+                return
+
+            # 访问网页（出口IP在后台同时查询）
+            self.log(f"{worker_name} 正在访问: {url}")
+            await controller.visit_url(url)
+            if self.ip_lookup:
+                ip = await controller.wait_ip(self.ip_lookup.timeout)
+                self.log(f"{worker_name} 使用IP: {ip}")
+            if controller.last_error:
+                self.log(f"{worker_name} {controller.last_error}", logging.WARNING)
+            else:
+                record.ok = True
+
+            # 随机停留时间
+            stay_time = random.randint(
+                self.settings['min_time'],
+                self.settings['max_time']
+            )
+            self.log(f"{worker_name} 停留 {stay_time} 秒...", logging.DEBUG)
+            with record.phase('dwell'):
+                await asyncio.sleep(stay_time)
+        except asyncio.CancelledError:
+            # 停留期间被停止时访问本身已经完成，只缩短了停留时间
+            if not record.ok:
+                record.fail("访问已停止", 'Cancelled')
+            raise
+        except Exception as e:
+            self.log(f"{worker_name} 浏览过程出错: {str(e)}", logging.ERROR)
+            record.fail(e)
+        finally:
+            # 关闭页面并归还上下文，停止后不超过剩余期限（超时的浏览器由浏览器池关闭）
+            try:
+                await asyncio.wait_for(controller.close(), self._stop_remaining())
+            except asyncio.TimeoutError:
+                self.log(f"{worker_name} 关闭页面超时", logging.WARNING)
+            except Exception as e:
+                self.log(f"{worker_name} 关闭浏览器出错: {str(e)}", logging.WARNING)
+            # 目标网站返回错误状态码或被停止不是会话的问题，其他错误则作废该会话
+            proxy_ok = record.ok or record.error_class in ('HTTPError', 'Cancelled')
+            self.leases.release(lease, proxy_ok)
+            if endpoint:
+                # 导航耗时包含代理延迟，用于入口之间比较
+                self.proxy_balancer.report(endpoint.name, record.phases.get('goto'), proxy_ok)
+            self._finish_visit(record)
+
+        if not self.is_running:
+            return
+
+        # 随机间隔时间
+        interval_time = random.randint(
+            self.settings['min_interval'],
+            self.settings['max_interval']
+        )
+        self.log(f"{worker_name} 等待间隔 {interval_time} 秒...", logging.DEBUG)
+        await asyncio.sleep(interval_time)
@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_IP_CHECK_URL = 'http://httpbin.org/ip'
+
+_IPV4_PATTERN = re.compile(r'\d{1,3}(?:\.\d{1,3}){3}')
+
+
+def parse_ip(text):
+    """从 IP 查询接口的返回中提取 IP，兼容 httpbin 的 JSON 和纯文本"""
+    match = re.search(r'"(?:origin|ip)"\s*:\s*"([^"]+)"', text)
+    if match:
+        return match.group(1)
+    match = _IPV4_PATTERN.search(text)
+    if match:
+        return match.group(0)
+    text = text.strip()
+    return text if text and len(text) < 64 and not any(c.isspace() for c in text) else None
+
+
+class ExitIpLookup:
+    """通过代理发送轻量 HTTP 请求查询出口IP，结果按粘性会话ID缓存
+
+    同一会话的并发查询只发送一次请求；缓存有效期默认跟随会话时长。
+    """
+
+    def __init__(self, url=DEFAULT_IP_CHECK_URL, timeout=10, ttl=7200):
+        self.url = url or DEFAULT_IP_CHECK_URL
+        self.timeout = timeout
+        self.ttl = ttl
+        self._cache = {}      # session_id -> (ip, 过期时间)
+        self._pending = {}    # session_id -> Future
+        self.requests = 0
+        self.hits = 0
+
+    def cached(self, session_id):
+        entry = self._cache.get(session_id)
+        if entry and entry[1] > time.monotonic():
+            return entry[0]
+        return None
+
+    def remember(self, session_id, ip, ttl=None):
+        """记录会话的出口IP（例如代理校验时已经查到）"""
+        if session_id and ip:
+            self._cache[session_id] = (ip, time.monotonic() + (ttl or self.ttl))
+
+    def forget(self, session_id):
+        self._cache.pop(session_id, None)
+
+    async def lookup(self, proxy):
+        """查询代理会话的出口IP，失败时返回 None"""
+        session_id = proxy.get('session_id')
+        ip = self.cached(session_id)
+        if ip:
+            self.hits += 1
+            return ip
+
+        pending = self._pending.get(session_id)
+        if pending:
+            self.hits += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        if session_id:
+            self._pending[session_id] = future
+        try:
+            ip = await self.fetch(proxy)
+            self.remember(session_id, ip)
+            future.set_result(ip)
+            return ip
+        except Exception as e:
+            logger.debug(f"获取IP失败: {str(e)}")
+            return None
+        finally:
+            # 被取消时也要唤醒等待同一会话的其他查询
+            if not future.done():
+                future.set_result(None)
+            self._pending.pop(session_id, None)
+
+    async def fetch(self, proxy):
+        """通过代理请求查询地址，返回出口IP（不使用缓存）"""
+        import aiohttp
+        from aiohttp_socks import ProxyConnector
+
+        self.requests += 1
+        connector = ProxyConnector.from_url(proxy['full_proxy'])
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            async with session.get(self.url) as response:
+                if response.status != 200:
+                    raise RuntimeError(f"HTTP {response.status}")
+                return parse_ip(await response.text())
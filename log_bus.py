@@ -0,0 +1,70 @@
+import logging
+import threading
+import time
+from collections import deque
+
+# 界面上可选的日志级别
+LEVEL_NAMES = {
+    logging.DEBUG: '调试',
+    logging.INFO: '信息',
+    logging.WARNING: '警告',
+    logging.ERROR: '错误',
+}
+
+
+class LogBus:
+    """线程安全的日志总线
+
+    任意线程都可以写入，日志先进入固定容量的环形缓冲区，
+    由界面定时批量取出显示；缓冲区满时丢弃最旧的日志并计数。
+    """
+
+    def __init__(self, capacity=10000):
+        self._buffer = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def log(self, message, level=logging.INFO):
+        with self._lock:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.dropped += 1
+            self._buffer.append((time.time(), level, message))
+
+    def drain(self):
+        """取出缓冲区中的全部日志 [(时间戳, 级别, 文本), ...]"""
+        with self._lock:
+            records = list(self._buffer)
+            self._buffer.clear()
+            dropped, self.dropped = self.dropped, 0
+        return records, dropped
+
+
+class LogBusHandler(logging.Handler):
+    """把 logging 模块的日志转发到日志总线"""
+
+    def __init__(self, bus, level=logging.DEBUG):
+        super().__init__(level)
+        self.bus = bus
+
+    def emit(self, record):
+        try:
+            self.bus.log(self.format(record), record.levelno)
+        except Exception:
+            self.handleError(record)
+
+
+def format_record(record):
+    """格式化一条日志用于显示"""
+    created, level, message = record
+    prefix = f"[{LEVEL_NAMES[level]}] " if level >= logging.WARNING and level in LEVEL_NAMES else ''
+    return f"{time.strftime('%H:%M:%S', time.localtime(created))} {prefix}{message}"
+
+
+def install_log_bus(bus, level=logging.DEBUG):
+    """把日志总线挂到根日志器上，所有模块的 logging 输出都会进入总线"""
+    handler = LogBusHandler(bus, level)
+    root = logging.getLogger()
+    root.addHandler(handler)
+    if root.level > level or root.level == logging.NOTSET:
+        root.setLevel(level)
+    return handler
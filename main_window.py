@@ -1,20 +1,85 @@
-from PyQt6.QtWidgets import QMainWindow, QWidget, QVBoxLayout
-from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QLabel, QHeaderView
+from PyQt6.QtCore import Qt, QThread, QTimer, pyqtSignal
+from PyQt6.QtGui import QTextCursor
+import asyncio
 from ui_components import (
     create_title_section,
     create_main_content,
 )
 from proxy_manager import ProxyManager
+from config_store import load_config, ConfigWriter, CONFIG_FILE
+from log_bus import LogBus, install_log_bus, format_record
+from task_table import TaskTableModel, VisitUpdateBuffer, URL_COLUMN
+from task_store import parse_url_text
+from collections import deque
+from startup_profile import profile as startup_profile
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# 日志刷新间隔（毫秒）和界面最多显示的行数
+LOG_FLUSH_INTERVAL = 200
+LOG_MAX_LINES = 5000
+
+# URL任务表刷新访问结果的间隔（毫秒）
+TABLE_FLUSH_INTERVAL = 500
+
+class AsyncioThread(QThread):
+    """运行后台事件循环的线程
+
+    事件循环在创建线程时就已建好，启动前提交的协程会排队等待执行，
+    因此不需要等待线程就绪。
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.loop = asyncio.new_event_loop()
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
 
 class MainWindow(QMainWindow):
+    # 其他线程通过信号更新界面
+    proxy_status_signal = pyqtSignal(str)
+    url_import_signal = pyqtSignal(str, list)
+    
     def __init__(self):
         super().__init__()
         self.setWindowTitle("代理IP网站访问器")
         self.setGeometry(100, 100, 1200, 800)
         self.setStyleSheet(self.get_style_sheet())
         
-        # 创建代理管理器
-        self.proxy_manager = ProxyManager(self)
+        # 流式读取的URL文件路径
+        self.url_file = ''
+        
+        # 所有线程的日志先进入日志总线，由定时器批量刷新到界面
+        self.log_bus = LogBus()
+        self.log_handler = install_log_bus(self.log_bus)
+        self.log_history = deque(maxlen=LOG_MAX_LINES)
+        
+        # 异步事件循环线程在第一次使用时才启动（见 loop 属性）
+        self.asyncio_thread = None
+        
+        # 创建代理管理器（不依赖界面组件）
+        self.proxy_manager = ProxyManager(on_status=self.proxy_status_signal.emit)
+        
+        # 添加防抖定时器
+        self.save_timer = QTimer()
+        self.save_timer.setSingleShot(True)
+        self.save_timer.timeout.connect(self._do_save_config)
+        self.show_save_message = True
+        # 配置在后台线程中写入；URL 文本只在文本框内容变化后才重新读取和保存
+        self.config_writer = ConfigWriter(CONFIG_FILE)
+        self.saved_urls_revision = None
+        self.loading_config = False
+        
+        # URL任务表的数据模型；引擎的访问结果先进入缓冲区，由定时器批量合并到表格
+        self.task_model = TaskTableModel(self)
+        self.visit_updates = VisitUpdateBuffer()
         
         # 创建中心部件
         central_widget = QWidget()
@@ -31,7 +96,7 @@ class MainWindow(QMainWindow):
         # 创建主要内容（左右布局）
         (
             content_frame, 
-            self.url_input, 
+            self.url_table, 
             self.browser_mode_group, 
             self.log_text,
             self.min_time_input,
@@ -41,25 +106,91 @@ class MainWindow(QMainWindow):
             self.thread_slider,
             self.start_btn,
             self.stop_btn,
+            self.resume_btn,
             self.save_btn,
-            self.load_btn
-        ) = create_main_content(self.proxy_manager)
+            self.load_btn,
+            self.recycle_input,
+            self.progress_label,
+            self.url_file_label,
+            self.url_file_btn,
+            self.url_file_clear_btn,
+            self.url_actions,
+            self.proxy_input,
+            self.proxy_status,
+            self.test_btn,
+            self.log_level_combo,
+            self.advanced
+        ) = create_main_content()
         main_layout.addWidget(content_frame)
         
+        self.url_table.setModel(self.task_model)
+        self.url_table.horizontalHeader().setSectionResizeMode(URL_COLUMN, QHeaderView.ResizeMode.Stretch)
+        
+        self.table_timer = QTimer()
+        self.table_timer.timeout.connect(self.flush_visit_updates)
+        self.table_timer.start(TABLE_FLUSH_INTERVAL)
+        
+        self.log_timer = QTimer()
+        self.log_timer.timeout.connect(self.flush_logs)
+        self.log_timer.start(LOG_FLUSH_INTERVAL)
+        
         # 连接信号
-        self.save_btn.clicked.connect(self.proxy_manager.save_config)
-        self.load_btn.clicked.connect(self.proxy_manager.load_config)
-        self.url_input.textChanged.connect(self.auto_save_config)
-        self.proxy_manager.proxy_input.textChanged.connect(self.auto_save_config)
+        self.log_level_combo.currentIndexChanged.connect(self.refresh_log_view)
+        self.proxy_status_signal.connect(self.proxy_status.setText)
+        self.proxy_input.textChanged.connect(
+            lambda: self.proxy_manager.set_proxy_string(self.proxy_input.toPlainText())
+        )
+        self.test_btn.clicked.connect(self.handle_test_proxy)
+        self.save_btn.clicked.connect(self.save_config)
+        self.load_btn.clicked.connect(self.load_config)
+        self.task_model.entries_changed.connect(self.on_url_entries_changed)
+        self.url_actions['entry'].returnPressed.connect(self.add_url_entry)
+        self.url_actions['add'].clicked.connect(self.add_url_entry)
+        self.url_actions['paste'].clicked.connect(self.paste_urls)
+        self.url_actions['import'].clicked.connect(self.import_url_file)
+        self.url_actions['remove'].clicked.connect(self.remove_selected_urls)
+        self.url_actions['clear'].clicked.connect(self.task_model.clear)
+        self.url_import_signal.connect(self.finish_url_import)
+        self.proxy_input.textChanged.connect(self.auto_save_config)
         self.thread_slider.valueChanged.connect(self.auto_save_config)
         self.min_time_input.valueChanged.connect(self.auto_save_config)
         self.max_time_input.valueChanged.connect(self.auto_save_config)
         self.min_interval_input.valueChanged.connect(self.auto_save_config)
         self.max_interval_input.valueChanged.connect(self.auto_save_config)
+        self.recycle_input.valueChanged.connect(self.auto_save_config)
         self.browser_mode_group.buttonClicked.connect(self.auto_save_config)
+        self.advanced['metrics_file'].textChanged.connect(self.auto_save_config)
+        self.advanced['collect_web_vitals'].toggled.connect(self.auto_save_config)
+        self.advanced['vitals_file'].textChanged.connect(self.auto_save_config)
+        self.advanced['checkpoint_file'].textChanged.connect(self.auto_save_config)
+        self.advanced['ip_check'].toggled.connect(self.auto_save_config)
+        self.advanced['ip_check_url'].textChanged.connect(self.auto_save_config)
+        self.advanced['resource_policy'].currentIndexChanged.connect(self.auto_save_config)
+        self.advanced['session_pool_size'].valueChanged.connect(self.auto_save_config)
+        self.advanced['session_validate_concurrency'].valueChanged.connect(self.auto_save_config)
+        self.advanced['session_reuse_visits'].valueChanged.connect(self.auto_save_config)
+        self.advanced['adaptive_concurrency'].toggled.connect(self.auto_save_config)
+        self.advanced['launch_profile'].currentIndexChanged.connect(self.auto_save_config)
+        self.advanced['max_browser_rss_mb'].valueChanged.connect(self.auto_save_config)
+        self.advanced['adaptive_min_workers'].valueChanged.connect(self.auto_save_config)
+        self.advanced['shards'].valueChanged.connect(self.auto_save_config)
+        self.advanced['session_reuse_seconds'].valueChanged.connect(self.auto_save_config)
+        self.url_file_btn.clicked.connect(self.choose_url_file)
+        self.url_file_clear_btn.clicked.connect(lambda: self.set_url_file(''))
+        
+    def deferred_init(self):
+        """窗口显示后再执行的初始化，避免推迟窗口出现"""
+        with startup_profile.step('加载配置'):
+            self.load_config()
         
-        # 自动加载配置
-        self.proxy_manager.load_config()
+    @property
+    def loop(self):
+        """后台事件循环，第一次使用时启动线程"""
+        if self.asyncio_thread is None:
+            with startup_profile.step('启动事件循环线程'):
+                self.asyncio_thread = AsyncioThread()
+                self.asyncio_thread.start()
+        return self.asyncio_thread.loop
         
     def create_separator(self):
         from PyQt6.QtWidgets import QFrame
@@ -128,14 +259,14 @@ class MainWindow(QMainWindow):
                 margin-bottom: 5px;
             }
             
-            QTextEdit, QLineEdit {
+            QTextEdit, QPlainTextEdit, QLineEdit {
                 border: 1px solid #bdc3c7;
                 border-radius: 4px;
                 padding: 5px;
                 background-color: white;
             }
             
-            QTextEdit:focus, QLineEdit:focus {
+            QTextEdit:focus, QPlainTextEdit:focus, QLineEdit:focus {
                 border-color: #3498db;
             }
             
@@ -288,12 +419,214 @@ class MainWindow(QMainWindow):
         """
         
     def closeEvent(self, event):
-        self.proxy_manager.close()
+        self.log_timer.stop()
+        self.table_timer.stop()
+        if self.save_timer.isActive():
+            self.save_timer.stop()
+            self._do_save_config()
+        self.config_writer.close()
+        logging.getLogger().removeHandler(self.log_handler)
+        if self.asyncio_thread:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.asyncio_thread.wait()
         event.accept() 
         
+    def log(self, message, level=logging.INFO):
+        """写日志（任意线程可调用）"""
+        logger.log(level, message)
+        
+    def flush_logs(self):
+        """把日志总线中的新日志批量追加到界面"""
+        records, dropped = self.log_bus.drain()
+        if dropped:
+            records.insert(0, (time.time(), logging.WARNING, f"日志过多，已丢弃 {dropped} 条"))
+        if not records:
+            return
+        self.log_history.extend(records)
+        min_level = self.log_level_combo.currentData()
+        lines = [format_record(r) for r in records if r[1] >= min_level]
+        if lines:
+            self.log_text.appendPlainText('\n'.join(lines))
+            
+    def refresh_log_view(self):
+        """切换显示级别后重新显示最近的日志"""
+        min_level = self.log_level_combo.currentData()
+        self.log_text.setPlainText('\n'.join(
+            format_record(r) for r in self.log_history if r[1] >= min_level
+        ))
+        self.log_text.moveCursor(QTextCursor.MoveOperation.End)
+        
+    def handle_test_proxy(self):
+        """处理测试代理按钮点击"""
+        ip_check_url = self.advanced['ip_check_url'].text().strip() or None
+        future = asyncio.run_coroutine_threadsafe(self.proxy_manager.test_proxy(ip_check_url), self.loop)
+        future.add_done_callback(lambda f: self.handle_async_result(f, "测试代理"))
+        
+    def handle_async_result(self, future, operation):
+        """处理异步操作的结果"""
+        try:
+            future.result()
+        except Exception as e:
+            self.log(f"{operation}时发生错误: {str(e)}", logging.ERROR)
+            
+    def collect_config(self, include_urls=True):
+        """从界面收集当前配置，include_urls 为 False 时不读取 URL 文本"""
+        config = {
+            'url_file': self.url_file,
+            'proxy_string': self.proxy_input.toPlainText(),
+            'thread_count': self.thread_slider.value(),
+            'min_time': self.min_time_input.value(),
+            'max_time': self.max_time_input.value(),
+            'min_interval': self.min_interval_input.value(),
+            'max_interval': self.max_interval_input.value(),
+            'headless': self.get_browser_mode(),
+            'max_contexts_per_browser': self.recycle_input.value(),
+            'metrics_file': self.advanced['metrics_file'].text().strip(),
+            'collect_web_vitals': self.advanced['collect_web_vitals'].isChecked(),
+            'vitals_file': self.advanced['vitals_file'].text().strip(),
+            'checkpoint_file': self.advanced['checkpoint_file'].text().strip(),
+            'ip_check': self.advanced['ip_check'].isChecked(),
+            'ip_check_url': self.advanced['ip_check_url'].text().strip(),
+            'resource_policy': self.advanced['resource_policy'].currentData(),
+            'session_pool_size': self.advanced['session_pool_size'].value(),
+            'session_validate_concurrency': self.advanced['session_validate_concurrency'].value(),
+            'session_reuse_visits': self.advanced['session_reuse_visits'].value(),
+            'session_reuse_seconds': self.advanced['session_reuse_seconds'].value(),
+            'adaptive_concurrency': self.advanced['adaptive_concurrency'].isChecked(),
+            'adaptive_min_workers': self.advanced['adaptive_min_workers'].value(),
+            'shards': self.advanced['shards'].value(),
+            'launch_profile': self.advanced['launch_profile'].currentData(),
+            'max_browser_rss_mb': self.advanced['max_browser_rss_mb'].value()
+        }
+        if include_urls:
+            config['urls'] = self.task_model.to_text()
+        return config
+        
+    def save_config(self, show_message=True):
+        """保存配置到文件（带防抖）"""
+        self.save_timer.stop()
+        self.save_timer.start(1000)  # 1秒后执行保存
+        self.show_save_message = show_message
+        
+    def _do_save_config(self):
+        """收集配置并交给后台线程写入"""
+        try:
+            revision = self.task_model.revision
+            urls_changed = revision != self.saved_urls_revision
+            config = self.collect_config(include_urls=urls_changed)
+            self.saved_urls_revision = revision
+            self.config_writer.submit(
+                config, config.pop('urls', None),
+                "配置已保存" if self.show_save_message else None
+            )
+        except Exception as e:
+            self.log(f"保存配置失败: {str(e)}", logging.ERROR)
+            
+    def load_config(self):
+        """从文件加载配置"""
+        try:
+            if not os.path.exists(CONFIG_FILE):
+                self.log("未找到配置文件", logging.WARNING)
+                return
+            config = load_config(CONFIG_FILE)
+            
+            # 暂时禁用自动保存
+            widgets = [
+                self.proxy_input, self.thread_slider,
+                self.min_time_input, self.max_time_input,
+                self.min_interval_input, self.max_interval_input,
+                self.recycle_input,
+                self.advanced['metrics_file'],
+                self.advanced['collect_web_vitals'],
+                self.advanced['vitals_file'],
+                self.advanced['checkpoint_file'],
+                self.advanced['ip_check'],
+                self.advanced['ip_check_url'],
+                self.advanced['resource_policy'],
+                self.advanced['session_pool_size'],
+                self.advanced['session_validate_concurrency'],
+                self.advanced['session_reuse_visits'],
+                self.advanced['session_reuse_seconds'],
+                self.advanced['adaptive_concurrency'],
+                self.advanced['adaptive_min_workers'],
+                self.advanced['shards'],
+                self.advanced['launch_profile'],
+                self.advanced['max_browser_rss_mb']
+            ]
+            for widget in widgets:
+                widget.blockSignals(True)
+            # 表格模型不能屏蔽信号（视图依赖模型信号刷新），改用标记跳过自动保存
+            self.loading_config = True
+                
+            try:
+                # 加载配置
+                self.task_model.set_text(
+                    config['urls'],
+                    on_error=lambda line: self.log(f"错误的访问次数格式: {line.strip()}", logging.WARNING)
+                )
+                self.saved_urls_revision = self.task_model.revision
+                self.update_url_summary()
+                self.proxy_input.setPlainText(config['proxy_string'])
+                self.proxy_manager.set_proxy_file(config['proxy_file'])
+                self.proxy_manager.set_proxy_string(config['proxy_string'])
+                thread_count = config['thread_count']
+                self.thread_slider.setValue(thread_count)
+                # 确保显示值也更新
+                for value_label in self.findChildren(QLabel):
+                    if value_label.objectName() == "valueLabel":
+                        value_label.setText(str(thread_count))
+                        break
+                
+                self.min_time_input.setValue(config['min_time'])
+                self.max_time_input.setValue(config['max_time'])
+                self.min_interval_input.setValue(config['min_interval'])
+                self.max_interval_input.setValue(config['max_interval'])
+                self.recycle_input.setValue(config['max_contexts_per_browser'])
+                self.advanced['metrics_file'].setText(config['metrics_file'])
+                self.advanced['collect_web_vitals'].setChecked(config['collect_web_vitals'])
+                self.advanced['vitals_file'].setText(config['vitals_file'])
+                self.advanced['checkpoint_file'].setText(config['checkpoint_file'])
+                self.advanced['ip_check'].setChecked(config['ip_check'])
+                self.advanced['ip_check_url'].setText(config['ip_check_url'])
+                policy_index = self.advanced['resource_policy'].findData(config['resource_policy'])
+                self.advanced['resource_policy'].setCurrentIndex(max(0, policy_index))
+                self.advanced['session_pool_size'].setValue(config['session_pool_size'])
+                self.advanced['session_validate_concurrency'].setValue(config['session_validate_concurrency'])
+                self.advanced['session_reuse_visits'].setValue(config['session_reuse_visits'])
+                self.advanced['session_reuse_seconds'].setValue(config['session_reuse_seconds'])
+                self.advanced['adaptive_concurrency'].setChecked(config['adaptive_concurrency'])
+                self.advanced['adaptive_min_workers'].setValue(config['adaptive_min_workers'])
+                self.advanced['shards'].setValue(config['shards'])
+                profile_index = self.advanced['launch_profile'].findData(config['launch_profile'])
+                self.advanced['launch_profile'].setCurrentIndex(max(0, profile_index))
+                self.advanced['max_browser_rss_mb'].setValue(config['max_browser_rss_mb'])
+                
+                self.url_file = config['url_file']
+                self.url_file_label.setText(f"URL文件: {self.url_file}" if self.url_file else "未选择URL文件")
+                self.set_url_list_enabled(not self.url_file)
+                
+                # 设置浏览器模式
+                headless = config['headless']
+                for button in self.browser_mode_group.buttons():
+                    if (button.text() == "无头模式（后台运行）") == headless:
+                        button.setChecked(True)
+                        break
+                    
+                if self.proxy_manager.has_proxy():
+                    self.proxy_manager.generate_proxy_session()
+                    
+                self.log("配置已加载")
+            finally:
+                # 恢复自动保存
+                for widget in widgets:
+                    widget.blockSignals(False)
+                self.loading_config = False
+        except Exception as e:
+            self.log(f"加载配置失败: {str(e)}", logging.ERROR)
+        
     def auto_save_config(self):
         """自动保存配置"""
-        self.proxy_manager.save_config(show_message=False) 
+        self.save_config(show_message=False) 
         
     def get_current_proxy(self):
         """获取当前代理信息的代理方法"""
@@ -308,6 +641,136 @@ class MainWindow(QMainWindow):
             'max_interval': self.max_interval_input.value()
         } 
         
+    def choose_url_file(self):
+        """选择URL文件（只记录路径，开始访问时才流式读取）"""
+        from PyQt6.QtWidgets import QFileDialog
+        path, _ = QFileDialog.getOpenFileName(
+            self, "选择URL文件", "", "URL文件 (*.txt *.gz);;所有文件 (*)"
+        )
+        if path:
+            self.set_url_file(path)
+            
+    def set_url_file(self, path):
+        """设置URL文件，设置后文本框中的URL不再使用"""
+        self.url_file = path or ''
+        self.url_file_label.setText(f"URL文件: {self.url_file}" if self.url_file else "未选择URL文件")
+        self.set_url_list_enabled(not self.url_file)
+        self.auto_save_config()
+        
+    def set_url_list_enabled(self, enabled):
+        """使用URL文件时禁用任务表的编辑"""
+        self.url_table.setEnabled(enabled)
+        for name in ('entry', 'add', 'paste', 'import', 'remove', 'clear'):
+            self.url_actions[name].setEnabled(enabled)
+            
+    def on_url_entries_changed(self):
+        self.update_url_summary()
+        if not self.loading_config:
+            self.auto_save_config()
+            
+    def update_url_summary(self):
+        self.url_actions['summary'].setText(
+            f"共 {len(self.task_model.urls)} 个URL，计划 {self.task_model.total_planned} 次"
+        )
+        
+    def add_urls_from_text(self, text):
+        """解析 '网址----访问次数' 格式的文本并加入任务表"""
+        entries = parse_url_text(
+            text, on_error=lambda line: self.log(f"错误的访问次数格式: {line.strip()}", logging.WARNING)
+        )
+        added = self.task_model.add_entries(entries)
+        return entries, added
+        
+    def add_url_entry(self):
+        """添加输入框中的URL"""
+        text = self.url_actions['entry'].text()
+        entries, _ = self.add_urls_from_text(text)
+        if entries:
+            self.url_actions['entry'].clear()
+            
+    def paste_urls(self):
+        """从剪贴板粘贴多行URL"""
+        from PyQt6.QtWidgets import QApplication
+        entries, added = self.add_urls_from_text(QApplication.clipboard().text())
+        self.log(f"已粘贴 {len(entries)} 行，新增 {added} 个URL")
+        
+    def import_url_file(self):
+        """把URL文件（支持 .gz）导入任务表，在后台线程中读取"""
+        from PyQt6.QtWidgets import QFileDialog
+        path, _ = QFileDialog.getOpenFileName(
+            self, "导入URL文件", "", "URL文件 (*.txt *.gz);;所有文件 (*)"
+        )
+        if not path:
+            return
+        self.url_actions['import'].setEnabled(False)
+        threading.Thread(target=self._read_url_file, args=(path,), daemon=True).start()
+        
+    def _read_url_file(self, path):
+        from url_source import iter_url_entries
+        try:
+            entries = list(iter_url_entries(
+                path, on_error=lambda line: self.log(f"错误的访问次数格式: {line}", logging.WARNING)
+            ))
+        except Exception as e:
+            self.log(f"读取URL文件失败: {str(e)}", logging.ERROR)
+            entries = []
+        self.url_import_signal.emit(path, entries)
+        
+    def finish_url_import(self, path, entries):
+        self.url_actions['import'].setEnabled(not self.url_file)
+        if entries:
+            added = self.task_model.add_entries(entries)
+            self.log(f"已从 {path} 导入 {len(entries)} 行，新增 {added} 个URL")
+            
+    def remove_selected_urls(self):
+        rows = [index.row() for index in self.url_table.selectionModel().selectedRows()]
+        self.task_model.remove_rows(rows)
+        
+    def flush_visit_updates(self):
+        """把缓冲区中的访问结果批量合并到任务表"""
+        updates = self.visit_updates.drain()
+        if updates:
+            self.task_model.apply_updates(updates)
+            
+    def reset_visit_stats(self, progress=None):
+        """开始新一轮访问前清空任务表中的访问结果
+
+        progress 为 {url: (成功, 失败)} 时（恢复任务）先填入已有的结果。
+        """
+        self.visit_updates.drain()
+        self.task_model.reset_progress()
+        if progress:
+            self.task_model.apply_updates(
+                {url: (completed, failed, 0.0, 0) for url, (completed, failed) in progress.items()}
+            )
+        
+    def update_progress(self, progress):
+        """更新任务进度显示"""
+        done = progress['completed'] + progress['failed']
+        text = f"进度: {done} / {progress['total']}  (成功 {progress['completed']}，失败 {progress['failed']})"
+        if progress.get('shards', 1) > 1:
+            text += f"  进程: {progress['shards']}"
+        if 'concurrency' in progress:
+            text += f"  并发: {progress['concurrency']}"
+        if 'browser_rss_mb' in progress:
+            text += f"  浏览器内存: {progress['browser_rss_mb']:.0f} MB"
+        pool = progress.get('session_pool')
+        if pool:
+            text += f"  会话池: {pool['depth']} 个可用，命中率 {pool['hit_rate']:.0%}"
+        sessions = progress.get('sessions')
+        if sessions:
+            text += f"  会话复用 {sessions['reused']} 次"
+        proxies = progress.get('proxies')
+        if proxies:
+            text += f"  代理入口: {proxies['available']}/{proxies['total']} 可用"
+        self.progress_label.setText(text)
+        
+    def update_stop_progress(self, data):
+        """显示停止过程中剩余的访问和浏览器数量"""
+        self.progress_label.setText(
+            f"正在停止: 剩余 {data['visits']} 个访问，{data['browsers']} 个浏览器"
+        )
+        
     def get_browser_mode(self):
         """获取浏览器模式设置"""
         return self.browser_mode_group.checkedButton().text() == "无头模式（后台运行）" 
\ No newline at end of file
@@ -0,0 +1,227 @@
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+# 负载均衡策略：名称 -> 显示名称
+BALANCE_STRATEGIES = {
+    'ewma': '延迟加权（EWMA）',
+    'least_outstanding': '最少进行中请求',
+}
+
+
+def parse_proxy_line(line):
+    """解析一行代理配置: 服务器:端口:用户名格式:密码，空行和 # 注释返回 None"""
+    line = line.strip()
+    if not line or line.startswith('#'):
+        return None
+    parts = line.split(':')
+    if len(parts) != 4:
+        raise ValueError(f"代理格式错误，应为: 服务器:端口:用户名格式:密码 ({line})")
+    return ProxyEndpoint(*parts)
+
+
+def parse_proxy_text(text, on_error=None):
+    """解析多行代理配置，格式错误的行交给 on_error(line, error) 处理"""
+    endpoints = []
+    for line in (text or '').splitlines():
+        try:
+            endpoint = parse_proxy_line(line)
+        except ValueError as e:
+            if on_error:
+                on_error(line, e)
+            continue
+        if endpoint:
+            endpoints.append(endpoint)
+    return endpoints
+
+
+class ProxyEndpoint:
+    """一个代理入口（网关），每个入口有自己的用户名模板和密码"""
+
+    def __init__(self, host, port, username_format, password):
+        self.host = host
+        self.port = port
+        self.username_format = username_format
+        self.password = password
+        self.name = f"{host}:{port}"
+        self.outstanding = 0        # 进行中的请求数
+        self.ewma = None            # 延迟的指数加权平均（秒）
+        self.consecutive_failures = 0
+        self.requests = 0
+        self.failures = 0
+        self.ejected = False
+        self.ejected_until = 0.0
+        self.ejections = 0          # 连续被剔除的次数，用于退避
+
+    @property
+    def key(self):
+        return (self.host, self.port, self.username_format, self.password)
+
+    def new_session(self):
+        """在该入口上生成新的粘性会话"""
+        session_id = str(random.randint(100000000, 999999999))
+        username = self.username_format.replace("{sid}", session_id)
+        return {
+            'host': self.host,
+            'port': self.port,
+            'username': username,
+            'password': self.password,
+            'session_id': session_id,
+            'full_proxy': f"http://{username}:{self.password}@{self.host}:{self.port}",
+            'endpoint': self.name,
+        }
+
+    def is_available(self, now):
+        """未被剔除，或剔除冷却已过且没有进行中的试探请求"""
+        if not self.ejected:
+            return True
+        return now >= self.ejected_until and self.outstanding == 0
+
+    def to_dict(self):
+        return {
+            'endpoint': self.name,
+            'outstanding': self.outstanding,
+            'latency': round(self.ewma, 4) if self.ewma is not None else None,
+            'requests': self.requests,
+            'failures': self.failures,
+            'ejected': self.ejected,
+        }
+
+
+class ProxyBalancer:
+    """按延迟和错误率在多个代理入口之间分配会话
+
+    - ewma: 分数为 (进行中请求数 + 1) × 延迟EWMA，随机取两个入口选分数低的；
+            还没有延迟数据的入口优先，便于尽快测得延迟
+    - least_outstanding: 选进行中请求最少的入口
+
+    连续失败 eject_failures 次的入口被剔除，冷却 eject_seconds 秒（再次失败时加倍，
+    最多 8 倍）后允许一次试探请求，成功即恢复。所有入口都被剔除时仍返回
+    最早到期的入口，避免任务停滞。
+    """
+
+    def __init__(self, endpoints=(), strategy='ewma', eject_failures=3, eject_seconds=60, alpha=0.3):
+        self.endpoints = []
+        self._by_name = {}
+        self.strategy = strategy
+        self.eject_failures = eject_failures
+        self.eject_seconds = eject_seconds
+        self.alpha = alpha
+        self.set_endpoints(endpoints)
+
+    def configure(self, strategy=None, eject_failures=None, eject_seconds=None):
+        if strategy:
+            if strategy not in BALANCE_STRATEGIES:
+                logger.warning(f"未知的负载均衡策略: {strategy}，使用延迟加权")
+                strategy = 'ewma'
+            self.strategy = strategy
+        if eject_failures is not None:
+            self.eject_failures = max(1, int(eject_failures))
+        if eject_seconds is not None:
+            self.eject_seconds = max(1, float(eject_seconds))
+
+    def set_endpoints(self, endpoints):
+        """更新入口列表，保留未变化入口的统计数据"""
+        previous = {endpoint.key: endpoint for endpoint in self.endpoints}
+        self.endpoints = []
+        self._by_name = {}
+        seen = set()
+        for endpoint in endpoints:
+            if endpoint.key in seen:
+                continue
+            seen.add(endpoint.key)
+            endpoint = previous.get(endpoint.key, endpoint)
+            # 同一网关配置了不同账号时用序号区分
+            name = f"{endpoint.host}:{endpoint.port}"
+            if name in self._by_name:
+                name = f"{name}#{len(self.endpoints) + 1}"
+            endpoint.name = name
+            self.endpoints.append(endpoint)
+            self._by_name[name] = endpoint
+
+    def __len__(self):
+        return len(self.endpoints)
+
+    def get(self, name):
+        return self._by_name.get(name)
+
+    def _score(self, endpoint, default_latency):
+        latency = endpoint.ewma if endpoint.ewma is not None else default_latency
+        return (endpoint.outstanding + 1) * latency
+
+    def pick(self):
+        """选择一个入口，没有配置入口时返回 None"""
+        if not self.endpoints:
+            return None
+        if len(self.endpoints) == 1:
+            return self.endpoints[0]
+
+        now = time.monotonic()
+        candidates = [e for e in self.endpoints if e.is_available(now)]
+        if not candidates:
+            return min(self.endpoints, key=lambda e: e.ejected_until)
+
+        if self.strategy == 'least_outstanding':
+            low = min(e.outstanding for e in candidates)
+            return random.choice([e for e in candidates if e.outstanding == low])
+
+        fresh = [e for e in candidates if e.ewma is None]
+        if fresh:
+            return min(fresh, key=lambda e: e.outstanding)
+        pair = random.sample(candidates, 2) if len(candidates) > 2 else candidates
+        return min(pair, key=lambda e: self._score(e, 0.0))
+
+    def begin(self, name):
+        """通过该入口的请求开始"""
+        endpoint = self.get(name)
+        if endpoint:
+            endpoint.outstanding += 1
+        return endpoint
+
+    def report(self, name, latency=None, ok=True):
+        """请求结束，更新延迟和错误计数，必要时剔除或恢复入口"""
+        endpoint = self.get(name)
+        if not endpoint:
+            return
+        endpoint.outstanding = max(0, endpoint.outstanding - 1)
+        endpoint.requests += 1
+        if ok:
+            if latency is not None:
+                if endpoint.ewma is None:
+                    endpoint.ewma = latency
+                else:
+                    endpoint.ewma += self.alpha * (latency - endpoint.ewma)
+            endpoint.consecutive_failures = 0
+            if endpoint.ejected:
+                endpoint.ejected = False
+                endpoint.ejections = 0
+                logger.info(f"代理入口 {endpoint.name} 试探成功，已恢复")
+            return
+
+        endpoint.failures += 1
+        endpoint.consecutive_failures += 1
+        if endpoint.ejected or endpoint.consecutive_failures >= self.eject_failures:
+            self._eject(endpoint)
+
+    def _eject(self, endpoint):
+        endpoint.ejections += 1
+        cooldown = self.eject_seconds * min(2 ** (endpoint.ejections - 1), 8)
+        endpoint.ejected = True
+        endpoint.ejected_until = time.monotonic() + cooldown
+        logger.warning(
+            f"代理入口 {endpoint.name} 连续失败 {endpoint.consecutive_failures} 次，"
+            f"暂停使用 {cooldown:.0f} 秒"
+        )
+
+    def due_for_probe(self):
+        """剔除冷却已过、等待试探的入口"""
+        now = time.monotonic()
+        return [e for e in self.endpoints if e.ejected and e.is_available(now)]
+
+    def available_count(self):
+        return sum(1 for e in self.endpoints if not e.ejected)
+
+    def stats(self):
+        return [endpoint.to_dict() for endpoint in self.endpoints]
@@ -1,204 +1,109 @@
-import json
-import os
 import asyncio
-import aiohttp
-import random
-from PyQt6.QtCore import QThread, QTimer
-from PyQt6.QtWidgets import QLabel
+import logging
+from ip_lookup import DEFAULT_IP_CHECK_URL, parse_ip
+from proxy_balancer import ProxyBalancer, parse_proxy_text
 
-class AsyncioThread(QThread):
-    def run(self):
-        self.loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(self.loop)
-        self.loop.run_forever()
+logger = logging.getLogger(__name__)
 
 class ProxyManager:
-    def __init__(self, main_window):
-        self.main_window = main_window
-        self.proxy_input = None
-        self.proxy_status = None
-        
-        # 创建并启动异步事件循环线程
-        self.asyncio_thread = AsyncioThread()
-        self.asyncio_thread.start()
-        
-        # 等待事件循环准备好
-        while not hasattr(self.asyncio_thread, 'loop'):
-            pass
-        
-        self.loop = self.asyncio_thread.loop
-        
-        # 添加防抖定时器
-        self.save_timer = None
-        self.save_timer = QTimer()
-        self.save_timer.setSingleShot(True)
-        self.save_timer.timeout.connect(self._do_save_config)
-        
+    """代理会话管理，不依赖界面组件，GUI 和命令行共用
+
+    代理配置可以有多行（每行一个入口: 服务器:端口:用户名格式:密码），
+    也可以从 proxy_file 读取；生成会话时由 ProxyBalancer 选择入口。
+    日志通过 logging 输出，on_status(text) 回调可能在任意线程中被调用。
+    """
+
+    def __init__(self, proxy_string='', on_status=None, proxy_file=''):
+        self.on_status = on_status
+        self.current_proxy = None
+        self.balancer = ProxyBalancer()
+        self.proxy_string = ''
+        self.proxy_file = ''
+        self._file_endpoints = []
+        self.set_proxy_file(proxy_file)
+        self.set_proxy_string(proxy_string)
+
+    def _update_endpoints(self):
+        self.balancer.set_endpoints(
+            parse_proxy_text(self.proxy_string) + self._file_endpoints
+        )
+
+    def set_proxy_string(self, proxy_string):
+        """更新代理配置字符串"""
+        self.proxy_string = proxy_string or ''
+        self._update_endpoints()
+
+    def set_proxy_file(self, path):
+        """设置代理列表文件（每行一个入口），与代理配置字符串中的入口合并"""
+        self.proxy_file = path or ''
+        self._file_endpoints = []
+        if self.proxy_file:
+            try:
+                with open(self.proxy_file, 'r', encoding='utf-8') as f:
+                    self._file_endpoints = parse_proxy_text(
+                        f.read(),
+                        on_error=lambda line, e: logger.warning(str(e))
+                    )
+            except Exception as e:
+                logger.error(f"读取代理列表文件失败: {str(e)}")
+        self._update_endpoints()
+
+    def has_proxy(self):
+        return len(self.balancer) > 0
+
     def generate_proxy_session(self):
-        """生成新的代理会话信息"""
+        """在负载均衡选出的入口上生成新的代理会话信息"""
         try:
-            proxy_text = self.proxy_input.text().strip()
-            if not proxy_text:
-                raise ValueError("请输入代理信息")
-                
-            parts = proxy_text.split(':')
-            if len(parts) != 4:
-                raise ValueError("代理格式错误，应为: 服务器:端口:用户名格式:密码")
-                
-            host, port, username_format, password = parts
-            session_id = str(random.randint(100000000, 999999999))
-            username = username_format.replace("{sid}", session_id)
-            
-            proxy_info = {
-                'host': host,
-                'port': port,
-                'username': username,
-                'password': password,
-                'full_proxy': f"http://{username}:{password}@{host}:{port}"
-            }
-            
+            if not self.has_proxy():
+                errors = []
+                parse_proxy_text(self.proxy_string, on_error=lambda line, e: errors.append(e))
+                # 所有行都无法解析时给出具体的格式错误
+                raise errors[0] if errors else ValueError("请输入代理信息")
+
+            endpoint = self.balancer.pick()
+            proxy_info = endpoint.new_session()
+
             self.current_proxy = proxy_info
-            self.proxy_status.setText(f"当前代理: {host}:{port} (会话ID: {session_id})")
+            if self.on_status:
+                self.on_status(
+                    f"当前代理: {proxy_info['host']}:{proxy_info['port']} (会话ID: {proxy_info['session_id']})"
+                )
             return proxy_info
-            
+
         except Exception as e:
-            self.main_window.log_text.append(f"生成代理会话失败: {str(e)}")
+            logger.error(f"生成代理会话失败: {str(e)}")
             return None
-            
+
     def get_current_proxy(self):
         """获取新的代理信息（每次调用都生成新会话）"""
         proxy_info = self.generate_proxy_session()
         if proxy_info:
-            # 确保返回完整的代理信息字典
-            return {
-                'host': proxy_info['host'],
-                'port': proxy_info['port'],
-                'username': proxy_info['username'],
-                'password': proxy_info['password'],
-                'full_proxy': proxy_info['full_proxy']
-            }
+            # 返回副本，避免调用方修改 current_proxy
+            return dict(proxy_info)
         return None
-        
-    async def test_proxy(self):
-        """测试当前代理"""
-        proxy_info = self.generate_proxy_session()
-        if not proxy_info:
-            return
-            
+
+    async def _test_session(self, proxy_info, ip_check_url):
         try:
+            # aiohttp 只在测试代理时导入，不拖慢程序启动
+            import aiohttp
             from aiohttp_socks import ProxyConnector
             connector = ProxyConnector.from_url(proxy_info['full_proxy'])
-            
+
             async with aiohttp.ClientSession(connector=connector) as session:
-                self.main_window.log_text.append(f"正在测试代理: {proxy_info['host']}:{proxy_info['port']}")
-                async with session.get('http://httpbin.org/ip') as response:
+                logger.info(f"正在测试代理: {proxy_info['host']}:{proxy_info['port']}")
+                async with session.get(ip_check_url or DEFAULT_IP_CHECK_URL) as response:
                     if response.status == 200:
-                        result = await response.json()
-                        self.main_window.log_text.append(f"代理测试成功: {result.get('origin')}")
+                        logger.info(f"代理测试成功 {proxy_info['endpoint']}: {parse_ip(await response.text())}")
                     else:
-                        self.main_window.log_text.append(f"代理测试失败: HTTP {response.status}")
+                        logger.warning(f"代理测试失败 {proxy_info['endpoint']}: HTTP {response.status}")
         except Exception as e:
-            self.main_window.log_text.append(f"代理测试出错: {str(e)}")
-            
-    def handle_test_proxy(self):
-        """处理测试代理按钮点击"""
-        future = asyncio.run_coroutine_threadsafe(self.test_proxy(), self.loop)
-        future.add_done_callback(lambda f: self.handle_async_result(f, "测试代理"))
-        
-    def handle_async_result(self, future, operation):
-        """处理异步操作的结果"""
-        try:
-            future.result()
-        except Exception as e:
-            self.main_window.log_text.append(f"{operation}时发生错误: {str(e)}")
-            
-    def save_config(self, show_message=True):
-        """保存配置到文件（带防抖）"""
-        if self.save_timer:
-            self.save_timer.stop()
-        self.save_timer.start(1000)  # 1秒后执行保存
-        self.show_save_message = show_message
-        
-    def _do_save_config(self):
-        """实际执行配置保存"""
-        config = {
-            'urls': self.main_window.url_input.toPlainText(),
-            'proxy_string': self.proxy_input.text(),
-            'thread_count': self.main_window.thread_slider.value(),
-            'min_time': self.main_window.min_time_input.value(),
-            'max_time': self.main_window.max_time_input.value(),
-            'min_interval': self.main_window.min_interval_input.value(),
-            'max_interval': self.main_window.max_interval_input.value(),
-            'headless': self.main_window.get_browser_mode()
-        }
-        
-        try:
-            with open('config.json', 'w', encoding='utf-8') as f:
-                json.dump(config, f, ensure_ascii=False, indent=2)
-            if getattr(self, 'show_save_message', True):
-                self.main_window.log_text.append("配置已保存")
-        except Exception as e:
-            self.main_window.log_text.append(f"保存配置失败: {str(e)}")
-            
-    def load_config(self):
-        """从文件加载配置"""
-        try:
-            if os.path.exists('config.json'):
-                with open('config.json', 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-                    
-                # 暂时禁用自动保存
-                self.main_window.url_input.blockSignals(True)
-                self.proxy_input.blockSignals(True)
-                self.main_window.thread_slider.blockSignals(True)
-                self.main_window.min_time_input.blockSignals(True)
-                self.main_window.max_time_input.blockSignals(True)
-                self.main_window.min_interval_input.blockSignals(True)
-                self.main_window.max_interval_input.blockSignals(True)
-                
-                try:
-                    # 加载配置
-                    self.main_window.url_input.setPlainText(config.get('urls', ''))
-                    self.proxy_input.setText(config.get('proxy_string', ''))
-                    thread_count = config.get('thread_count', 5)
-                    self.main_window.thread_slider.setValue(thread_count)
-                    # 确保显示值也更新
-                    for value_label in self.main_window.findChildren(QLabel):
-                        if value_label.objectName() == "valueLabel":
-                            value_label.setText(str(thread_count))
-                            break
-                    
-                    self.main_window.min_time_input.setValue(config.get('min_time', 10))
-                    self.main_window.max_time_input.setValue(config.get('max_time', 20))
-                    self.main_window.min_interval_input.setValue(config.get('min_interval', 5))
-                    self.main_window.max_interval_input.setValue(config.get('max_interval', 15))
-                    
-                    # 设置浏览器模式
-                    headless = config.get('headless', False)
-                    for button in self.main_window.browser_mode_group.buttons():
-                        if (button.text() == "无头模式（后台运行）") == headless:
-                            button.setChecked(True)
-                            break
-                        
-                    if config.get('proxy_string'):
-                        self.generate_proxy_session()
-                        
-                    self.main_window.log_text.append("配置已加载")
-                finally:
-                    # 恢复自动保存
-                    self.main_window.url_input.blockSignals(False)
-                    self.proxy_input.blockSignals(False)
-                    self.main_window.thread_slider.blockSignals(False)
-                    self.main_window.min_time_input.blockSignals(False)
-                    self.main_window.max_time_input.blockSignals(False)
-                    self.main_window.min_interval_input.blockSignals(False)
-                    self.main_window.max_interval_input.blockSignals(False)
-            else:
-                self.main_window.log_text.append("未找到配置文件")
-        except Exception as e:
-            self.main_window.log_text.append(f"加载配置失败: {str(e)}")
-            
-    def close(self):
-        """关闭代理管理器"""
-        self.loop.call_soon_threadsafe(self.loop.stop)
-        self.asyncio_thread.wait() 
\ No newline at end of file
+            logger.error(f"代理测试出错 {proxy_info['endpoint']}: {str(e)}")
+
+    async def test_proxy(self, ip_check_url=None):
+        """测试所有代理入口"""
+        if not self.generate_proxy_session():
+            return
+        await asyncio.gather(*(
+            self._test_session(endpoint.new_session(), ip_check_url)
+            for endpoint in self.balancer.endpoints
+        ))
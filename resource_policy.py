@@ -0,0 +1,129 @@
+import logging
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# 常见的统计和广告域名，"极简"策略会屏蔽
+TRACKER_DOMAINS = [
+    'google-analytics.com', 'googletagmanager.com', 'googlesyndication.com',
+    'doubleclick.net', 'googleadservices.com', 'facebook.net', 'connect.facebook.com',
+    'hotjar.com', 'clarity.ms', 'hm.baidu.com', 'cnzz.com', 'scorecardresearch.com',
+]
+
+# 预设策略：名称 -> (显示名称, 配置)
+POLICY_PRESETS = {
+    'full': ('完整加载', {}),
+    'lean': ('节省流量（屏蔽图片/字体/媒体）', {
+        'block_types': ['image', 'media', 'font'],
+    }),
+    'minimal': ('极简（另屏蔽样式表和统计脚本）', {
+        'block_types': ['image', 'media', 'font', 'stylesheet', 'texttrack', 'eventsource'],
+        'deny_domains': TRACKER_DOMAINS,
+    }),
+}
+
+
+def _host_matches(host, domains):
+    return any(host == d or host.endswith('.' + d) for d in domains)
+
+
+class ResourceStats:
+    """一次访问中放行和屏蔽的请求数及字节数
+
+    放行字节数来自响应头 Content-Length，分块传输的响应无法统计；
+    被屏蔽的请求没有发出，不产生流量。
+    """
+
+    def __init__(self):
+        self.allowed_requests = 0
+        self.allowed_bytes = 0
+        self.blocked_requests = 0
+
+    def on_response(self, response):
+        self.allowed_requests += 1
+        try:
+            self.allowed_bytes += int(response.headers.get('content-length') or 0)
+        except ValueError:
+            pass
+
+    def to_dict(self):
+        return {
+            'allowed_requests': self.allowed_requests,
+            'allowed_bytes': self.allowed_bytes,
+            'blocked_requests': self.blocked_requests,
+        }
+
+
+class ResourcePolicy:
+    """基于 Playwright 请求路由的资源策略
+
+    - block_types:   按资源类型屏蔽（image / font / media / stylesheet ...）
+    - allow_domains: 非空时只放行这些域名（及其子域名）
+    - deny_domains:  屏蔽这些域名（及其子域名）
+
+    页面导航请求（主文档）始终放行。只能按请求屏蔽：路由在响应之前执行，
+    Playwright 无法截断已经开始下载的响应，因此不提供按响应大小屏蔽。
+    """
+
+    def __init__(self, block_types=(), allow_domains=(), deny_domains=()):
+        self.block_types = set(block_types)
+        self.allow_domains = [d.lower().lstrip('.') for d in allow_domains if d]
+        self.deny_domains = [d.lower().lstrip('.') for d in deny_domains if d]
+
+    @classmethod
+    def from_settings(cls, settings):
+        """按预设策略创建，并合并配置中单独指定的规则"""
+        name = settings.get('resource_policy') or 'full'
+        if name not in POLICY_PRESETS:
+            logger.warning(f"未知的资源策略: {name}，使用完整加载")
+            name = 'full'
+        preset = POLICY_PRESETS[name][1]
+        return cls(
+            block_types=list(preset.get('block_types', [])) + list(settings.get('block_resource_types') or []),
+            allow_domains=settings.get('allow_domains') or [],
+            deny_domains=list(preset.get('deny_domains', [])) + list(settings.get('deny_domains') or []),
+        )
+
+    @property
+    def is_active(self):
+        """是否需要拦截请求（完整加载时不注册路由，避免额外开销）"""
+        return bool(self.block_types or self.allow_domains or self.deny_domains)
+
+    def should_block(self, url, resource_type):
+        """返回屏蔽原因，放行时返回 None"""
+        if resource_type in self.block_types:
+            return resource_type
+        host = (urlsplit(url).hostname or '').lower()
+        if not host:
+            return None
+        if self.deny_domains and _host_matches(host, self.deny_domains):
+            return 'deny_domain'
+        if self.allow_domains and not _host_matches(host, self.allow_domains):
+            return 'not_allowed'
+        return None
+
+    async def attach(self, context, stats):
+        """在上下文上注册请求路由和响应统计"""
+        context.on('response', stats.on_response)
+        if not self.is_active:
+            return
+
+        async def handle(route, request):
+            try:
+                if request.is_navigation_request():
+                    await route.continue_()
+                    return
+                if self.should_block(request.url, request.resource_type):
+                    stats.blocked_requests += 1
+                    await route.abort('blockedbyclient')
+                    return
+                await route.continue_()
+            except Exception as e:
+                # 页面或上下文已关闭时路由会失败；其他情况下必须结束路由，否则页面加载会一直等到超时
+                logger.debug(f"处理请求路由出错: {str(e)}")
+                try:
+                    await route.abort()
+                except Exception:
+                    pass
+
+        await context.route('**/*', handle)
@@ -0,0 +1,108 @@
+"""一次运行的输出：访问记录文件、断点文件和页面性能汇总
+
+VisitEngine、ShardedEngine 和 Coordinator 共用，负责打开、逐条记录、定期写入断点和关闭。
+分片和分布式运行时只由协调的一方写入，工作进程和工作节点不再单独输出。
+"""
+import asyncio
+import logging
+from checkpoint import open_checkpoint, close_checkpoint
+from visit_metrics import MetricsWriter
+from web_vitals import VitalsAggregator
+
+logger = logging.getLogger(__name__)
+
+
+class RunOutputs:
+    """按运行参数打开访问记录文件（metrics_file）、断点文件（checkpoint_file）和页面性能汇总
+
+    - task_source: 新任务时据此在断点文件中记录访问计划
+    - resume: 继续写入上次的断点文件
+    - aggregate_vitals: 为 False 时不汇总页面性能指标（由协调方汇总）
+    """
+
+    def __init__(self, settings, task_source, resume=False, aggregate_vitals=True):
+        self.settings = settings
+        self.task_source = task_source
+        self.resume = resume
+        self.metrics_writer = None
+        self.checkpoint = None
+        self.vitals = None
+        if settings.get('collect_web_vitals') and aggregate_vitals:
+            self.vitals = VitalsAggregator()
+        self.checkpoint_interval = max(0.2, float(settings.get('checkpoint_interval', 2) or 2))
+        self.loop = None
+        self._flush_task = None
+        self._flushing = None  # 线程池中正在进行的定期写入
+
+    async def open(self):
+        """打开输出文件，返回上次中断时仍在进行的访问数（继续上次任务时）"""
+        self.loop = asyncio.get_running_loop()
+        metrics_file = self.settings.get('metrics_file')
+        if metrics_file:
+            try:
+                self.metrics_writer = MetricsWriter(metrics_file)
+            except Exception as e:
+                logger.warning(f"无法写入访问记录文件: {str(e)}")
+        interrupted = 0
+        checkpoint_file = self.settings.get('checkpoint_file')
+        if checkpoint_file:
+            try:
+                self.checkpoint, interrupted = await self.loop.run_in_executor(
+                    None, open_checkpoint, checkpoint_file, self.task_source, self.resume
+                )
+                self._flush_task = asyncio.create_task(self._flush_checkpoint())
+            except Exception as e:
+                logger.warning(f"无法写入断点文件: {str(e)}")
+        return interrupted
+
+    def begin(self, visit_id, url, worker=''):
+        """记录一次访问开始（分片和分布式运行时为任务交给工作进程或节点的时刻）"""
+        if self.checkpoint:
+            self.checkpoint.begin(visit_id, url, worker)
+
+    def discard(self, visit_id, url):
+        """撤销已记录开始但不会有结果的访问（任务重新分配或停止时丢弃），不计入成功或失败"""
+        if self.checkpoint:
+            self.checkpoint.finish(visit_id, url, 'cancelled')
+
+    def record(self, data, outcome):
+        """记录一次访问结果，data 为 VisitRecord.to_dict()，outcome 为 'completed'、'failed' 或 'cancelled'"""
+        if self.metrics_writer:
+            try:
+                self.metrics_writer.write(data)
+            except Exception as e:
+                logger.warning(f"写入访问记录失败: {str(e)}")
+        if self.checkpoint:
+            self.checkpoint.finish(data['visit_id'], data['url'], outcome)
+        if self.vitals is not None:
+            self.vitals.add(data)
+
+    async def _flush_checkpoint(self):
+        """定期把访问进度批量写入断点文件"""
+        while True:
+            await asyncio.sleep(self.checkpoint_interval)
+            # 取消本任务不会中止线程中的写入，shield 保留该 future 供 close() 等待
+            self._flushing = self.loop.run_in_executor(None, self.checkpoint.flush)
+            try:
+                await asyncio.shield(self._flushing)
+            except Exception as e:
+                logger.warning(f"写入断点文件失败: {str(e)}")
+
+    async def close(self, all_done):
+        """关闭所有输出，all_done 表示任务已全部完成（写入断点文件的任务状态）"""
+        loop = asyncio.get_running_loop()
+        if self._flush_task:
+            self._flush_task.cancel()
+            self._flush_task = None
+        if self._flushing:
+            # 等线程中的定期写入结束后再做最后一次写入并关闭连接
+            await asyncio.wait([self._flushing])
+            self._flushing = None
+        if self.metrics_writer:
+            self.metrics_writer.close()
+            self.metrics_writer = None
+        if self.vitals is not None:
+            await loop.run_in_executor(None, self.vitals.finish, self.settings.get('vitals_file', ''))
+        if self.checkpoint:
+            await loop.run_in_executor(None, close_checkpoint, self.checkpoint, all_done)
+            self.checkpoint = None
@@ -0,0 +1,113 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+IDLE = 'idle'
+STARTING = 'starting'
+RUNNING = 'running'
+DRAINING = 'draining'
+STOPPED = 'stopped'
+
+STATE_NAMES = {
+    IDLE: '空闲',
+    STARTING: '正在启动',
+    RUNNING: '运行中',
+    DRAINING: '正在停止',
+    STOPPED: '已停止',
+}
+
+# 允许的状态转换
+TRANSITIONS = {
+    IDLE: {STARTING},
+    STARTING: {RUNNING, STOPPED},
+    RUNNING: {DRAINING, STOPPED},
+    DRAINING: {STOPPED},
+    STOPPED: {STARTING},
+}
+
+
+class RunLifecycle:
+    """一次访问任务的生命周期：空闲 → 正在启动 → 运行中 → 正在停止 → 已停止
+
+    状态只由事件驱动（按钮点击、引擎的 started / finished 事件），不轮询；
+    转换过程中收到的开始/停止请求会排队，在到达稳定状态后执行。
+    所有方法都应在同一个线程（GUI 线程）中调用。
+
+    - start_run():  开始一次运行，返回 False 表示没有启动（例如缺少URL）
+    - stop_run():   请求引擎停止
+    - on_change(old, new): 状态变化回调
+    """
+
+    def __init__(self, start_run, stop_run, on_change=None):
+        self.start_run = start_run
+        self.stop_run = stop_run
+        self.on_change = on_change
+        self.state = IDLE
+        self.pending = None  # 排队中的请求: 'start' / 'stop'
+
+    @property
+    def is_active(self):
+        return self.state in (STARTING, RUNNING, DRAINING)
+
+    def _transition(self, state):
+        if state not in TRANSITIONS[self.state]:
+            raise RuntimeError(f"无效的状态转换: {self.state} -> {state}")
+        old, self.state = self.state, state
+        logger.debug(f"运行状态: {STATE_NAMES[old]} -> {STATE_NAMES[state]}")
+        if self.on_change:
+            self.on_change(old, state)
+
+    def request_start(self):
+        if self.state in (IDLE, STOPPED):
+            self.pending = None
+            self._transition(STARTING)
+            try:
+                started = self.start_run()
+            except Exception as e:
+                logger.error(f"启动任务失败: {str(e)}")
+                started = False
+            if not started:
+                self._transition(STOPPED)
+        elif self.state == DRAINING:
+            self.pending = 'start'
+            logger.info("上一个任务正在停止，停止完成后自动开始")
+        elif self.pending == 'stop':
+            # 启动过程中先点了停止又点开始，取消排队的停止
+            self.pending = None
+            logger.info("已取消排队的停止请求")
+        else:
+            logger.info("任务正在运行，请先停止当前任务")
+
+    def request_stop(self):
+        if self.state == STARTING:
+            self.pending = 'stop'
+            logger.info("任务正在启动，启动完成后立即停止")
+        elif self.state == RUNNING:
+            self._transition(DRAINING)
+            self.stop_run()
+        elif self.state == DRAINING:
+            if self.pending == 'start':
+                self.pending = None
+                logger.info("已取消排队的开始请求")
+            else:
+                logger.info("正在等待停止完成...")
+        else:
+            logger.info("没有正在运行的任务")
+
+    def started(self):
+        """引擎已启动完毕（浏览器就绪）"""
+        if self.state != STARTING:
+            return
+        self._transition(RUNNING)
+        if self.pending == 'stop':
+            self.pending = None
+            self.request_stop()
+
+    def finished(self):
+        """引擎已退出（完成、被停止或启动失败）"""
+        if not self.is_active:
+            return
+        self._transition(STOPPED)
+        if self.pending == 'start':
+            self.pending = None
+            self.request_start()
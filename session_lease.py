@@ -0,0 +1,102 @@
+import re
+import time
+from collections import deque
+
+# 会话剩余时间少于该值时不再分配，避免访问途中会话过期
+EXPIRY_MARGIN = 30
+
+
+def parse_session_ttl(username_template):
+    """从用户名模板中解析会话时长（如 sessTime-120 表示 120 分钟），返回秒数"""
+    match = re.search(r'sesstime-(\d+)', username_template or '', re.IGNORECASE)
+    return int(match.group(1)) * 60 if match else None
+
+
+class SessionLease:
+    """一个粘性代理会话的租约"""
+
+    def __init__(self, proxy, expires_at, max_visits):
+        self.proxy = proxy
+        self.expires_at = expires_at
+        self.max_visits = max_visits
+        self.visits = 0
+
+    @property
+    def session_id(self):
+        return self.proxy.get('session_id')
+
+    def is_usable(self, now):
+        if self.max_visits and self.visits >= self.max_visits:
+            return False
+        return self.expires_at is None or now < self.expires_at - EXPIRY_MARGIN
+
+
+class SessionLeaseManager:
+    """粘性会话租约管理
+
+    同一个会话在 max_visits 次访问或 max_seconds 秒内（取先到者）被反复使用，
+    同时不超过代理用户名中 sessTime-N 指定的会话时长；访问出错时提前作废该会话。
+    租约同一时间只分配给一个访问，用完后归还。
+    """
+
+    def __init__(self, new_session, max_visits=1, max_seconds=0, on_expire=None):
+        self.new_session = new_session  # 返回新代理会话的函数
+        self.max_visits = max(0, int(max_visits or 0))
+        self.max_seconds = max(0, int(max_seconds or 0))
+        self.on_expire = on_expire      # 会话作废时回调 on_expire(session_id)
+        self._idle = deque()
+        self.created = 0
+        self.reused = 0
+        self.expired_early = 0
+
+    def _lifetime(self, proxy):
+        limits = [t for t in (self.max_seconds, parse_session_ttl(proxy.get('username'))) if t]
+        return min(limits) if limits else None
+
+    def acquire(self):
+        """分配一个会话租约，没有可复用的会话时创建新会话，失败返回 None"""
+        now = time.monotonic()
+        while self._idle:
+            lease = self._idle.popleft()
+            if lease.is_usable(now):
+                lease.visits += 1
+                self.reused += 1
+                return lease
+            self._expire(lease)
+
+        proxy = self.new_session()
+        if not proxy:
+            return None
+        lifetime = self._lifetime(proxy)
+        lease = SessionLease(proxy, now + lifetime if lifetime else None, self.max_visits)
+        lease.visits = 1
+        self.created += 1
+        return lease
+
+    def release(self, lease, ok=True):
+        """归还租约，出错的会话提前作废"""
+        if not lease:
+            return
+        if not ok:
+            self.expired_early += 1
+            self._expire(lease)
+        elif lease.is_usable(time.monotonic()):
+            self._idle.append(lease)
+        else:
+            self._expire(lease)
+
+    def _expire(self, lease):
+        if self.on_expire:
+            self.on_expire(lease.session_id)
+
+    def clear(self):
+        while self._idle:
+            self._expire(self._idle.popleft())
+
+    def stats(self):
+        return {
+            'idle': len(self._idle),
+            'created': self.created,
+            'reused': self.reused,
+            'expired_early': self.expired_early,
+        }
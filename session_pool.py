@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class ProxySessionPool:
+    """预热的代理会话池
+
+    在后台事件循环中提前生成会话，并发通过代理请求IP查询地址进行校验，
+    记录延迟和出口IP；访问时直接取出已校验的健康会话，池为空时退回为
+    即时生成的未校验会话（记为未命中）。
+    """
+
+    def __init__(self, generate, ip_lookup, size=10, concurrency=5, max_age=300):
+        self.generate = generate        # 生成新会话的函数，返回代理信息字典
+        self.ip_lookup = ip_lookup      # ExitIpLookup，用于校验并缓存出口IP
+        self.size = max(1, int(size))
+        self.max_age = max_age          # 已校验会话的最长保留时间（秒）
+        self._semaphore = asyncio.Semaphore(max(1, int(concurrency)))
+        self._ready = deque()
+        self._validating = 0
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._running = False
+        self._failures = 0
+        self.hits = 0
+        self.misses = 0
+        self.validated = 0
+        self.rejected = 0
+        self.latency_total = 0.0
+
+    def start(self):
+        """开始在当前事件循环中补充会话"""
+        if not self._task:
+            self._running = True
+            self._task = asyncio.create_task(self._fill_loop())
+
+    async def close(self):
+        self._running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        self._ready.clear()
+
+    async def _fill_loop(self):
+        pending = set()
+        while self._running:
+            # 池未满时按并发上限发起校验
+            while self._running and len(self._ready) + self._validating < self.size:
+                self._validating += 1
+                task = asyncio.create_task(self._validate_one())
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+
+            self._wakeup.clear()
+            if self._failures:
+                # 连续校验失败时退避，避免代理或查询地址不可用时空转
+                await asyncio.sleep(min(30, 0.5 * 2 ** min(self._failures, 6)))
+            else:
+                await self._wakeup.wait()
+
+        for task in pending:
+            task.cancel()
+
+    async def _validate_one(self):
+        try:
+            proxy = self.generate()
+            if not proxy:
+                self._failures += 1
+                return
+            async with self._semaphore:
+                start = time.monotonic()
+                try:
+                    ip = await self.ip_lookup.fetch(proxy)
+                except Exception as e:
+                    self.rejected += 1
+                    self._failures += 1
+                    logger.debug(f"代理会话校验失败: {str(e)}")
+                    return
+            latency = time.monotonic() - start
+            self.validated += 1
+            self._failures = 0
+            self.latency_total += latency
+            proxy['latency'] = latency
+            proxy['exit_ip'] = ip
+            proxy['validated_at'] = time.monotonic()
+            self.ip_lookup.remember(proxy.get('session_id'), ip)
+            self._ready.append(proxy)
+        finally:
+            self._validating -= 1
+            self._wakeup.set()
+
+    def get(self):
+        """取出一个健康会话，池为空时即时生成（未校验）"""
+        now = time.monotonic()
+        while self._ready:
+            proxy = self._ready.popleft()
+            self._wakeup.set()
+            if now - proxy['validated_at'] <= self.max_age:
+                self.hits += 1
+                return proxy
+        self.misses += 1
+        self._wakeup.set()
+        return self.generate()
+
+    def stats(self):
+        requests = self.hits + self.misses
+        return {
+            'depth': len(self._ready),
+            'validating': self._validating,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / requests if requests else 0.0,
+            'validated': self.validated,
+            'rejected': self.rejected,
+            'avg_latency': self.latency_total / self.validated if self.validated else None,
+        }
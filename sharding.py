@@ -0,0 +1,456 @@
+"""多进程分片运行
+
+协调进程把任务源中的URL分批放入各工作进程的任务队列，K 个工作进程各自运行一个事件循环、
+浏览器池和 VisitEngine，从自己的队列中领取任务；工作进程的访问记录、进度和日志通过队列
+发回协调进程，合并成与 VisitEngine 相同的事件流，供界面或命令行使用。
+"""
+import asyncio
+import collections
+import itertools
+import logging
+import logging.handlers
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from run_output import RunOutputs
+from visit_metrics import AssignedVisitIds
+
+logger = logging.getLogger(__name__)
+
+# 工作进程转发给协调进程的引擎事件；progress 按间隔节流
+FORWARD_EVENTS = ('started', 'visit', 'stopping', 'finished')
+PROGRESS_INTERVAL = 1.0
+
+
+class QueueTaskSource:
+    """工作进程中的任务源：从进程间队列领取协调进程分发的任务批次
+
+    接口与 WeightedTaskStore 相同（take / planned / exhausted / len），
+    批次为 [(访问编号, url), ...]，队列中的 None 表示没有更多任务。
+    take() 会阻塞，由引擎在线程池中调用；引擎通过 visit_id(url) 取用协调进程分配的编号。
+    """
+
+    def __init__(self, task_queue):
+        self.task_queue = task_queue
+        self.planned = 0
+        self.exhausted = False
+        self.closed = False
+        self._buffer = []
+        self._ids = AssignedVisitIds()
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def take(self, n=1):
+        while not self._buffer and not self.exhausted and not self.closed:
+            try:
+                batch = self.task_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if batch is None:
+                self.exhausted = True
+                break
+            self._ids.add(batch)
+            self._buffer.extend(url for _, url in batch)
+            self.planned += len(batch)
+        batch, self._buffer = self._buffer[:n], self._buffer[n:]
+        return batch
+
+    def visit_id(self, url):
+        return self._ids.pop(url)
+
+    def close(self):
+        self.closed = True
+        self._buffer = []
+        self._ids.clear()
+
+
+class _ShardLogFilter(logging.Filter):
+    """在工作进程的日志前加上分片编号"""
+
+    def __init__(self, shard_id):
+        super().__init__()
+        self.prefix = f"[分片{shard_id + 1}] "
+
+    def filter(self, record):
+        record.msg = self.prefix + record.getMessage()
+        record.args = None
+        return True
+
+
+def worker_main(shard_id, config, settings, task_queue, event_queue, log_queue, stop_flag, log_level):
+    """工作进程入口（multiprocessing spawn 方式启动）"""
+    # Ctrl+C 由协调进程处理，再通过 stop_flag 通知工作进程
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    handler = logging.handlers.QueueHandler(log_queue)
+    handler.addFilter(_ShardLogFilter(shard_id))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(log_level)
+    try:
+        progress = asyncio.run(_run_worker(shard_id, config, settings, task_queue, event_queue, stop_flag))
+    except Exception as e:
+        logger.error(f"工作进程出错: {str(e)}")
+        progress = None
+    event_queue.put((shard_id, 'exit', progress))
+
+
+async def _run_worker(shard_id, config, settings, task_queue, event_queue, stop_flag):
+    # 浏览器相关模块只在工作进程中导入
+    from engine import VisitEngine
+    from proxy_manager import ProxyManager
+
+    proxy_manager = ProxyManager(config.get('proxy_string', ''), proxy_file=config.get('proxy_file', ''))
+    last_progress = [0.0]
+
+    def forward(name, data):
+        if name == 'progress':
+            now = time.monotonic()
+            if now - last_progress[0] < PROGRESS_INTERVAL:
+                return
+            last_progress[0] = now
+        elif name not in FORWARD_EVENTS:
+            return
+        event_queue.put((shard_id, name, data))
+
+    engine = VisitEngine(
+        QueueTaskSource(task_queue),
+        proxy_manager.get_current_proxy,
+        settings,
+        on_event=forward,
+        proxy_balancer=proxy_manager.balancer
+    )
+    finished = threading.Event()
+
+    def watch_stop():
+        # 轮询共享标志而不是等待 multiprocessing.Event：进程在等待中退出会使 Event.set() 永久阻塞
+        while not finished.wait(0.2):
+            if stop_flag.value:
+                engine.stop()
+                return
+
+    threading.Thread(target=watch_stop, daemon=True).start()
+    try:
+        return await engine.run()
+    finally:
+        finished.set()
+
+
+def split_concurrency(total, shards):
+    """把总并发数分给各个分片，余数分给前几个分片，每个分片至少 1"""
+    base, extra = divmod(max(int(total), shards), shards)
+    return [base + (1 if i < extra else 0) for i in range(shards)]
+
+
+class ShardedEngine:
+    """多进程分片访问引擎，对外接口与 VisitEngine 相同（run / stop / progress / on_event）
+
+    - config: 完整配置（工作进程据此创建代理管理器，下发时去掉 urls 文本）
+    - settings: build_settings(config) 的结果，thread_count 为所有分片的总并发数
+    - shards: 工作进程数
+
+    每个工作进程有自己的任务队列，本进程记录每批任务交给了哪个分片，交出时在断点中记为进行中。
+    工作进程异常退出时，它已领取但未完成的任务重新分配给其他分片。
+    访问记录文件和断点文件由本进程统一写入，工作进程不再单独写。
+    """
+
+    def __init__(self, task_source, config, settings, shards, on_event=None, resume=False):
+        self.task_source = task_source
+        self.config = config
+        self.settings = settings
+        self.shards = max(1, int(shards))
+        self.on_event = on_event
+        self.concurrency = split_concurrency(settings.get('thread_count', 5), self.shards)
+        self.slice_size = max(1, int(settings.get('task_batch_size', 0) or max(self.concurrency)))
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.requeued_total = 0
+        self.shard_progress = {}   # 分片编号 -> 最近一次的进度字典
+        self.shard_stopping = {}   # 分片编号 -> 最近一次的停止进度
+        self.started_shards = set()
+        self.live_shards = set()   # 进程仍在运行的分片
+        self.outstanding = {}      # 已交给分片、尚未收到结果的访问编号 -> (分片编号, url)
+        self.requeued = collections.deque()
+        self.source_drained = False
+        self.all_done = False
+        self.is_running = False
+        self.stop_requested_at = None
+        self.stop_latency = None
+        self.loop = None
+        # 访问记录、断点和页面性能汇总由本进程统一处理
+        self.outputs = RunOutputs(settings, task_source, resume)
+        self._context = multiprocessing.get_context('spawn')
+        self._task_queues = []
+        self._event_queue = None
+        self._stop_flag = None
+        self._wakeup = None
+        self._visit_ids = itertools.count(1)
+
+    def _emit(self, name, data=None):
+        if self.on_event:
+            try:
+                self.on_event(name, data)
+            except Exception:
+                pass
+
+    def log(self, message, level=logging.INFO):
+        logger.log(level, message)
+
+    @property
+    def total(self):
+        return self.task_source.planned
+
+    def progress(self):
+        progress = {'completed': self.completed, 'failed': self.failed, 'total': self.total,
+                    'shards': self.shards}
+        if self.cancelled:
+            progress['cancelled'] = self.cancelled
+        if self.stop_latency is not None:
+            progress['stop_latency'] = round(self.stop_latency, 3)
+        for key in ('concurrency', 'browser_rss_mb'):
+            values = [p[key] for p in self.shard_progress.values() if key in p]
+            if values:
+                progress[key] = round(sum(values), 1)
+        return progress
+
+    # ---- 任务分发 ----
+
+    async def _take(self):
+        """先取重新分配的任务，不够时从任务源读取（在线程池中执行）"""
+        urls = []
+        while self.requeued and len(urls) < self.slice_size:
+            urls.append(self.requeued.popleft())
+        if len(urls) < self.slice_size and not self.source_drained:
+            batch = await self.loop.run_in_executor(None, self.task_source.take, self.slice_size - len(urls))
+            if not batch:
+                self.source_drained = True
+            urls.extend(batch)
+        return urls
+
+    def _put(self, urls):
+        """把一批任务放入未完成访问最少的分片的队列，队列都满时返回 False"""
+        loads = collections.Counter(shard_id for shard_id, _ in self.outstanding.values())
+        for shard_id in sorted(self.live_shards, key=lambda i: loads[i]):
+            # 访问编号由本进程分配，各工作进程的编号不会重复
+            batch = [(next(self._visit_ids), url) for url in urls]
+            try:
+                self._task_queues[shard_id].put_nowait(batch)
+            except queue.Full:
+                continue
+            for visit_id, url in batch:
+                self.outstanding[visit_id] = (shard_id, url)
+                self.outputs.begin(visit_id, url, f"分片{shard_id + 1}")
+            return True
+        return False
+
+    async def _feed(self):
+        """分批分发任务，全部访问都有结果后为每个工作进程放入结束标记"""
+        try:
+            while self.is_running and self.live_shards:
+                urls = await self._take()
+                if not urls:
+                    if not self.outstanding:
+                        self.all_done = True
+                        break
+                    # 等待分片完成或异常退出（其任务会重新排队）
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), 0.5)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                while self.is_running and self.live_shards and not self._put(urls):
+                    await asyncio.sleep(0.05)
+        except Exception as e:
+            self.log(f"读取任务出错: {str(e)}", logging.ERROR)
+        finally:
+            self._end_tasks()
+
+    def _end_tasks(self):
+        """为每个工作进程放入结束标记，停止时先丢弃尚未领取的任务"""
+        for task_queue in self._task_queues:
+            if not self.is_running:
+                try:
+                    while True:
+                        task_queue.get_nowait()
+                except queue.Empty:
+                    pass
+            try:
+                task_queue.put_nowait(None)
+            except queue.Full:
+                pass
+
+    def _shard_gone(self, shard_id, exitcode):
+        """工作进程已退出：未完成的任务重新排队，由其他分片访问"""
+        self.live_shards.discard(shard_id)
+        lost = [(visit_id, url) for visit_id, (owner, url) in self.outstanding.items() if owner == shard_id]
+        if not lost or self.stop_requested_at is not None:
+            return
+        for visit_id, url in lost:
+            del self.outstanding[visit_id]
+            self.outputs.discard(visit_id, url)
+            self.requeued.append(url)
+        self.requeued_total += len(lost)
+        self.log(
+            f"工作进程 {shard_id + 1} 异常退出（退出码 {exitcode}），{len(lost)} 个未完成的访问已重新分配",
+            logging.ERROR
+        )
+        self._wakeup.set()
+
+    # ---- 事件合并 ----
+
+    def _pump(self, event_queue):
+        """在线程中读取工作进程发回的事件，交给事件循环处理，收到 None 时结束"""
+        while True:
+            message = event_queue.get()
+            if message is None:
+                return
+            self.loop.call_soon_threadsafe(self._handle, *message)
+
+    def _handle(self, shard_id, name, data):
+        if name == 'visit':
+            if self.outstanding.pop(data['visit_id'], None) is None:
+                # 任务已重新分配给其他分片，迟到的结果不再计入
+                return
+            data['shard'] = shard_id
+            if data['ok']:
+                self.completed += 1
+                outcome = 'completed'
+            elif data.get('error_class') == 'Cancelled':
+                self.cancelled += 1
+                outcome = 'cancelled'
+            else:
+                self.failed += 1
+                outcome = 'failed'
+            self.outputs.record(data, outcome)
+            if not self.outstanding:
+                self._wakeup.set()
+            self._emit('visit', data)
+            self._emit('progress', self.progress())
+        elif name == 'progress':
+            self.shard_progress[shard_id] = data
+            self._emit('progress', self.progress())
+        elif name == 'started':
+            self.shard_progress[shard_id] = data
+            if not self.started_shards:
+                self._emit('started', self.progress())
+            self.started_shards.add(shard_id)
+            if len(self.started_shards) == self.shards:
+                self.log(f"{self.shards} 个工作进程已全部启动")
+        elif name == 'stopping':
+            self.shard_stopping[shard_id] = data
+            self._emit('stopping', {
+                'visits': sum(d['visits'] for d in self.shard_stopping.values()),
+                'browsers': sum(d['browsers'] for d in self.shard_stopping.values()),
+            })
+        elif name == 'finished':
+            self.shard_progress[shard_id] = data
+        elif name == 'exit':
+            if data is None:
+                self.log(f"工作进程 {shard_id + 1} 出错退出", logging.ERROR)
+        elif name == 'joined':
+            # 由本进程在进程结束后放入，排在该分片发出的所有事件之后
+            self._shard_gone(shard_id, data)
+
+    async def _join(self, shard_id, process):
+        await self.loop.run_in_executor(None, process.join)
+        self._event_queue.put((shard_id, 'joined', process.exitcode))
+
+    # ---- 运行 ----
+
+    async def run(self):
+        """启动所有工作进程并等待它们结束"""
+        self.loop = asyncio.get_running_loop()
+        self.is_running = True
+        self._wakeup = asyncio.Event()
+        context = self._context
+        self._task_queues = [context.Queue(maxsize=2) for _ in range(self.shards)]
+        self._event_queue = event_queue = context.Queue()
+        log_queue = context.Queue()
+        self._stop_flag = context.Value('b', 0, lock=False)
+
+        # 工作进程的日志交给本进程的日志器输出
+        log_listener = logging.handlers.QueueListener(log_queue, _RelayHandler(), respect_handler_level=False)
+        log_listener.start()
+        pump = threading.Thread(target=self._pump, args=(event_queue,), daemon=True)
+        pump.start()
+        processes = []
+        feeder = None
+        try:
+            await self.outputs.open()
+
+            log_level = logging.getLogger().getEffectiveLevel()
+            # 任务通过队列下发，工作进程不需要（可能很大的）URL文本
+            worker_config = {key: value for key, value in self.config.items() if key != 'urls'}
+            for shard_id in range(self.shards):
+                settings = dict(self.settings, thread_count=self.concurrency[shard_id],
+                                metrics_file='', checkpoint_file='', aggregate_vitals=False)
+                process = context.Process(
+                    target=worker_main,
+                    args=(shard_id, worker_config, settings, self._task_queues[shard_id], event_queue,
+                          log_queue, self._stop_flag, log_level),
+                    name=f"visit-shard-{shard_id + 1}",
+                    daemon=True
+                )
+                process.start()
+                processes.append(process)
+                self.live_shards.add(shard_id)
+            self.log(
+                f"已启动 {self.shards} 个工作进程（本机 {os.cpu_count()} 个CPU），"
+                f"并发数: {'/'.join(str(c) for c in self.concurrency)}"
+            )
+
+            feeder = asyncio.create_task(self._feed())
+            await asyncio.gather(*(self._join(i, p) for i, p in enumerate(processes)))
+        finally:
+            self.is_running = False
+            if feeder:
+                feeder.cancel()
+            if self._stop_flag:
+                self._stop_flag.value = 1
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+            # 工作进程退出前发出的事件都已写入队列，放入结束标记后等待事件线程处理完
+            event_queue.put(None)
+            await self.loop.run_in_executor(None, pump.join)
+            await asyncio.sleep(0)
+            log_listener.stop()
+            try:
+                await self._shutdown()
+            finally:
+                self._emit('finished', self.progress())
+        return self.progress()
+
+    async def _shutdown(self):
+        all_done = self.all_done and self.stop_requested_at is None
+        if self.requeued_total:
+            self.log(f"共重新分配 {self.requeued_total} 个访问")
+        # 停止或所有工作进程都已退出时，交出但没有结果的访问不计入，恢复后重新访问
+        for visit_id, (_, url) in self.outstanding.items():
+            self.outputs.discard(visit_id, url)
+        if hasattr(self.task_source, 'close'):
+            await self.loop.run_in_executor(None, self.task_source.close)
+        await self.outputs.close(all_done)
+        if self.stop_requested_at is not None:
+            self.stop_latency = time.monotonic() - self.stop_requested_at
+            self.log(f"已停止，用时 {self.stop_latency:.2f} 秒")
+
+    def stop(self):
+        """请求停止（线程安全），通知所有工作进程停止"""
+        if self.stop_requested_at is None:
+            self.stop_requested_at = time.monotonic()
+        self.is_running = False
+        if self._stop_flag:
+            self._stop_flag.value = 1
+
+
+class _RelayHandler(logging.Handler):
+    """把工作进程发来的日志记录交给本进程同名的日志器处理"""
+
+    def emit(self, record):
+        logging.getLogger(record.name).handle(record)
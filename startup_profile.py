@@ -0,0 +1,75 @@
+"""启动耗时统计
+
+记录从进程启动到窗口可用的各个步骤（导入模块、创建窗口、加载配置……）的耗时，
+以及每个步骤新导入的顶层模块，用于在较慢的机器上检查冷启动时间。
+更细的逐模块导入耗时可以配合 python -X importtime main.py 查看。
+"""
+import logging
+import sys
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# 进程启动时间的近似值：本模块第一次被导入的时刻
+PROCESS_START = time.perf_counter()
+
+
+def _top_level_modules():
+    return {name.split('.', 1)[0] for name in list(sys.modules)}
+
+
+class StartupProfile:
+    def __init__(self):
+        self.steps = []  # (名称, 开始偏移秒, 耗时秒, 新导入的顶层模块)
+        self.reported = False
+
+    @contextmanager
+    def step(self, name):
+        """测量一个启动步骤"""
+        before = _top_level_modules()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            modules = sorted(_top_level_modules() - before)
+            self.steps.append((name, start - PROCESS_START, end - start, modules))
+
+    def mark(self, name):
+        """记录一个时间点（耗时为 0 的步骤）"""
+        self.steps.append((name, time.perf_counter() - PROCESS_START, 0.0, []))
+
+    def elapsed(self):
+        return time.perf_counter() - PROCESS_START
+
+    def to_dict(self):
+        return {
+            'total': round(self.elapsed(), 4),
+            'steps': [
+                {'name': name, 'at': round(at, 4), 'seconds': round(seconds, 4), 'modules': modules}
+                for name, at, seconds, modules in self.steps
+            ],
+        }
+
+    def format_report(self):
+        lines = [f"启动耗时 {self.elapsed():.3f} 秒:"]
+        for name, at, seconds, modules in self.steps:
+            line = f"  {at:7.3f}s  {seconds * 1000:8.1f} ms  {name}"
+            if modules:
+                shown = ', '.join(modules[:8])
+                more = f" 等 {len(modules)} 个" if len(modules) > 8 else ''
+                line += f"  (新模块: {shown}{more})"
+            lines.append(line)
+        return '\n'.join(lines)
+
+    def report(self, level=logging.INFO):
+        """输出一次启动报告"""
+        if self.reported:
+            return
+        self.reported = True
+        logger.log(level, self.format_report())
+
+
+# 全局实例，各模块在启动阶段共用
+profile = StartupProfile()
@@ -0,0 +1,52 @@
+"""统计工具：分位数，以及内存不随样本数增长的对数分桶直方图"""
+import math
+
+
+def percentile(values, p):
+    """最近秩分位数，values 为空时返回 None"""
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, math.ceil(p / 100.0 * len(values)) - 1)]
+
+
+class LogHistogram:
+    """按对数分桶计数的直方图
+
+    相邻桶的边界相差 growth 倍，分位数取所在桶的几何中点，相对误差不超过 growth - 1 的一半左右；
+    只保存非空的桶，1 毫秒到数分钟的耗时最多几百个桶，与样本数无关。
+    """
+
+    def __init__(self, growth=1.02):
+        self._log_growth = math.log(growth)
+        self.buckets = {}  # 桶编号 -> 样本数
+        self.zeros = 0     # 小于等于 0 的样本数
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        if value <= 0:
+            self.zeros += 1
+            return
+        index = math.floor(math.log(value) / self._log_growth)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def percentile(self, p):
+        """与 percentile() 相同的最近秩分位数（取桶的几何中点），没有样本时返回 None"""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(p / 100.0 * self.count))
+        seen = self.zeros
+        if rank <= seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return math.exp((index + 0.5) * self._log_growth)
+        return None
@@ -0,0 +1,148 @@
+import random
+import threading
+
+
+def parse_url_line(line):
+    """解析一行 '网址----访问次数'，空行返回 None，次数格式错误时抛出 ValueError"""
+    line = line.strip()
+    if not line:
+        return None
+    if '----' in line:
+        url, count = line.rsplit('----', 1)
+        return url.strip(), int(count)
+    return line, 1
+
+
+def parse_url_text(text, on_error=None):
+    """解析多行URL文本，返回 [(url, count), ...]"""
+    entries = []
+    for line in text.splitlines():
+        try:
+            entry = parse_url_line(line)
+        except ValueError:
+            if on_error:
+                on_error(line)
+            continue
+        if entry and entry[1] > 0:
+            entries.append(entry)
+    return entries
+
+
+class WeightedTaskStore:
+    """按剩余访问次数加权随机抽样的任务存储
+
+    只保存 (url, 剩余次数)，内部用树状数组维护前缀和，
+    抽样和扣减都是 O(log n)，与计划访问总次数无关。
+    """
+
+    def __init__(self, entries=()):
+        self.urls = []
+        self.remaining = []
+        self.total = 0       # 剩余访问次数
+        self.planned = 0     # 累计加入的访问次数
+        self.live = 0        # 仍有剩余次数的URL数量
+        self.exhausted = True   # 内存中的任务已全部加载
+        self._index = {}
+        self._tree = [0]  # 树状数组，下标从 1 开始
+        self._lock = threading.Lock()
+        self._random = random.Random()
+        for url, count in entries:
+            self.add(url, count)
+
+    def __len__(self):
+        return self.total
+
+    def _prefix(self, i):
+        s = 0
+        while i > 0:
+            s += self._tree[i]
+            i -= i & -i
+        return s
+
+    def _update(self, i, delta):
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _append(self, url, count):
+        """追加新条目，O(log n) 计算新节点的区间和"""
+        self.urls.append(url)
+        self.remaining.append(count)
+        i = len(self._tree)
+        self._tree.append(count + self._prefix(i - 1) - self._prefix(i - (i & -i)))
+        self._index[url] = i - 1
+
+    def add(self, url, count=1):
+        """添加访问任务，同一URL的次数会合并"""
+        if count <= 0:
+            return
+        with self._lock:
+            pos = self._index.get(url)
+            if pos is None:
+                self._append(url, count)
+                self.live += 1
+            else:
+                if self.remaining[pos] == 0:
+                    self.live += 1
+                self.remaining[pos] += count
+                self._update(pos + 1, count)
+            self.total += count
+            self.planned += count
+
+    def _find(self, target):
+        """找到前缀和首次大于 target 的位置（0 起始）"""
+        pos = 0
+        step = 1 << (len(self._tree) - 1).bit_length()
+        while step:
+            nxt = pos + step
+            if nxt < len(self._tree) and self._tree[nxt] <= target:
+                pos = nxt
+                target -= self._tree[nxt]
+            step >>= 1
+        return pos
+
+    def _take_one(self):
+        pos = self._find(self._random.randrange(self.total))
+        self.remaining[pos] -= 1
+        if self.remaining[pos] == 0:
+            self.live -= 1
+        self._update(pos + 1, -1)
+        self.total -= 1
+        return self.urls[pos]
+
+    def take(self, n=1):
+        """按剩余次数加权随机取出最多 n 个访问任务"""
+        with self._lock:
+            return [self._take_one() for _ in range(min(n, self.total))]
+
+    def take_one(self):
+        """取出一个访问任务，没有剩余任务时返回 None"""
+        batch = self.take(1)
+        return batch[0] if batch else None
+
+    def snapshot(self):
+        """返回仍有剩余次数的 [(url, remaining), ...]"""
+        with self._lock:
+            return [(u, c) for u, c in zip(self.urls, self.remaining) if c > 0]
+
+    def compact(self):
+        """丢弃已耗尽的条目并重建索引"""
+        with self._lock:
+            entries = [(u, c) for u, c in zip(self.urls, self.remaining) if c > 0]
+            self._reset()
+            for url, count in entries:
+                self._append(url, count)
+            self.total = sum(count for _, count in entries)
+            self.live = len(entries)
+
+    def _reset(self):
+        self.urls = []
+        self.remaining = []
+        self.total = 0
+        self.live = 0
+        self._index = {}
+        self._tree = [0]
+
+    def clear(self):
+        with self._lock:
+            self._reset()
@@ -0,0 +1,268 @@
+import threading
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, pyqtSignal
+from task_store import parse_url_text
+
+# 列：(标题, 对齐方式)
+COLUMNS = [
+    ('URL', Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter),
+    ('计划', Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter),
+    ('成功', Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter),
+    ('失败', Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter),
+    ('平均耗时(秒)', Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter),
+]
+URL_COLUMN, PLANNED_COLUMN, COMPLETED_COLUMN, FAILED_COLUMN, LATENCY_COLUMN = range(len(COLUMNS))
+
+
+class VisitUpdateBuffer:
+    """线程安全的访问结果缓冲区
+
+    引擎线程每完成一次访问写入一次，界面定时取出按URL合并后的结果批量更新表格，
+    避免每次访问都跨线程刷新界面。
+    """
+
+    def __init__(self):
+        self._updates = {}  # url -> [成功, 失败, 成功访问耗时合计, 计入耗时的次数]
+        self._lock = threading.Lock()
+
+    def add(self, url, ok, latency=None):
+        with self._lock:
+            update = self._updates.setdefault(url, [0, 0, 0.0, 0])
+            if ok:
+                update[0] += 1
+                if latency is not None:
+                    update[2] += latency
+                    update[3] += 1
+            else:
+                update[1] += 1
+
+    def add_record(self, record):
+        """记录一条访问记录（VisitRecord.to_dict() 的结果），取消的访问不计入"""
+        if record.get('error_class') == 'Cancelled':
+            return
+        latency = None
+        if record.get('total') is not None:
+            latency = record['total'] - record.get('phases', {}).get('dwell', 0.0)
+        self.add(record['url'], record['ok'], latency)
+
+    def drain(self):
+        """取出并清空缓冲区 {url: [成功, 失败, 耗时合计, 计入耗时的次数]}"""
+        with self._lock:
+            updates, self._updates = self._updates, {}
+        return updates
+
+
+class TaskTableModel(QAbstractTableModel):
+    """URL任务表：每个URL一行，显示计划次数和本次运行的访问结果
+
+    数据按列分别存放在列表中，视图只查询可见行，十万行以上也能流畅滚动。
+    revision 在URL或计划次数变化时递增并发出 entries_changed，用于判断是否需要重新保存；
+    访问结果的更新不会触发该信号。
+    """
+
+    entries_changed = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.revision = 0
+        self._clear_rows()
+
+    def _clear_rows(self):
+        self.urls = []
+        self.planned = []
+        self.completed = []
+        self.failed = []
+        self.latency_total = []
+        self.latency_count = []
+        self._index = {}
+
+    def _append_row(self, url, count):
+        self._index[url] = len(self.urls)
+        self.urls.append(url)
+        self.planned.append(count)
+        self.completed.append(0)
+        self.failed.append(0)
+        self.latency_total.append(0.0)
+        self.latency_count.append(0)
+
+    def _rebuild_index(self):
+        self._index = {url: row for row, url in enumerate(self.urls)}
+
+    def _touch(self):
+        self.revision += 1
+        self.entries_changed.emit()
+
+    # ---- Qt 模型接口 ----
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.urls)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal:
+            if role == Qt.ItemDataRole.DisplayRole:
+                return COLUMNS[section][0]
+            if role == Qt.ItemDataRole.TextAlignmentRole:
+                return COLUMNS[section][1]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row, column = index.row(), index.column()
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            if column == URL_COLUMN:
+                return self.urls[row]
+            if column == PLANNED_COLUMN:
+                return self.planned[row]
+            if column == COMPLETED_COLUMN:
+                return self.completed[row]
+            if column == FAILED_COLUMN:
+                return self.failed[row]
+            if self.latency_count[row]:
+                return f"{self.latency_total[row] / self.latency_count[row]:.2f}"
+            return ''
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return COLUMNS[column][1]
+        if role == Qt.ItemDataRole.ToolTipRole and column == URL_COLUMN:
+            return self.urls[row]
+        return None
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.isValid() and index.column() == PLANNED_COLUMN:
+            flags |= Qt.ItemFlag.ItemIsEditable
+        return flags
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        """在表格中直接修改计划次数"""
+        if role != Qt.ItemDataRole.EditRole or index.column() != PLANNED_COLUMN:
+            return False
+        try:
+            count = int(value)
+        except (TypeError, ValueError):
+            return False
+        if count < 0:
+            return False
+        self.planned[index.row()] = count
+        self.dataChanged.emit(index, index)
+        self._touch()
+        return True
+
+    # ---- 任务列表 ----
+
+    def set_entries(self, entries):
+        """用 [(url, count), ...] 替换整个列表，同一URL的次数合并"""
+        self.beginResetModel()
+        self._clear_rows()
+        for url, count in entries:
+            row = self._index.get(url)
+            if row is None:
+                self._append_row(url, count)
+            else:
+                self.planned[row] += count
+        self.endResetModel()
+        self._touch()
+
+    def add_entries(self, entries):
+        """追加URL，已存在的URL累加计划次数，返回新增的行数"""
+        new_entries = []
+        updated_rows = []
+        pending = {}
+        for url, count in entries:
+            row = self._index.get(url)
+            if row is not None:
+                self.planned[row] += count
+                updated_rows.append(row)
+            elif url in pending:
+                new_entries[pending[url]][1] += count
+            else:
+                pending[url] = len(new_entries)
+                new_entries.append([url, count])
+        if updated_rows:
+            self.dataChanged.emit(
+                self.index(min(updated_rows), PLANNED_COLUMN),
+                self.index(max(updated_rows), PLANNED_COLUMN)
+            )
+        if new_entries:
+            first = len(self.urls)
+            self.beginInsertRows(QModelIndex(), first, first + len(new_entries) - 1)
+            for url, count in new_entries:
+                self._append_row(url, count)
+            self.endInsertRows()
+        if updated_rows or new_entries:
+            self._touch()
+        return len(new_entries)
+
+    def remove_rows(self, rows):
+        """删除指定的行（行号列表）"""
+        rows = sorted(set(rows), reverse=True)
+        if not rows:
+            return
+        # 连续的行一次删除，减少视图刷新次数
+        start = end = rows[0]
+        for row in rows[1:] + [None]:
+            if row is not None and row == start - 1:
+                start = row
+                continue
+            self.beginRemoveRows(QModelIndex(), start, end)
+            for column in (self.urls, self.planned, self.completed, self.failed,
+                           self.latency_total, self.latency_count):
+                del column[start:end + 1]
+            self.endRemoveRows()
+            if row is not None:
+                start = end = row
+        self._rebuild_index()
+        self._touch()
+
+    def clear(self):
+        self.set_entries([])
+
+    def entries(self):
+        """计划次数大于 0 的 [(url, count), ...]"""
+        return [(url, count) for url, count in zip(self.urls, self.planned) if count > 0]
+
+    def to_text(self):
+        """转换为 '网址----访问次数' 格式的文本，用于保存配置"""
+        return '\n'.join(f"{url}----{count}" for url, count in zip(self.urls, self.planned))
+
+    def set_text(self, text, on_error=None):
+        """从 '网址----访问次数' 格式的文本加载列表"""
+        self.set_entries(parse_url_text(text, on_error))
+
+    @property
+    def total_planned(self):
+        return sum(self.planned)
+
+    # ---- 访问结果 ----
+
+    def reset_progress(self):
+        """开始新一轮访问前清空结果列"""
+        count = len(self.urls)
+        self.completed = [0] * count
+        self.failed = [0] * count
+        self.latency_total = [0.0] * count
+        self.latency_count = [0] * count
+        if count:
+            self.dataChanged.emit(
+                self.index(0, COMPLETED_COLUMN), self.index(count - 1, LATENCY_COLUMN)
+            )
+
+    def apply_updates(self, updates):
+        """批量合并 VisitUpdateBuffer.drain() 的结果，只发出一次 dataChanged"""
+        rows = []
+        for url, (completed, failed, latency, timed) in updates.items():
+            row = self._index.get(url)
+            if row is None:
+                continue
+            self.completed[row] += completed
+            self.failed[row] += failed
+            self.latency_total[row] += latency
+            self.latency_count[row] += timed
+            rows.append(row)
+        if rows:
+            self.dataChanged.emit(
+                self.index(min(rows), COMPLETED_COLUMN), self.index(max(rows), LATENCY_COLUMN)
+            )
+
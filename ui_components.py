@@ -1,9 +1,12 @@
 from PyQt6.QtWidgets import (
     QFrame, QVBoxLayout, QHBoxLayout, QLabel, 
-    QPushButton, QTextEdit, QLineEdit, QSpinBox, QSlider, QRadioButton, QButtonGroup, QGroupBox
+    QPushButton, QPlainTextEdit, QLineEdit, QSpinBox, QSlider, QRadioButton, QButtonGroup, QGroupBox,
+    QComboBox, QCheckBox, QTableView, QHeaderView, QAbstractItemView
 )
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QIcon
+from resource_policy import POLICY_PRESETS
+from browser_pool import LAUNCH_PROFILES
 
 def create_title_section():
     """创建标题区域"""
@@ -29,23 +32,82 @@ def create_url_section():
     url_frame.setObjectName("inputFrame")
     url_layout = QVBoxLayout(url_frame)
     
-    url_header = QLabel("URLs (每行一个):")
+    url_header = QLabel("URL任务列表:")
     url_header.setObjectName("sectionHeader")
     
-    url_desc = QLabel("格式：网址----访问次数\n例如：https://mail.tm/zh/----1000")
+    url_desc = QLabel("格式：网址----访问次数，可一次粘贴多行；双击“计划”列修改次数\n例如：https://mail.tm/zh/----1000")
     url_desc.setObjectName("descLabel")
     
-    url_input = QTextEdit()
-    url_input.setPlaceholderText("请输入要访问的网址\n例如：https://mail.tm/zh/----1000")
-    url_input.setMinimumHeight(150)
+    # 添加/粘贴/导入
+    entry_layout = QHBoxLayout()
+    url_entry = QLineEdit()
+    url_entry.setPlaceholderText("例如：https://mail.tm/zh/----1000")
+    url_add_btn = QPushButton("添加")
+    url_add_btn.setObjectName("secondaryButton")
+    url_paste_btn = QPushButton("粘贴")
+    url_paste_btn.setObjectName("secondaryButton")
+    url_import_btn = QPushButton("导入文件")
+    url_import_btn.setObjectName("secondaryButton")
+    entry_layout.addWidget(url_entry, stretch=1)
+    entry_layout.addWidget(url_add_btn)
+    entry_layout.addWidget(url_paste_btn)
+    entry_layout.addWidget(url_import_btn)
+    
+    # 表格只绘制可见行；固定行高、不按内容调整列宽，避免大列表时遍历所有行
+    url_table = QTableView()
+    url_table.setMinimumHeight(150)
+    url_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+    url_table.setWordWrap(False)
+    url_table.setAlternatingRowColors(True)
+    url_table.verticalHeader().setVisible(False)
+    url_table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+    url_table.verticalHeader().setDefaultSectionSize(22)
+    url_table.horizontalHeader().setStretchLastSection(False)
+    url_table.horizontalHeader().setDefaultSectionSize(70)
+    
+    manage_layout = QHBoxLayout()
+    url_summary = QLabel("共 0 个URL，计划 0 次")
+    url_summary.setObjectName("descLabel")
+    url_remove_btn = QPushButton("删除选中")
+    url_remove_btn.setObjectName("secondaryButton")
+    url_clear_btn = QPushButton("清空")
+    url_clear_btn.setObjectName("secondaryButton")
+    manage_layout.addWidget(url_summary, stretch=1)
+    manage_layout.addWidget(url_remove_btn)
+    manage_layout.addWidget(url_clear_btn)
+    
+    url_actions = {
+        'entry': url_entry,
+        'add': url_add_btn,
+        'paste': url_paste_btn,
+        'import': url_import_btn,
+        'remove': url_remove_btn,
+        'clear': url_clear_btn,
+        'summary': url_summary,
+    }
+    
+    # URL文件（支持 .gz），设置后按流式方式读取，不再使用上面的文本
+    file_layout = QHBoxLayout()
+    url_file_label = QLabel("未选择URL文件")
+    url_file_label.setObjectName("descLabel")
+    url_file_btn = QPushButton("从文件读取")
+    url_file_btn.setObjectName("secondaryButton")
+    url_file_clear_btn = QPushButton("清除文件")
+    url_file_clear_btn.setObjectName("secondaryButton")
+    file_layout.addWidget(url_file_label, stretch=1)
+    file_layout.addWidget(url_file_btn)
+    file_layout.addWidget(url_file_clear_btn)
     
     url_layout.addWidget(url_header)
     url_layout.addWidget(url_desc)
-    url_layout.addWidget(url_input)
+    url_layout.addLayout(entry_layout)
+    url_layout.addWidget(url_table)
+    url_layout.addLayout(manage_layout)
+    url_layout.addLayout(file_layout)
     
-    return url_frame, url_input
+    return url_frame, url_table, url_actions, url_file_label, url_file_btn, url_file_clear_btn
 
-def create_proxy_section(proxy_manager):
+def create_proxy_section():
     proxy_frame = QFrame()
     proxy_frame.setObjectName("inputFrame")
     proxy_layout = QVBoxLayout(proxy_frame)
@@ -54,22 +116,20 @@ def create_proxy_section(proxy_manager):
     proxy_header = QLabel("代理设置")
     proxy_header.setObjectName("sectionHeader")
     
-    proxy_desc = QLabel("格式: 服务器:端口:用户名格式:密码 (用{sid}表示会话ID)")
+    proxy_desc = QLabel("格式: 服务器:端口:用户名格式:密码 (用{sid}表示会话ID)，多个入口每行一个")
     proxy_desc.setObjectName("descLabel")
     
-    proxy_input = QLineEdit()
+    proxy_input = QPlainTextEdit()
     proxy_input.setPlaceholderText("例如: prem.iprocket.io:9595:com23112818-res-BR-sid-{sid}-sesstime-5:ZvXa2ey06FmX41o1tLcY")
-    proxy_manager.proxy_input = proxy_input
+    proxy_input.setMaximumHeight(80)
     
     proxy_status = QLabel("当前未设置代理")
     proxy_status.setObjectName("proxyStatus")
-    proxy_manager.proxy_status = proxy_status
     
     test_btn = QPushButton("测试代理")
     test_btn.setObjectName("primaryButton")
     test_btn.setMinimumWidth(120)
     test_btn.setMinimumHeight(35)
-    test_btn.clicked.connect(proxy_manager.handle_test_proxy)
     
     # 组装布局
     proxy_layout.addWidget(proxy_header)
@@ -78,9 +138,9 @@ def create_proxy_section(proxy_manager):
     proxy_layout.addWidget(proxy_status)
     proxy_layout.addWidget(test_btn)
     
-    return proxy_frame
+    return proxy_frame, proxy_input, proxy_status, test_btn
 
-def create_main_content(proxy_manager):
+def create_main_content():
     """创建主要内容区域（左右布局）"""
     content_frame = QFrame()
     content_layout = QHBoxLayout(content_frame)
@@ -92,17 +152,21 @@ def create_main_content(proxy_manager):
     left_layout.setSpacing(15)
     
     # URL输入区域
-    url_frame, url_input = create_url_section()
+    url_frame, url_table, url_actions, url_file_label, url_file_btn, url_file_clear_btn = create_url_section()
     left_layout.addWidget(url_frame)
     
     # 代理设置区域
-    proxy_frame = create_proxy_section(proxy_manager)
+    proxy_frame, proxy_input, proxy_status, test_btn = create_proxy_section()
     left_layout.addWidget(proxy_frame)
     
     # 浏览器模式选择
-    mode_frame, mode_group = create_browser_mode_section()
+    mode_frame, mode_group, recycle_input = create_browser_mode_section()
     left_layout.addWidget(mode_frame)
     
+    # 高级设置
+    advanced_frame, advanced = create_advanced_section()
+    left_layout.addWidget(advanced_frame)
+    
     left_layout.addStretch()
     
     # 右侧面板
@@ -111,11 +175,11 @@ def create_main_content(proxy_manager):
     right_layout.setSpacing(15)
     
     # 访问控制区域
-    control_frame, min_time_input, max_time_input, min_interval_input, max_interval_input, thread_slider, start_btn, stop_btn, save_btn, load_btn = create_control_section()
+    control_frame, min_time_input, max_time_input, min_interval_input, max_interval_input, thread_slider, start_btn, stop_btn, resume_btn, save_btn, load_btn = create_control_section()
     right_layout.addWidget(control_frame)
     
     # 日志显示区域
-    log_frame, log_text = create_log_section()
+    log_frame, log_text, progress_label, log_level_combo = create_log_section()
     right_layout.addWidget(log_frame, stretch=1)
     
     # 添加到主布局
@@ -126,7 +190,7 @@ def create_main_content(proxy_manager):
     
     return (
         content_frame, 
-        url_input, 
+        url_table, 
         mode_group, 
         log_text,
         min_time_input,
@@ -136,8 +200,20 @@ def create_main_content(proxy_manager):
         thread_slider,
         start_btn,
         stop_btn,
+        resume_btn,
         save_btn,
-        load_btn
+        load_btn,
+        recycle_input,
+        progress_label,
+        url_file_label,
+        url_file_btn,
+        url_file_clear_btn,
+        url_actions,
+        proxy_input,
+        proxy_status,
+        test_btn,
+        log_level_combo,
+        advanced
     )
 
 def create_control_section():
@@ -249,7 +325,7 @@ def create_control_section():
     thread_desc.setObjectName("descLabel")
     
     thread_slider = QSlider(Qt.Orientation.Horizontal)
-    thread_slider.setRange(1, 10)
+    thread_slider.setRange(1, 100)
     thread_slider.setValue(5)
     thread_slider.setObjectName("threadSlider")
     thread_slider.setFixedHeight(30)
@@ -288,8 +364,13 @@ def create_control_section():
     stop_btn.setObjectName("dangerButton")
     stop_btn.setIcon(QIcon("icons/stop.png"))  # 如果有图标的话
     
+    # 按断点文件继续上次未完成的任务
+    resume_btn = QPushButton("恢复任务")
+    resume_btn.setObjectName("secondaryButton")
+    
     operation_layout.addWidget(start_btn)
     operation_layout.addWidget(stop_btn)
+    operation_layout.addWidget(resume_btn)
     
     # 配置按钮组
     config_layout = QHBoxLayout()
@@ -321,27 +402,48 @@ def create_control_section():
         thread_slider, 
         start_btn, 
         stop_btn, 
+        resume_btn, 
         save_btn, 
         load_btn
     )
 
-def create_log_section():
+def create_log_section(max_lines=5000):
     """创建日志显示区域"""
     log_frame = QFrame()
     log_frame.setObjectName("inputFrame")
     log_layout = QVBoxLayout(log_frame)
     
+    header_layout = QHBoxLayout()
     log_header = QLabel("运行日志")
     log_header.setObjectName("sectionHeader")
     
-    log_text = QTextEdit()
+    # 日志级别过滤
+    level_combo = QComboBox()
+    level_combo.addItem("调试", 10)
+    level_combo.addItem("信息", 20)
+    level_combo.addItem("警告", 30)
+    level_combo.addItem("错误", 40)
+    level_combo.setCurrentIndex(1)
+    
+    header_layout.addWidget(log_header)
+    header_layout.addStretch()
+    header_layout.addWidget(QLabel("显示级别:"))
+    header_layout.addWidget(level_combo)
+    
+    progress_label = QLabel("进度: 暂无任务")
+    progress_label.setObjectName("descLabel")
+    
+    # 只保留最近 max_lines 行，避免日志无限增长
+    log_text = QPlainTextEdit()
     log_text.setReadOnly(True)
     log_text.setMinimumHeight(200)
+    log_text.setMaximumBlockCount(max_lines)
     
-    log_layout.addWidget(log_header)
+    log_layout.addLayout(header_layout)
+    log_layout.addWidget(progress_label)
     log_layout.addWidget(log_text)
     
-    return log_frame, log_text 
+    return log_frame, log_text, progress_label, level_combo
 
 def create_browser_mode_section():
     """创建浏览器模式选择区域"""
@@ -365,10 +467,179 @@ def create_browser_mode_section():
     mode_group.addButton(headless_radio)
     mode_group.addButton(visible_radio)
     
+    # 浏览器复用：每个浏览器分配多少个上下文后重启
+    recycle_layout = QHBoxLayout()
+    recycle_label = QLabel("浏览器复用次数")
+    recycle_label.setObjectName("controlLabel")
+    recycle_input = QSpinBox()
+    recycle_input.setRange(1, 1000)
+    recycle_input.setValue(50)
+    recycle_input.setSuffix(" 次")
+    recycle_input.setObjectName("timeSpinBox")
+    recycle_input.setFixedHeight(30)
+    recycle_input.setToolTip("每个浏览器进程创建多少个访问上下文后重启")
+    recycle_layout.addWidget(recycle_label)
+    recycle_layout.addWidget(recycle_input)
+    recycle_layout.addStretch()
+    
     # 组装布局
     mode_layout.addWidget(mode_header)
     mode_layout.addWidget(mode_desc)
     mode_layout.addWidget(visible_radio)
     mode_layout.addWidget(headless_radio)
+    mode_layout.addLayout(recycle_layout)
     
-    return mode_frame, mode_group 
\ No newline at end of file
+    return mode_frame, mode_group, recycle_input 
+
+def create_advanced_section():
+    """创建高级设置区域，返回 (frame, {名称: 控件})"""
+    advanced_frame = QFrame()
+    advanced_frame.setObjectName("inputFrame")
+    advanced_layout = QVBoxLayout(advanced_frame)
+    
+    advanced_header = QLabel("高级设置")
+    advanced_header.setObjectName("sectionHeader")
+    advanced_layout.addWidget(advanced_header)
+    
+    widgets = {}
+    
+    # 访问记录文件：每次访问的阶段耗时、状态码、出口IP等
+    metrics_label = QLabel("访问记录文件 (.jsonl / .csv，留空不记录)")
+    metrics_label.setObjectName("descLabel")
+    metrics_input = QLineEdit()
+    metrics_input.setPlaceholderText("例如: visits.jsonl 或 visits.csv")
+    advanced_layout.addWidget(metrics_label)
+    advanced_layout.addWidget(metrics_input)
+    widgets['metrics_file'] = metrics_input
+    
+    # 页面性能指标：每次访问采集 TTFB、DOMContentLoaded、load、LCP，结束时按URL汇总
+    vitals_box = QCheckBox("采集页面性能指标（TTFB、DCL、load、LCP）")
+    vitals_input = QLineEdit()
+    vitals_input.setPlaceholderText("性能报告文件（JSON，留空只写日志），例如: vitals.json")
+    advanced_layout.addWidget(vitals_box)
+    advanced_layout.addWidget(vitals_input)
+    widgets['collect_web_vitals'] = vitals_box
+    widgets['vitals_file'] = vitals_input
+    
+    # 断点文件：访问进度定期写入，崩溃或停止后可用“恢复任务”继续
+    checkpoint_label = QLabel("断点文件（留空不记录进度）")
+    checkpoint_label.setObjectName("descLabel")
+    checkpoint_input = QLineEdit()
+    checkpoint_input.setPlaceholderText("例如: checkpoint.db")
+    advanced_layout.addWidget(checkpoint_label)
+    advanced_layout.addWidget(checkpoint_input)
+    widgets['checkpoint_file'] = checkpoint_input
+    
+    # 出口IP查询：与页面导航并行，按会话缓存
+    ip_check_box = QCheckBox("查询出口IP（与页面访问并行）")
+    ip_check_box.setChecked(True)
+    ip_check_input = QLineEdit()
+    ip_check_input.setPlaceholderText("IP查询地址，例如: http://httpbin.org/ip")
+    advanced_layout.addWidget(ip_check_box)
+    advanced_layout.addWidget(ip_check_input)
+    widgets['ip_check'] = ip_check_box
+    widgets['ip_check_url'] = ip_check_input
+    
+    # 资源策略：屏蔽大体积资源以节省代理流量和CPU
+    policy_layout = QHBoxLayout()
+    policy_label = QLabel("资源策略")
+    policy_label.setObjectName("controlLabel")
+    policy_combo = QComboBox()
+    for name, (title, _) in POLICY_PRESETS.items():
+        policy_combo.addItem(title, name)
+    policy_layout.addWidget(policy_label)
+    policy_layout.addWidget(policy_combo, stretch=1)
+    advanced_layout.addLayout(policy_layout)
+    widgets['resource_policy'] = policy_combo
+    
+    # 浏览器启动配置和内存上限
+    launch_layout = QHBoxLayout()
+    launch_label = QLabel("启动配置")
+    launch_label.setObjectName("controlLabel")
+    launch_combo = QComboBox()
+    for name, profile in LAUNCH_PROFILES.items():
+        launch_combo.addItem(profile[0], name)
+    rss_label = QLabel("内存上限(MB)")
+    rss_label.setObjectName("controlLabel")
+    rss_input = QSpinBox()
+    rss_input.setRange(0, 65536)
+    rss_input.setSingleStep(100)
+    rss_input.setToolTip("单个浏览器（含渲染进程）内存超过该值后重启，0 表示不限")
+    launch_layout.addWidget(launch_label)
+    launch_layout.addWidget(launch_combo, stretch=1)
+    launch_layout.addWidget(rss_label)
+    launch_layout.addWidget(rss_input)
+    advanced_layout.addLayout(launch_layout)
+    widgets['launch_profile'] = launch_combo
+    widgets['max_browser_rss_mb'] = rss_input
+    
+    # 代理会话池：提前生成并校验会话，0 表示不预热
+    session_layout = QHBoxLayout()
+    session_label = QLabel("会话池大小")
+    session_label.setObjectName("controlLabel")
+    session_pool_input = QSpinBox()
+    session_pool_input.setRange(0, 500)
+    session_pool_input.setToolTip("提前校验好的代理会话数量，0 表示不预热")
+    session_concurrency_label = QLabel("校验并发")
+    session_concurrency_label.setObjectName("controlLabel")
+    session_concurrency_input = QSpinBox()
+    session_concurrency_input.setRange(1, 100)
+    session_concurrency_input.setValue(5)
+    session_layout.addWidget(session_label)
+    session_layout.addWidget(session_pool_input)
+    session_layout.addWidget(session_concurrency_label)
+    session_layout.addWidget(session_concurrency_input)
+    session_layout.addStretch()
+    advanced_layout.addLayout(session_layout)
+    widgets['session_pool_size'] = session_pool_input
+    widgets['session_validate_concurrency'] = session_concurrency_input
+    
+    # 自适应并发：线程数滑块作为上限，从最小并发开始按主机负载调整
+    adaptive_layout = QHBoxLayout()
+    adaptive_check = QCheckBox("自适应并发")
+    adaptive_check.setToolTip("根据CPU、内存、失败率和访问耗时自动调整并发数，线程数作为上限")
+    adaptive_min_label = QLabel("最小并发")
+    adaptive_min_label.setObjectName("controlLabel")
+    adaptive_min_input = QSpinBox()
+    adaptive_min_input.setRange(1, 100)
+    adaptive_min_input.setValue(1)
+    adaptive_layout.addWidget(adaptive_check)
+    adaptive_layout.addWidget(adaptive_min_label)
+    adaptive_layout.addWidget(adaptive_min_input)
+    shards_label = QLabel("工作进程")
+    shards_label.setObjectName("controlLabel")
+    shards_input = QSpinBox()
+    shards_input.setRange(1, 64)
+    shards_input.setValue(1)
+    shards_input.setToolTip("大于 1 时启动多个工作进程分担访问，线程数为所有进程的总并发数")
+    adaptive_layout.addWidget(shards_label)
+    adaptive_layout.addWidget(shards_input)
+    adaptive_layout.addStretch()
+    advanced_layout.addLayout(adaptive_layout)
+    widgets['adaptive_concurrency'] = adaptive_check
+    widgets['adaptive_min_workers'] = adaptive_min_input
+    widgets['shards'] = shards_input
+    
+    # 粘性会话复用：一个会话连续用于多次访问，0 表示只受时间限制
+    reuse_layout = QHBoxLayout()
+    reuse_visits_label = QLabel("会话复用次数")
+    reuse_visits_label.setObjectName("controlLabel")
+    reuse_visits_input = QSpinBox()
+    reuse_visits_input.setRange(0, 1000)
+    reuse_visits_input.setValue(1)
+    reuse_visits_input.setToolTip("同一个代理会话最多用于几次访问，1 表示每次访问换新会话，0 表示不限次数")
+    reuse_seconds_label = QLabel("复用时长(秒)")
+    reuse_seconds_label.setObjectName("controlLabel")
+    reuse_seconds_input = QSpinBox()
+    reuse_seconds_input.setRange(0, 86400)
+    reuse_seconds_input.setToolTip("会话最多复用多久，0 表示只受代理会话时长（sessTime）限制")
+    reuse_layout.addWidget(reuse_visits_label)
+    reuse_layout.addWidget(reuse_visits_input)
+    reuse_layout.addWidget(reuse_seconds_label)
+    reuse_layout.addWidget(reuse_seconds_input)
+    reuse_layout.addStretch()
+    advanced_layout.addLayout(reuse_layout)
+    widgets['session_reuse_visits'] = reuse_visits_input
+    widgets['session_reuse_seconds'] = reuse_seconds_input
+    
+    return advanced_frame, widgets
@@ -0,0 +1,96 @@
+import gzip
+import threading
+from task_store import WeightedTaskStore, parse_url_line
+
+
+def open_url_file(path):
+    """以文本方式打开URL文件，支持 gzip 压缩文件"""
+    with open(path, 'rb') as f:
+        is_gzip = f.read(2) == b'\x1f\x8b'
+    if is_gzip:
+        return gzip.open(path, 'rt', encoding='utf-8', errors='replace')
+    return open(path, 'r', encoding='utf-8', errors='replace')
+
+
+def iter_url_entries(path, on_error=None):
+    """逐行读取URL文件，惰性产生 (url, count)"""
+    with open_url_file(path) as f:
+        for line in f:
+            try:
+                entry = parse_url_line(line)
+            except ValueError:
+                if on_error:
+                    on_error(line.strip())
+                continue
+            if entry and entry[1] > 0:
+                yield entry
+
+
+class StreamingTaskSource:
+    """流式任务源：从文件按需读取URL，只在内存中保留有限窗口
+
+    对外接口与 WeightedTaskStore 相同（take / planned / total / exhausted），
+    '----次数' 不会展开成多条任务，因此百万级访问计划也只占常量内存。
+    take() 会读取文件，应在线程池中调用，不能放在 GUI 线程。
+    done 为 {url: 已访问次数}（断点恢复时使用），读取时从对应URL的次数中扣除。
+    """
+
+    def __init__(self, path, window=1000, on_error=None, done=None):
+        self.path = path
+        self.window = max(1, int(window))
+        self.on_error = on_error
+        self.done = dict(done or {})
+        self.store = WeightedTaskStore()
+        self.exhausted = False
+        self._entries = None
+        self._lock = threading.Lock()
+
+    @property
+    def planned(self):
+        return self.store.planned
+
+    @property
+    def total(self):
+        return self.store.total
+
+    def __len__(self):
+        return self.store.total
+
+    def _refill(self):
+        """窗口内的URL不足一半时，从文件继续读取"""
+        if self.exhausted or self.store.live >= self.window // 2 + 1:
+            return
+        if self._entries is None:
+            self._entries = iter_url_entries(self.path, self._report_error)
+        if len(self.store.urls) > self.window * 2:
+            self.store.compact()
+        while self.store.live < self.window:
+            entry = next(self._entries, None)
+            if entry is None:
+                self.exhausted = True
+                break
+            url, count = entry
+            if url in self.done:
+                skipped = min(count, self.done[url])
+                self.done[url] -= skipped
+                count -= skipped
+            self.store.add(url, count)
+
+    def _report_error(self, line):
+        if self.on_error:
+            self.on_error(line)
+
+    def take(self, n=1):
+        """取出最多 n 个访问任务，文件读完且窗口为空时返回空列表"""
+        with self._lock:
+            self._refill()
+            return self.store.take(n)
+
+    def close(self):
+        """停止读取并关闭文件"""
+        with self._lock:
+            self.exhausted = True
+            self.store.clear()
+            if self._entries is not None:
+                self._entries.close()
+                self._entries = None
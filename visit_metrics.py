@@ -0,0 +1,199 @@
+import collections
+import csv
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# 一次访问的各个阶段，按发生顺序排列
+PHASES = [
+    'launch',        # 浏览器池为本次访问重启浏览器的耗时（通常为 0）
+    'new_context',   # 创建上下文
+    'new_page',      # 创建页面及窗口设置
+    'ip_check',      # 出口IP查询
+    'goto',          # page.goto 直到 load 事件
+    'networkidle',   # 等待网络空闲
+    'scroll',        # 滚动模拟
+    'dwell',         # 随机停留
+    'teardown',      # 关闭页面和上下文
+]
+
+RECORD_FIELDS = [
+    'visit_id', 'url', 'worker', 'started_at', 'ok', 'status',
+    'session_id', 'exit_ip', 'error_class', 'error', 'total',
+]
+
+# 资源策略统计（见 resource_policy.ResourceStats）
+RESOURCE_FIELDS = ['allowed_requests', 'allowed_bytes', 'blocked_requests']
+
+# 页面性能指标（见 web_vitals），时间为毫秒
+VITAL_FIELDS = [
+    'ttfb', 'dom_content_loaded', 'load', 'first_paint', 'fcp', 'lcp',
+    'transfer_bytes', 'resources', 'resource_bytes', 'slowest_resource',
+]
+
+# 单进程运行时的访问编号；多进程分片和分布式运行时由分发任务的一方统一分配（见 AssignedVisitIds）
+_visit_ids = itertools.count(1)
+
+
+class AssignedVisitIds:
+    """分发方随任务一起下发的访问编号，按URL先进先出取用
+
+    工作进程和工作节点各自的计数器会产生重复的编号，因此由协调方分配，
+    访问记录文件和断点文件中的编号在整个任务内唯一。
+    """
+
+    def __init__(self):
+        self._ids = {}  # url -> deque(访问编号)
+        self._lock = threading.Lock()
+
+    def add(self, items):
+        """登记 [(visit_id, url), ...]"""
+        with self._lock:
+            for visit_id, url in items:
+                self._ids.setdefault(url, collections.deque()).append(visit_id)
+
+    def pop(self, url):
+        """取出该URL最早分配的编号，没有时返回 None"""
+        with self._lock:
+            ids = self._ids.get(url)
+            if not ids:
+                return None
+            visit_id = ids.popleft()
+            if not ids:
+                del self._ids[url]
+            return visit_id
+
+    def clear(self):
+        with self._lock:
+            self._ids.clear()
+
+
+class VisitRecord:
+    """一次访问的结构化记录，阶段耗时使用单调时钟测量（秒）
+
+    visit_id 为 None 时使用本进程的计数器。
+    """
+
+    def __init__(self, url, worker='', visit_id=None):
+        self.visit_id = next(_visit_ids) if visit_id is None else visit_id
+        self.url = url
+        self.worker = worker
+        self.started_at = time.time()
+        self.ok = False
+        self.status = None
+        self.session_id = None
+        self.exit_ip = None
+        self.error_class = None
+        self.error = None
+        self.phases = {}
+        self.resources = {}
+        self.vitals = None  # 页面性能指标，未采集时为 None
+        self._start = time.monotonic()
+        self.total = None
+
+    @contextmanager
+    def phase(self, name):
+        """测量一个阶段的耗时，同名阶段累加"""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.monotonic() - start)
+
+    def add_phase(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def fail(self, error, error_class=None):
+        """记录失败原因，只保留第一次错误"""
+        self.ok = False
+        if self.error is None:
+            self.error = str(error)
+            self.error_class = error_class or type(error).__name__
+
+    def finish(self):
+        self.total = time.monotonic() - self._start
+
+    def to_dict(self):
+        data = {field: getattr(self, field) for field in RECORD_FIELDS}
+        data['phases'] = {name: round(value, 4) for name, value in self.phases.items()}
+        data['resources'] = dict(self.resources)
+        if self.vitals is not None:
+            data['vitals'] = dict(self.vitals)
+        if data['total'] is not None:
+            data['total'] = round(data['total'], 4)
+        return data
+
+
+def csv_header():
+    """访问记录 CSV 的列名"""
+    return (
+        RECORD_FIELDS + [f'phase_{name}' for name in PHASES] + RESOURCE_FIELDS +
+        [f'vital_{name}' for name in VITAL_FIELDS]
+    )
+
+
+def _rotate_mismatched_csv(path, header):
+    """已有的 CSV 表头与 header 不同时把旧文件改名保留，返回新文件名，无需改名时返回 None"""
+    try:
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            existing = next(csv.reader(f), None)
+    except FileNotFoundError:
+        return None
+    if existing is None or existing == header:
+        return None
+    base, ext = os.path.splitext(path)
+    rotated = f"{base}.{time.strftime('%Y%m%d-%H%M%S')}{ext}"
+    os.replace(path, rotated)
+    return rotated
+
+
+class MetricsWriter:
+    """把访问记录流式写入文件，.csv 结尾写 CSV，其余写 JSONL
+
+    CSV 追加写入已有文件时要求表头与当前列一致，否则旧文件改名保留，另起新文件，
+    避免新记录与旧表头错位。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.is_csv = path.lower().endswith('.csv')
+        self._lock = threading.Lock()
+        header = csv_header()
+        if self.is_csv:
+            rotated = _rotate_mismatched_csv(path, header)
+            if rotated:
+                logger.warning(f"访问记录文件 {path} 的列与当前版本不同，已改名为 {rotated}")
+        self._file = open(path, 'a', encoding='utf-8', newline='')
+        self._csv = None
+        if self.is_csv:
+            self._csv = csv.writer(self._file)
+            if self._file.tell() == 0:
+                self._csv.writerow(header)
+
+    def write(self, record):
+        data = record.to_dict() if isinstance(record, VisitRecord) else record
+        with self._lock:
+            if self._csv:
+                phases = data.get('phases', {})
+                resources = data.get('resources', {})
+                vitals = data.get('vitals') or {}
+                self._csv.writerow(
+                    [data.get(field) for field in RECORD_FIELDS] +
+                    [phases.get(name) for name in PHASES] +
+                    [resources.get(name) for name in RESOURCE_FIELDS] +
+                    [vitals.get(name) for name in VITAL_FIELDS]
+                )
+            else:
+                self._file.write(json.dumps(data, ensure_ascii=False) + '\n')
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
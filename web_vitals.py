@@ -0,0 +1,159 @@
+"""页面性能指标：每次访问采集 Navigation Timing、资源计时、绘制时间和 LCP，按URL汇总分位数
+
+所有时间为毫秒，相对导航开始。通过代理访问时 TTFB 包含代理的延迟。
+"""
+import json
+import logging
+import time
+from stats import LogHistogram
+from visit_metrics import VITAL_FIELDS
+
+logger = logging.getLogger(__name__)
+
+# 按URL汇总分位数的指标（其余字段只取平均值）
+TIMING_FIELDS = ['ttfb', 'dom_content_loaded', 'load', 'first_paint', 'fcp', 'lcp']
+
+# 单独汇总的URL数上限，超出后的URL合并到 OTHER_URLS 中
+MAX_URLS = 10000
+OTHER_URLS = '(其他URL)'
+
+# 在页面脚本之前注册 LCP 观察器；LCP 在用户输入或滚动后不再更新，因此在滚动之前读取
+INIT_SCRIPT = """
+(() => {
+    const vitals = window.__visitVitals = {lcp: null};
+    try {
+        new PerformanceObserver(list => {
+            const entries = list.getEntries();
+            if (entries.length) {
+                vitals.lcp = entries[entries.length - 1].startTime;
+            }
+        }).observe({type: 'largest-contentful-paint', buffered: true});
+    } catch (e) {}
+})();
+"""
+
+COLLECT_SCRIPT = """
+() => {
+    const result = {};
+    const nav = performance.getEntriesByType('navigation')[0];
+    if (nav) {
+        result.ttfb = nav.responseStart;
+        result.dom_content_loaded = nav.domContentLoadedEventEnd;
+        result.load = nav.loadEventEnd;
+        result.transfer_bytes = nav.transferSize;
+    }
+    for (const entry of performance.getEntriesByType('paint')) {
+        if (entry.name === 'first-paint') result.first_paint = entry.startTime;
+        if (entry.name === 'first-contentful-paint') result.fcp = entry.startTime;
+    }
+    const resources = performance.getEntriesByType('resource');
+    result.resources = resources.length;
+    result.resource_bytes = resources.reduce((sum, r) => sum + (r.transferSize || 0), 0);
+    result.slowest_resource = resources.reduce((max, r) => Math.max(max, r.duration), 0);
+    const vitals = window.__visitVitals;
+    if (vitals && vitals.lcp !== null) result.lcp = vitals.lcp;
+    return result;
+}
+"""
+
+
+async def install(page):
+    """在导航之前调用，注册 LCP 观察器"""
+    await page.add_init_script(INIT_SCRIPT)
+
+
+async def collect(page):
+    """读取当前页面的性能指标，失败时返回 None"""
+    try:
+        data = await page.evaluate(COLLECT_SCRIPT)
+    except Exception as e:
+        logger.debug(f"读取页面性能指标失败: {str(e)}")
+        return None
+    vitals = {}
+    for name in VITAL_FIELDS:
+        value = data.get(name)
+        # 未发生的事件（如 load 尚未结束）计时为 0，不计入
+        if isinstance(value, (int, float)) and (value > 0 or name not in TIMING_FIELDS):
+            vitals[name] = round(value, 1)
+    return vitals
+
+
+class VitalsAggregator:
+    """按URL汇总每次访问的性能指标
+
+    add() 接收访问记录字典（VisitRecord.to_dict()），没有 vitals 的记录忽略。
+    每个URL的每个指标只保存对数分桶直方图，内存不随访问次数增长；
+    URL数超过 max_urls 后，新出现的URL合并汇总。
+    """
+
+    def __init__(self, max_urls=MAX_URLS):
+        self.max_urls = max_urls
+        self.urls = {}  # url -> {'visits': n, 指标: LogHistogram}
+
+    def add(self, record):
+        vitals = record.get('vitals')
+        if not vitals:
+            return
+        url = record['url']
+        if url not in self.urls and len(self.urls) >= self.max_urls:
+            url = OTHER_URLS
+        entry = self.urls.setdefault(url, {'visits': 0})
+        entry['visits'] += 1
+        for name, value in vitals.items():
+            histogram = entry.get(name)
+            if histogram is None:
+                histogram = entry[name] = LogHistogram()
+            histogram.add(value)
+
+    def __len__(self):
+        return len(self.urls)
+
+    def summary(self):
+        """{url: {'visits': n, 'ttfb': {'p50', 'p95', 'p99', 'count'}, ..., 'resources': 平均值}}"""
+        result = {}
+        for url, entry in self.urls.items():
+            item = {'visits': entry['visits']}
+            for name in VITAL_FIELDS:
+                histogram = entry.get(name)
+                if histogram is None:
+                    continue
+                if name in TIMING_FIELDS:
+                    item[name] = {
+                        'count': histogram.count,
+                        'p50': round(histogram.percentile(50), 1),
+                        'p95': round(histogram.percentile(95), 1),
+                        'p99': round(histogram.percentile(99), 1),
+                    }
+                else:
+                    item[name] = round(histogram.mean, 1)
+            result[url] = item
+        return result
+
+    def format_lines(self, limit=20):
+        """访问次数最多的几个URL的摘要，用于日志"""
+        lines = []
+        summary = self.summary()
+        for url, item in sorted(summary.items(), key=lambda pair: -pair[1]['visits'])[:limit]:
+            parts = []
+            for name, title in (('ttfb', 'TTFB'), ('dom_content_loaded', 'DCL'), ('load', 'load'), ('lcp', 'LCP')):
+                if name in item:
+                    parts.append(f"{title} {item[name]['p50']:.0f}/{item[name]['p95']:.0f}/{item[name]['p99']:.0f}")
+            lines.append(f"{url} ({item['visits']} 次): {'，'.join(parts) or '无数据'}")
+        if len(summary) > limit:
+            lines.append(f"……另有 {len(summary) - limit} 个URL")
+        return lines
+
+    def finish(self, path=''):
+        """输出汇总日志，path 不为空时写入 JSON 报告（阻塞调用）"""
+        if not self.urls:
+            return
+        logger.info("页面性能指标（毫秒，p50/p95/p99）:")
+        for line in self.format_lines():
+            logger.info(line)
+        if path:
+            try:
+                with open(path, 'w', encoding='utf-8') as f:
+                    json.dump({'generated_at': time.time(), 'urls': self.summary()}, f, ensure_ascii=False, indent=2)
+                logger.info(f"页面性能报告已保存: {path}")
+            except Exception as e:
+                logger.warning(f"写入页面性能报告失败: {str(e)}")